@@ -1,13 +1,104 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
+import threading
 # CORRECTED IMPORT: Import from the 'services' directory
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from services.recommendation_service import RecommendationService
+from services.model_registry import ModelNotFoundError
+from services.telemetry import APPLY_CHUNK_EVENTS, parse_event
+from services import metrics
+from backend import config
 
 api_blueprint = Blueprint('api', __name__)
 
+# Backpressure for /telemetry: streams beyond this many at once get a 429
+_telemetry_slots = threading.BoundedSemaphore(config.TELEMETRY_MAX_CONCURRENT_STREAMS)
+
+# Rejected lines listed in a /telemetry response; the rest are only counted
+_MAX_REPORTED_ERRORS = 20
+
+# Returned while telemetry is off, e.g. under gunicorn with several workers
+_TELEMETRY_DISABLED = ("Telemetry is disabled (TELEMETRY_ENABLED). Panel state is kept per process, "
+                       "so it needs a server running a single worker.")
+
+# Fields a payload may send alongside `panel_id` to override the panel's state
+_OVERRIDABLE_FIELDS = {
+    'temperature_celsius': float,
+    'cloud_cover_percentage': float,
+    'panel_age_in_days': int,
+    'days_since_cleaning': int,
+}
+
+
+def _parse_conditions(data, now):
+    """
+    Builds the model's input dict from one panel's JSON payload.
+    Raises ValueError/TypeError when a field has the wrong type.
+    """
+    return {
+        'temperature_celsius': float(data.get('temperature_celsius', 25)),
+        'cloud_cover_percentage': float(data.get('cloud_cover_percentage', 20)),
+        'panel_age_in_days': int(data.get('panel_age_in_days', 365)),
+        'days_since_cleaning': int(data.get('days_since_cleaning', 10)),
+        'hour': now.hour,
+        'day_of_year': now.timetuple().tm_yday
+    }
+
+
+def _request_conditions(data, now):
+    """
+    The model's input dict for one panel's payload. With a `panel_id`, it is
+    built from the panel's telemetry state (fields sent alongside override
+    it); otherwise from the payload, as `_parse_conditions` does.
+    Raises LookupError for an unknown panel.
+    """
+    panel_id = data.get('panel_id')
+    if panel_id is None:
+        return _parse_conditions(data, now)
+    if not isinstance(panel_id, str):
+        raise ValueError("panel_id must be a string")
+    if not config.TELEMETRY_ENABLED:
+        raise LookupError(_TELEMETRY_DISABLED)
+    conditions = RecommendationService.panel_states.conditions(panel_id, now)
+    if conditions is None:
+        raise LookupError(f"Unknown panel '{panel_id}'. Send its telemetry to /api/telemetry first.")
+    for name, cast in _OVERRIDABLE_FIELDS.items():
+        if name in data:
+            conditions[name] = cast(data[name])
+    return conditions
+
+
+def _with_observed_loss(conditions, data):
+    """
+    Adds the panel's observed loss to its conditions when the payload reports
+    both `actual_power_kw` and `ideal_power_kw` (used for drift monitoring).
+    """
+    if 'actual_power_kw' in data and 'ideal_power_kw' in data:
+        conditions['observed_loss_kw'] = float(data['ideal_power_kw']) - float(data['actual_power_kw'])
+    return conditions
+
+
+def _select_model(data, kind='loss', default_name=None):
+    """
+    Reads the optional `model` and `model_version` fields of a payload (or
+    the query string). Returns (name, version), both None for the default
+    loss model. Raises ModelNotFoundError for an unknown model or version, and
+    ValueError for a field that is not a string.
+    """
+    payload = data if isinstance(data, dict) else {}
+    model_name = payload.get('model', request.args.get('model', default_name))
+    model_version = payload.get('model_version', request.args.get('model_version'))
+    if model_name is None and model_version is None:
+        return None, None
+    for value in (model_name, model_version):
+        if value is not None and not isinstance(value, str):
+            raise ValueError("model and model_version must be strings")
+    RecommendationService.model_registry.resolve(model_name, model_version, kind)
+    return model_name, model_version
+
+
 @api_blueprint.route('/recommend', methods=['POST'])
 # ... (the rest of the file is the same as before) ...
 def get_recommendation():
@@ -15,34 +106,305 @@ def get_recommendation():
     API endpoint to get a maintenance recommendation.
     Expects a JSON payload with current conditions.
     """
+    request_started = metrics.clock()
+
     # Get data from the frontend request
     data = request.get_json()
     if not data:
+        metrics.count_error('invalid_input')
         return jsonify({"error": "Invalid input. JSON payload required."}), 400
 
     # Prepare the data for the recommendation service
     # In a real app, you'd get this from sensors or user input
     # For now, we'll use the data sent from the frontend
     try:
-        now = datetime.now()
-        current_conditions = {
+        current_conditions = _with_observed_loss(_request_conditions(data, datetime.now()), data)
+        model_name, model_version = _select_model(data)
+    except ModelNotFoundError as e:
+        metrics.count_error('unknown_model')
+        return jsonify({"error": str(e)}), 404
+    except LookupError as e:
+        metrics.count_error('unknown_panel')
+        return jsonify({"error": str(e)}), 404
+    except (ValueError, TypeError) as e:
+        metrics.count_error('invalid_input')
+        return jsonify({"error": f"Invalid data type in input: {e}"}), 400
+    metrics.observe_stage('parse', request_started)
+
+    # Generate the recommendation
+    # The service returns plain Python types, ready for JSON
+    recommendation = RecommendationService.generate_recommendations(current_conditions, model_name, model_version)
+
+    started = metrics.clock()
+    response = jsonify(recommendation)
+    metrics.observe_stage('serialize', started)
+    metrics.observe_stage('total', request_started)
+    return response
+
+
+@api_blueprint.route('/recommend/batch', methods=['POST'])
+def get_batch_recommendations():
+    """
+    API endpoint to score a whole fleet in one call.
+    Expects a JSON list of panel conditions (or {"panels": [...]}) and returns
+    one result per panel, in the same order. Invalid panels get an "error"
+    entry instead of failing the whole batch.
+    """
+    data = request.get_json(silent=True)
+    try:
+        model_name, model_version = _select_model(data)
+    except ModelNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": f"Invalid data type in input: {e}"}), 400
+    if isinstance(data, dict):
+        data = data.get('panels')
+    if not isinstance(data, list):
+        return jsonify({"error": "Invalid input. A JSON list of panel conditions is required."}), 400
+    if len(data) > config.MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch too large. At most {config.MAX_BATCH_SIZE} panels per request."}), 413
+
+    # Validate every panel first, remembering where the valid ones sit
+    now = datetime.now()
+    results = [None] * len(data)
+    valid_indices = []
+    valid_conditions = []
+    for i, item in enumerate(data):
+        if not isinstance(item, dict):
+            results[i] = {"error": "Invalid input. Each panel must be a JSON object."}
+            continue
+        try:
+            valid_conditions.append(_with_observed_loss(_request_conditions(item, now), item))
+            valid_indices.append(i)
+        except LookupError as e:
+            results[i] = {"error": str(e)}
+        except (ValueError, TypeError) as e:
+            results[i] = {"error": f"Invalid data type in input: {e}"}
+
+    # Score all valid panels with a single model call
+    recommendations = RecommendationService.generate_batch_recommendations(valid_conditions, model_name, model_version)
+    for i, recommendation in zip(valid_indices, recommendations):
+        results[i] = recommendation
+
+    return jsonify({"count": len(results), "results": results})
+
+
+def _parse_horizon(data):
+    """Reads `horizon_days` from a payload. Raises ValueError when out of range."""
+    horizon_days = int(data.get('horizon_days', config.SCHEDULE_DEFAULT_HORIZON_DAYS))
+    if not 1 <= horizon_days <= config.SCHEDULE_MAX_HORIZON_DAYS:
+        raise ValueError(f"horizon_days must be between 1 and {config.SCHEDULE_MAX_HORIZON_DAYS}")
+    return horizon_days
+
+
+@api_blueprint.route('/schedule', methods=['POST'])
+def get_cleaning_schedule():
+    """
+    API endpoint to find the best day to clean one panel.
+    Expects the same JSON payload as /recommend, plus an optional
+    `horizon_days` (default SCHEDULE_DEFAULT_HORIZON_DAYS).
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "Invalid input. JSON payload required."}), 400
+
+    try:
+        current_conditions = _request_conditions(data, datetime.now())
+        horizon_days = _parse_horizon(data)
+        model_name, model_version = _select_model(data)
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid data type in input: {e}"}), 400
+
+    schedule = RecommendationService.generate_cleaning_schedule(current_conditions, horizon_days, model_name, model_version)
+    return jsonify(schedule)
+
+
+@api_blueprint.route('/schedule/batch', methods=['POST'])
+def get_batch_cleaning_schedules():
+    """
+    API endpoint to plan cleaning for a whole fleet in one model call.
+    Expects {"panels": [...], "horizon_days": N} (or a bare list of panels)
+    and returns one plan per panel, in the same order.
+    """
+    data = request.get_json(silent=True)
+    payload = data if isinstance(data, dict) else {}
+    panels = payload.get('panels') if isinstance(data, dict) else data
+    if not isinstance(panels, list):
+        return jsonify({"error": "Invalid input. A JSON list of panel conditions is required."}), 400
+    try:
+        horizon_days = _parse_horizon(payload)
+        model_name, model_version = _select_model(data)
+    except ModelNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid data type in input: {e}"}), 400
+    # The cost grows with horizon_days squared, so the limit is on model rows, not panels
+    if RecommendationService.schedule_rows(horizon_days, len(panels)) > config.MAX_SCHEDULE_ROWS:
+        max_panels = max(1, config.MAX_SCHEDULE_ROWS // RecommendationService.schedule_rows(horizon_days))
+        return jsonify({"error": f"Batch too large. At most {max_panels} panels per request "
+                                 f"for horizon_days={horizon_days}."}), 413
+
+    now = datetime.now()
+    results = [None] * len(panels)
+    valid_indices = []
+    valid_conditions = []
+    for i, item in enumerate(panels):
+        if not isinstance(item, dict):
+            results[i] = {"error": "Invalid input. Each panel must be a JSON object."}
+            continue
+        try:
+            valid_conditions.append(_request_conditions(item, now))
+            valid_indices.append(i)
+        except LookupError as e:
+            results[i] = {"error": str(e)}
+        except (ValueError, TypeError) as e:
+            results[i] = {"error": f"Invalid data type in input: {e}"}
+
+    schedules = RecommendationService.generate_batch_cleaning_schedules(
+        valid_conditions, horizon_days, model_name, model_version
+    )
+    for i, schedule in zip(valid_indices, schedules):
+        results[i] = schedule
+
+    return jsonify({"count": len(results), "horizon_days": horizon_days, "results": results})
+
+
+@api_blueprint.route('/power', methods=['POST'])
+def get_power_output():
+    """
+    API endpoint to predict one panel's power output with a power model
+    (default: 'power', trained by 2_train_model.py).
+    Expects temperature, cloud cover and panel angle; the time fields are
+    taken from the current time.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "Invalid input. JSON payload required."}), 400
+
+    now = datetime.now()
+    try:
+        conditions = {
             'temperature_celsius': float(data.get('temperature_celsius', 25)),
             'cloud_cover_percentage': float(data.get('cloud_cover_percentage', 20)),
-            'panel_age_in_days': int(data.get('panel_age_in_days', 365)),
-            'days_since_cleaning': int(data.get('days_since_cleaning', 10)),
+            'panel_angle_degrees': float(data.get('panel_angle_degrees', 30)),
             'hour': now.hour,
-            'day_of_year': now.timetuple().tm_yday
+            'day_of_year': now.timetuple().tm_yday,
+            'month': now.month,
         }
+        model_name, model_version = _select_model(data, kind='power', default_name='power')
+    except ModelNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
     except (ValueError, TypeError) as e:
         return jsonify({"error": f"Invalid data type in input: {e}"}), 400
 
-    # Generate the recommendation
-    recommendation = RecommendationService.generate_recommendations(current_conditions)
+    prediction = RecommendationService.predict_power_output([conditions], model_name, model_version)[0]
+    return jsonify(prediction)
+
+
+@api_blueprint.route('/models', methods=['GET'])
+def list_models():
+    """Lists the registry's models and versions, which are loaded, and the memory budget."""
+    return jsonify(RecommendationService.model_registry.info())
+
+
+@api_blueprint.route('/drift', methods=['GET'])
+def get_drift():
+    """
+    Drift of the rows the default loss model scored recently from its
+    training data: PSI per feature and for the prediction, residuals where
+    the observed loss was reported, and whether retraining is recommended.
+    """
+    if not config.DRIFT_MONITORING_ENABLED:
+        return jsonify({"enabled": False, "error": "Drift monitoring is disabled (DRIFT_MONITORING_ENABLED)."})
+    return jsonify(RecommendationService.drift_monitor.scores())
+
+
+@api_blueprint.route('/telemetry', methods=['POST'])
+def ingest_telemetry():
+    """
+    API endpoint to ingest a newline-delimited JSON stream of telemetry
+    events (readings, cleaning and rain events, panel install dates) for any
+    number of panels. The body is read and applied in chunks as it arrives.
+    Invalid lines are reported without failing the rest of the stream.
+    """
+    if not config.TELEMETRY_ENABLED:
+        return jsonify({"error": _TELEMETRY_DISABLED}), 503
+    if not _telemetry_slots.acquire(blocking=False):
+        response = jsonify({"error": "Too many telemetry streams in progress. Retry later."})
+        response.headers['Retry-After'] = str(config.TELEMETRY_RETRY_AFTER_SECONDS)
+        return response, 429
+
+    table = RecommendationService.panel_states
+    accepted = stale = rejected = 0
+    errors = []
+    truncated = False
+
+    def apply(events, line_numbers):
+        nonlocal accepted, stale, rejected
+        chunk_accepted, chunk_stale, chunk_errors = table.apply(events)
+        accepted += chunk_accepted
+        stale += chunk_stale
+        rejected += len(chunk_errors)
+        for position, message in chunk_errors[:_MAX_REPORTED_ERRORS - len(errors)]:
+            errors.append({"line": line_numbers[position], "error": message})
+
+    try:
+        events, line_numbers = [], []
+        for line_number, line in enumerate(request.stream, start=1):
+            if line_number > config.TELEMETRY_MAX_LINES_PER_REQUEST:
+                truncated = True
+                break
+            if not line.strip():
+                continue
+            try:
+                events.append(parse_event(line))
+                line_numbers.append(line_number)
+            except ValueError as e:
+                rejected += 1
+                if len(errors) < _MAX_REPORTED_ERRORS:
+                    errors.append({"line": line_number, "error": f"Invalid JSON: {e}"})
+            if len(events) >= APPLY_CHUNK_EVENTS:
+                apply(events, line_numbers)
+                events, line_numbers = [], []
+        apply(events, line_numbers)
+    finally:
+        _telemetry_slots.release()
+
+    result = {"accepted": accepted, "stale": stale, "rejected": rejected, "errors": errors}
+    if truncated:
+        result["error"] = (f"Stream too long. Only the first {config.TELEMETRY_MAX_LINES_PER_REQUEST} "
+                           f"lines were read; send the rest in another request.")
+        return jsonify(result), 413
+    return jsonify(result)
+
+
+@api_blueprint.route('/panels/<panel_id>', methods=['GET'])
+def panel_status(panel_id):
+    """Reports a panel's telemetry state and its latest batch-scored recommendation."""
+    if not config.TELEMETRY_ENABLED:
+        return jsonify({"error": _TELEMETRY_DISABLED}), 503
+    status = RecommendationService.get_panel_status(panel_id)
+    if status is None:
+        return jsonify({"error": f"Unknown panel '{panel_id}'."}), 404
+    return jsonify(status)
+
+
+@api_blueprint.route('/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 200 once the model is loaded and warmed up, 503 before that."""
+    if RecommendationService.model_manager.is_ready():
+        return jsonify({"ready": True})
+    return jsonify({"ready": False}), 503
 
-    # The service returns numpy types, which need to be converted for JSON
-    if 'predicted_hourly_loss_kw' in recommendation:
-        recommendation['predicted_hourly_loss_kw'] = float(recommendation['predicted_hourly_loss_kw'])
-    if 'estimated_daily_financial_loss' in recommendation:
-        recommendation['estimated_daily_financial_loss'] = float(recommendation['estimated_daily_financial_loss'])
 
-    return jsonify(recommendation)
\ No newline at end of file
+@api_blueprint.route('/model', methods=['GET'])
+def model_info():
+    """Reports the version, file hash and load time of the model in service."""
+    info = RecommendationService.model_manager.info()
+    if config.PREDICTION_CACHE_ENABLED:
+        info['prediction_cache'] = RecommendationService.prediction_cache.stats()
+    if config.MICRO_BATCHING_ENABLED:
+        info['micro_batching'] = RecommendationService.batcher.stats()
+    return jsonify(info)
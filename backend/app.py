@@ -1,9 +1,17 @@
-from flask import Flask
+from flask import Flask, Response
 from flask_cors import CORS
 from api.routes import api_blueprint
+from services.recommendation_service import RecommendationService
+from services import metrics
+from backend import config
 
-def create_app():
-    """Creates and configures the Flask application."""
+def create_app(start_watcher=True):
+    """
+    Creates and configures the Flask application.
+    Pass start_watcher=False when the process is about to fork (gunicorn with
+    preload_app): threads (the model watcher, the telemetry scorer) do not
+    survive a fork, so each worker starts its own.
+    """
     app = Flask(__name__)
     
     # Enable CORS to allow requests from the frontend
@@ -12,6 +20,22 @@ def create_app():
     # Register the blueprint that contains our API routes
     app.register_blueprint(api_blueprint, url_prefix='/api')
 
+    # Load and warm up the model now, so the first request doesn't pay for it.
+    # A missing model leaves /api/ready reporting 503 instead of crashing the server.
+    model_manager = RecommendationService.model_manager
+    if not model_manager.is_ready():
+        model_manager.load()
+    if config.MODEL_HOT_RELOAD and start_watcher:
+        model_manager.start_watcher()
+    if config.TELEMETRY_ENABLED and config.TELEMETRY_SCORING_ENABLED and start_watcher:
+        RecommendationService.telemetry_scorer.start()
+
+    if config.METRICS_ENABLED:
+        @app.route('/metrics')
+        def metrics_endpoint():
+            """Per-stage latency histograms, error counters and model state, for Prometheus."""
+            return Response(metrics.render_metrics(), mimetype='text/plain; version=0.0.4')
+
     @app.route('/')
     def index():
         return "Solar Panel Optimizer Backend is running!"
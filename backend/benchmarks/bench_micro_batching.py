@@ -0,0 +1,63 @@
+"""
+Benchmark: throughput of concurrent single-panel predictions, with and
+without the micro-batching layer in RecommendationService.
+
+Run from the backend directory:
+    python benchmarks/bench_micro_batching.py [--threads 32] [--requests 4000] [--backend sklearn]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.dirname(BACKEND_DIR))
+
+from backend import config
+from services.inference_backends import FEATURES_ORDER, make_probe_features
+from services.recommendation_service import RecommendationService
+
+
+def run_concurrent(rows, threads):
+    """Sends every row through RecommendationService from `threads` threads. Returns (predictions, seconds)."""
+    model = RecommendationService._get_model()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        predictions = list(pool.map(lambda conditions: RecommendationService._predict_loss(model, conditions), rows))
+    return predictions, time.perf_counter() - start
+
+
+def main(threads, num_requests, backend):
+    config.INFERENCE_BACKEND = backend
+    config.PREDICTION_CACHE_ENABLED = False
+    rows = [dict(zip(FEATURES_ORDER, row)) for row in make_probe_features(num_rows=num_requests).tolist()]
+
+    config.MICRO_BATCHING_ENABLED = False
+    unbatched, unbatched_seconds = run_concurrent(rows, threads)
+
+    config.MICRO_BATCHING_ENABLED = True
+    RecommendationService.batcher.predict(list(rows[0].values()))  # start the worker
+    batched, batched_seconds = run_concurrent(rows, threads)
+
+    assert batched == unbatched, "Micro-batched predictions differ from the unbatched ones."
+    stats = RecommendationService.batcher.stats()
+
+    print(f"{num_requests} single-panel predictions from {threads} threads ({backend} backend).")
+    print("Identical predictions with and without micro-batching.")
+    print(f"Unbatched:     {num_requests / unbatched_seconds:10.0f} predictions/s")
+    print(f"Micro-batched: {num_requests / batched_seconds:10.0f} predictions/s  "
+          f"({unbatched_seconds / batched_seconds:.1f}x)")
+    print(f"Mean batch size {stats['mean_batch_size']}, mean queue wait {stats['mean_queue_wait_ms']} ms, "
+          f"max queue wait {stats['max_queue_wait_ms']} ms.")
+    print(f"Batch sizes: {stats['batch_size_histogram']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32, help="Concurrent callers.")
+    parser.add_argument('--requests', type=int, default=4000, help="Total predictions.")
+    parser.add_argument('--backend', default=config.INFERENCE_BACKEND, help="Inference backend to load.")
+    args = parser.parse_args()
+    main(args.threads, args.requests, args.backend)
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: single-row loss prediction, old DataFrame path vs. the
+preallocated-buffer fast path in RecommendationService.
+
+Run from the backend directory:
+    python benchmarks/bench_single_row.py
+"""
+import copy
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.dirname(BACKEND_DIR))
+
+import joblib
+import numpy as np
+import pandas as pd
+from backend import config
+from services.inference_backends import FEATURES_ORDER, PKL_MODEL_PATH, make_probe_features
+from services.recommendation_service import RecommendationService
+
+
+def time_per_call(func, repeats):
+    """Returns the median wall time of one call to `func`, in microseconds."""
+    func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1e6
+
+
+def main(repeats=200):
+    config.INFERENCE_BACKEND = 'sklearn'
+    config.PREDICTION_CACHE_ENABLED = False
+
+    # The code path as it was before the fast path: a fresh pickled forest,
+    # a one-row DataFrame and RandomForestRegressor.predict on every call.
+    legacy_model = joblib.load(PKL_MODEL_PATH)
+    model = RecommendationService._get_model()
+
+    rows = [dict(zip(FEATURES_ORDER, row)) for row in make_probe_features(num_rows=repeats).tolist()]
+
+    def legacy_predict(conditions, forest=legacy_model):
+        df = pd.DataFrame([conditions])
+        df = df[FEATURES_ORDER]
+        return float(forest.predict(df)[0])
+
+    # Same answers, row by row. A multithreaded forest predict adds the trees
+    # up in the order its threads finish, so compare with the single-threaded
+    # sum (trees in order), which the fast path reproduces exactly.
+    sequential_model = copy.copy(legacy_model).set_params(n_jobs=1)
+    for conditions in rows:
+        assert legacy_predict(conditions, sequential_model) == RecommendationService._predict_loss(model, conditions)
+
+    conditions = rows[0]
+    legacy_us = time_per_call(lambda: legacy_predict(conditions), repeats)
+    fast_us = time_per_call(lambda: RecommendationService._predict_loss(model, conditions), repeats)
+    full_us = time_per_call(lambda: RecommendationService.generate_recommendations(conditions), repeats)
+
+    print(f"Identical predictions on {len(rows)} probe rows.")
+    print(f"Legacy DataFrame path:        {legacy_us:10.1f} us/call")
+    print(f"Fast path (predict only):     {fast_us:10.1f} us/call  ({legacy_us / fast_us:.1f}x faster)")
+    print(f"generate_recommendations():   {full_us:10.1f} us/call")
+
+
+if __name__ == '__main__':
+    main()
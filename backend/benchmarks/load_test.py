@@ -0,0 +1,137 @@
+"""
+Local load test for the production server: starts gunicorn with 1, 2, 4, ...
+workers, drives /api/recommend from client processes, and reports throughput
+and the memory used by the whole server at each size.
+
+Memory is reported as RSS (counts shared pages once per process) and PSS
+(splits shared pages between the processes sharing them). With the model
+preloaded in the master, total PSS stays nearly flat as workers are added.
+
+Run from the backend directory (Linux):
+    python benchmarks/load_test.py [--workers 1 2 4] [--clients 8] [--seconds 10]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PAYLOAD = json.dumps({
+    'temperature_celsius': 25, 'cloud_cover_percentage': 10,
+    'panel_age_in_days': 180, 'days_since_cleaning': 45,
+})
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(server, port, timeout_seconds=120):
+    deadline = time.monotonic() + timeout_seconds
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}.")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/ready')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Server did not become ready in time.")
+
+
+def server_pids(master_pid):
+    """The gunicorn master and its worker processes."""
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+        return [master_pid] + [int(pid) for pid in f.read().split()]
+
+
+def memory_mb(pids):
+    """Sums RSS and PSS (MB) over `pids` from /proc/<pid>/smaps_rollup."""
+    totals = {'Rss': 0, 'Pss': 0}
+    for pid in pids:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                field, _, rest = line.partition(':')
+                if field in totals:
+                    totals[field] += int(rest.split()[0])
+    return totals['Rss'] / 1024, totals['Pss'] / 1024
+
+
+def client(port, seconds, results):
+    """Sends requests back to back on one keep-alive connection for `seconds`."""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    headers = {'Content-Type': 'application/json'}
+    completed = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        conn.request('POST', '/api/recommend', body=PAYLOAD, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        if response.status == 200:
+            completed += 1
+        else:
+            errors += 1
+    results.put((completed, errors))
+
+
+def run(num_workers, num_clients, seconds):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-w', str(num_workers),
+         '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'wsgi:app'],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        wait_until_ready(server, port)
+        time.sleep(1)  # let every worker finish booting
+
+        results = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=client, args=(port, seconds, results)) for _ in range(num_clients)]
+        for process in clients:
+            process.start()
+        counts = [results.get() for _ in clients]
+        for process in clients:
+            process.join()
+
+        rss, pss = memory_mb(server_pids(server.pid))
+        completed = sum(count for count, _ in counts)
+        errors = sum(count for _, count in counts)
+        return {
+            'workers': num_workers,
+            'requests_per_second': completed / seconds,
+            'errors': errors,
+            'rss_mb': rss,
+            'pss_mb': pss,
+        }
+    finally:
+        server.terminate()  # SIGTERM: graceful shutdown
+        server.wait(timeout=60)
+
+
+def main(worker_counts, num_clients, seconds):
+    print(f"{num_clients} client processes, {seconds}s per run, {multiprocessing.cpu_count()} CPU cores.")
+    print(f"{'workers':>8}{'req/s':>10}{'errors':>8}{'total RSS (MB)':>16}{'total PSS (MB)':>16}")
+    for num_workers in worker_counts:
+        result = run(num_workers, num_clients, seconds)
+        print(f"{result['workers']:>8}{result['requests_per_second']:>10.0f}{result['errors']:>8}"
+              f"{result['rss_mb']:>16.0f}{result['pss_mb']:>16.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test the gunicorn server at several worker counts.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help="Worker counts to test.")
+    parser.add_argument('--clients', type=int, default=8, help="Concurrent client processes.")
+    parser.add_argument('--seconds', type=float, default=10, help="Duration of each run.")
+    args = parser.parse_args()
+    main(args.workers, args.clients, args.seconds)
@@ -0,0 +1,309 @@
+"""
+Benchmark suite for serving, simulation and training, in one command.
+
+Writes machine-readable JSON (results plus environment metadata) and compares
+it with a stored baseline, flagging every metric that got worse by more than
+the tolerance.
+
+Run from the backend directory:
+    python benchmarks/run_benchmarks.py                  # full suite
+    python benchmarks/run_benchmarks.py --quick          # smaller sizes
+    python benchmarks/run_benchmarks.py --only serving backends
+    python benchmarks/run_benchmarks.py --save-baseline  # store this run as the baseline
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SCRIPTS_DIR = os.path.join(BACKEND_DIR, 'ml_training', 'scripts')
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.dirname(BACKEND_DIR))
+sys.path.append(SCRIPTS_DIR)
+
+import numpy as np
+from backend import config
+from services.inference_backends import BACKENDS, FEATURES_ORDER, load_backend, make_probe_features
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+SUITES = ('serving', 'http', 'backends', 'simulation', 'training')
+
+
+def latency_stats(func, repeats):
+    """Calls `func` `repeats` times after one warm-up call. Returns p50/p99 in ms."""
+    func()
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings[i] = time.perf_counter() - start
+    return {
+        'p50_ms': float(np.percentile(timings, 50)) * 1e3,
+        'p99_ms': float(np.percentile(timings, 99)) * 1e3,
+    }
+
+
+def probe_conditions(num_rows):
+    return [dict(zip(FEATURES_ORDER, row)) for row in make_probe_features(num_rows=num_rows).tolist()]
+
+
+def bench_serving(quick):
+    """RecommendationService.generate_recommendations and its batch variant."""
+    from services.recommendation_service import RecommendationService
+
+    results = {}
+    conditions = probe_conditions(1000)
+    repeats = 200 if quick else 1000
+    calls = iter(range(10 ** 9))
+    results['single_row'] = latency_stats(
+        lambda: RecommendationService.generate_recommendations(conditions[next(calls) % len(conditions)]), repeats
+    )
+    for batch_size in (100, 1000):
+        batch = conditions[:batch_size]
+        stats = latency_stats(lambda: RecommendationService.generate_batch_recommendations(batch), repeats // 20)
+        stats['rows_per_second'] = batch_size / stats['p50_ms'] * 1e3
+        results[f'batch_{batch_size}'] = stats
+    return results
+
+
+def bench_http(quick):
+    """End-to-end /api/recommend through the Flask test client."""
+    from app import create_app
+
+    client = create_app(start_watcher=False).test_client()
+    payloads = [
+        {name: value for name, value in conditions.items() if name not in ('hour', 'day_of_year')}
+        for conditions in probe_conditions(1000)
+    ]
+    num_requests = 500 if quick else 3000
+    client.post('/api/recommend', json=payloads[0])
+
+    timings = np.empty(num_requests)
+    started = time.perf_counter()
+    for i in range(num_requests):
+        start = time.perf_counter()
+        response = client.post('/api/recommend', json=payloads[i % len(payloads)])
+        timings[i] = time.perf_counter() - start
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/recommend returned {response.status_code}")
+    elapsed = time.perf_counter() - started
+    return {
+        'recommend': {
+            'requests_per_second': num_requests / elapsed,
+            'p50_ms': float(np.percentile(timings, 50)) * 1e3,
+            'p99_ms': float(np.percentile(timings, 99)) * 1e3,
+        }
+    }
+
+
+def bench_backends(quick):
+    """Load time and inference latency of each model artifact (.npz, .pkl, .onnx)."""
+    results = {}
+    repeats = 100 if quick else 500
+    for name in BACKENDS:
+        try:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                backend = load_backend(name)
+            load_seconds = time.perf_counter() - start
+        except Exception as e:
+            print(f"  skipping {name} backend: {e}")
+            continue
+        results[name] = {'load_seconds': load_seconds}
+        for num_rows in (1, 1000):
+            X = make_probe_features(num_rows=num_rows)
+            stats = latency_stats(lambda: backend.predict(X), repeats if num_rows == 1 else repeats // 10)
+            results[name][f'rows_{num_rows}_p50_ms'] = stats['p50_ms']
+            results[name][f'rows_{num_rows}_p99_ms'] = stats['p99_ms']
+    return results
+
+
+def bench_simulation(quick):
+    """simulate_loss_data throughput (columnar output) at several sizes."""
+    simulator = importlib.import_module('1b_simulate_loss_data')
+    results = {}
+    sizes = (10_000, 100_000) if quick else (10_000, 100_000, 1_000_000)
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_records in sizes:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                simulator.simulate_loss_data(num_records=num_records, output_path=os.path.join(tmp, f'loss_{num_records}'))
+            elapsed = time.perf_counter() - start
+            results[f'records_{num_records}'] = {'seconds': elapsed, 'rows_per_second': num_records / elapsed}
+    return results
+
+
+def _train_in_subprocess(data_path, model_path, feature_cache_dir):
+    """Runs train_loss_model in a fresh process, so its memory high-water mark is its own."""
+    trainer = importlib.import_module('2b_train_loss_model')
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        trainer.train_loss_model(data_path=data_path, model_output_path=model_path,
+                                 feature_cache_dir=feature_cache_dir)
+    return {'seconds': time.perf_counter() - start, 'peak_memory_mb': trainer.peak_memory_mb()}
+
+
+def bench_training(quick):
+    """train_loss_model wall time and peak memory on a freshly simulated dataset."""
+    simulator = importlib.import_module('1b_simulate_loss_data')
+    num_records = 10_000 if quick else 50_000
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, 'loss_data')
+        with contextlib.redirect_stdout(io.StringIO()):
+            simulator.simulate_loss_data(num_records=num_records, output_path=data_path)
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            # A feature cache of its own: every run builds the features cold and
+            # nothing is left behind in the repository's cache
+            result = pool.submit(_train_in_subprocess, data_path, os.path.join(tmp, 'model.pkl'),
+                                 os.path.join(tmp, 'feature_cache')).result()
+    return {f'records_{num_records}': result}
+
+
+BENCHMARKS = {
+    'serving': bench_serving,
+    'http': bench_http,
+    'backends': bench_backends,
+    'simulation': bench_simulation,
+    'training': bench_training,
+}
+
+
+def environment():
+    """Metadata needed to tell whether two result files are comparable."""
+    import pandas
+    import sklearn
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pandas.__version__,
+        'scikit-learn': sklearn.__version__,
+        'inference_backend': config.INFERENCE_BACKEND,
+    }
+
+
+def flatten(results, prefix=''):
+    """{'serving': {'single_row': {'p50_ms': 1}}} -> {'serving.single_row.p50_ms': 1}"""
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        else:
+            flat[name] = value
+    return flat
+
+
+def higher_is_better(metric):
+    return metric.endswith('per_second')
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns one row per metric present in both runs. A metric regressed when
+    it is worse than the baseline by more than `tolerance` (a fraction).
+    """
+    current, previous = flatten(results), flatten(baseline)
+    rows = []
+    for metric, value in current.items():
+        old = previous.get(metric)
+        if not old:
+            continue
+        change = (value - old) / old
+        worse = -change if higher_is_better(metric) else change
+        rows.append({'metric': metric, 'baseline': old, 'current': value,
+                     'change': change, 'regression': worse > tolerance})
+    return rows
+
+
+def print_results(results):
+    for metric, value in flatten(results).items():
+        print(f"  {metric:<48}{value:>14.3f}")
+
+
+def print_comparison(rows, tolerance):
+    print(f"\nComparison with baseline (regression = worse by more than {tolerance:.0%}):")
+    for row in rows:
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"  {row['metric']:<48}{row['baseline']:>12.3f} -> {row['current']:>12.3f}  ({row['change']:+.1%}){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the performance benchmark suite.")
+    parser.add_argument('--only', nargs='+', choices=SUITES, default=list(SUITES), help="Suites to run.")
+    parser.add_argument('--quick', action='store_true', help="Smaller sizes and fewer repeats.")
+    parser.add_argument('--output', default=None,
+                        help="Results file (default: benchmarks/results/benchmark_<timestamp>.json).")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline results to compare against.")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Relative slowdown tolerated before flagging a regression (default: 0.2).")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Exit with status 1 on any regression.")
+    args = parser.parse_args()
+
+    report = {'environment': environment(), 'quick': args.quick, 'results': {}}
+    for suite in args.only:
+        print(f"Running {suite} benchmarks...")
+        started = time.perf_counter()
+        report['results'][suite] = BENCHMARKS[suite](args.quick)
+        print(f"  done in {time.perf_counter() - started:.1f}s")
+    print_results(report['results'])
+
+    rows = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('quick') != args.quick:
+            print("\nWarning: the baseline was recorded with a different --quick setting.")
+        if baseline['environment'].get('cpu_count') != report['environment']['cpu_count']:
+            print("\nWarning: the baseline was recorded on a machine with a different CPU count.")
+        rows = compare(report['results'], baseline['results'], args.tolerance)
+        report['comparison'] = {'baseline': os.path.abspath(args.baseline), 'tolerance': args.tolerance, 'metrics': rows}
+        print_comparison(rows, args.tolerance)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to: {os.path.abspath(output)}")
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to: {os.path.abspath(args.baseline)}")
+
+    regressions = [row['metric'] for row in rows if row['regression']]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
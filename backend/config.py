@@ -21,3 +21,175 @@ ENERGY_VALUE_PER_KWH = 7
 # If the estimated daily loss exceeds this value, the system will suggest
 # that the user should clean the panels.
 RECOMMENDATION_THRESHOLD_INR = 20
+
+# Number of peak sun hours used to scale an hourly loss prediction up to a
+# full day of lost generation.
+PEAK_SUN_HOURS = 8
+
+# --- Cleaning Schedule ---
+
+# How many days ahead /api/schedule plans when the request does not say.
+SCHEDULE_DEFAULT_HORIZON_DAYS = 90
+SCHEDULE_MAX_HORIZON_DAYS = 365
+
+# Hours of the day scored for every day of the horizon. Their mean hourly loss
+# is scaled by PEAK_SUN_HOURS, the same way generate_recommendations scales a
+# single prediction. Each extra hour adds another full grid of model rows.
+# The default deliberately scores noon only, standing in for the whole day:
+# the full daylight grid, e.g. tuple(range(9, 17)), costs 8x the rows (about
+# 0.8 s instead of 0.1 s per panel at 90 days) and MAX_SCHEDULE_ROWS would
+# need raising to keep the same panel limits.
+SCHEDULE_SAMPLE_HOURS = (12,)
+
+# --- API Limits ---
+
+# The maximum number of panels accepted by a single /api/recommend/batch call.
+MAX_BATCH_SIZE = 5000
+
+# The maximum number of model rows a single /api/schedule/batch call may need.
+# Every panel adds about horizon_days^2 / 2 rows per SCHEDULE_SAMPLE_HOURS
+# entry, so this allows 23 panels at 90 days but only one at 365 days.
+# One panel at SCHEDULE_MAX_HORIZON_DAYS always fits.
+MAX_SCHEDULE_ROWS = 100000
+
+# Rows scored per model call while planning, bounding the feature matrix
+# (and the predictions) held in memory at once.
+SCHEDULE_CHUNK_ROWS = 65536
+
+# --- Model Serving ---
+
+# Which inference backend RecommendationService uses to run the loss model.
+#   'npz':     the forest flattened into NumPy arrays (loss_prediction_model.npz,
+#              written by 4_export_forest_arrays.py). Needs neither scikit-learn
+#              nor pandas, so API workers start fast and stay small.
+#   'sklearn': the pickled scikit-learn forest (loss_prediction_model.pkl)
+#   'onnx':    the exported ONNX graph (loss_prediction_model.onnx) run by onnxruntime
+INFERENCE_BACKEND = 'npz'
+
+# Number of threads onnxruntime may use inside a single predict call.
+# Keep this at 1 when the server already runs several worker threads/processes.
+ONNX_INTRA_OP_THREADS = 1
+
+# Requests with at most this many rows walk the trees in the calling thread.
+# Larger batches are split into row blocks of at least this size, predicted
+# on the forest's n_jobs threads. Either way each row sums its trees in the
+# same order, so predictions do not depend on the batch size.
+SKLEARN_FAST_PATH_MAX_ROWS = 64
+
+# When the onnx backend is loaded, compare its predictions with the
+# sklearn model on a fixed set of probe rows and refuse to serve it if any
+# prediction differs by more than this many kW.
+VERIFY_BACKEND_PARITY = True
+BACKEND_PARITY_TOLERANCE = 1e-4
+
+# Watch the model file and reload it without downtime when it changes on disk
+# (for example after re-running the training or ONNX conversion scripts).
+MODEL_HOT_RELOAD = True
+MODEL_RELOAD_INTERVAL_SECONDS = 5
+
+# --- Model Registry ---
+
+# Name the default loss model (the one above, with warm-up and hot reload) is
+# requested by. Requests that name no model get it.
+DEFAULT_MODEL_NAME = 'loss'
+
+# Other models (the power output model, per-region or per-site loss models)
+# are listed in this manifest, relative to ml_training/saved_model/, and loaded
+# on first use. See services/model_registry.py for the format.
+MODEL_REGISTRY_MANIFEST = 'model_registry.json'
+
+# Upper bound on the memory held by lazily loaded models. Past it, the least
+# recently used ones are unloaded. The default model is not counted.
+MODEL_MEMORY_BUDGET_MB = 256
+
+# --- Telemetry Ingestion ---
+
+# Serve /api/telemetry, /api/panels/<id> and `panel_id` lookups. Panel state
+# lives in the memory of one process, so gunicorn.conf.py turns this off when
+# it starts more than one worker (run telemetry with SERVER_WORKERS = 1).
+TELEMETRY_ENABLED = True
+
+# Panels whose state /api/telemetry keeps (a fixed ~50 bytes of arrays each,
+# plus the panel ID). Events for new panels beyond this are rejected.
+TELEMETRY_MAX_PANELS = 100000
+
+# Score the panels whose state changed every TELEMETRY_SCORE_INTERVAL_SECONDS,
+# in one model call per MAX_BATCH_SIZE panels.
+TELEMETRY_SCORING_ENABLED = True
+TELEMETRY_SCORE_INTERVAL_SECONDS = 10
+
+# Backpressure: streams ingested at the same time, and lines read per request.
+# A stream beyond the limit is refused with 429 and a Retry-After header.
+TELEMETRY_MAX_CONCURRENT_STREAMS = 4
+TELEMETRY_MAX_LINES_PER_REQUEST = 1000000
+TELEMETRY_RETRY_AFTER_SECONDS = 5
+
+# --- Drift Monitoring ---
+
+# Compare the rows the default loss model scores with its training data (see
+# services/drift_monitor.py). Needs loss_prediction_model_reference.json,
+# written by 2b_train_loss_model.py next to the model.
+DRIFT_MONITORING_ENABLED = True
+
+# Drift scores cover the current window of scored rows plus the previous one.
+# Smaller windows react faster; larger ones give steadier scores.
+DRIFT_WINDOW_SIZE = 5000
+
+# Rows (and reported residuals) needed before drift can trigger a retrain signal.
+DRIFT_MIN_SAMPLES = 500
+
+# Population stability index above which a feature (or the prediction) counts
+# as drifted. 0.1 is a moderate shift, 0.25 a significant one.
+DRIFT_PSI_THRESHOLD = 0.25
+
+# Residual MAE, as a multiple of the model's held-out training MAE, above which
+# the model counts as no longer matching the panels it scores.
+DRIFT_MAE_RATIO_THRESHOLD = 2.0
+
+# --- Production Server (gunicorn.conf.py) ---
+
+# Address and worker layout used by `gunicorn -c gunicorn.conf.py wsgi:app`.
+# SERVER_WORKERS = None starts one worker process per CPU core.
+SERVER_BIND = '0.0.0.0:5001'
+SERVER_WORKERS = None
+SERVER_THREADS = 4
+
+# Seconds a worker gets to finish in-flight requests after SIGTERM.
+SERVER_GRACEFUL_TIMEOUT_SECONDS = 30
+
+# --- Micro-batching ---
+
+# Coalesce concurrent single-panel predictions into one model call. A worker
+# collects rows for up to MICRO_BATCH_WINDOW_MS (or MICRO_BATCH_MAX_SIZE rows)
+# before predicting, so a lone request can be delayed by up to the window.
+MICRO_BATCHING_ENABLED = False
+MICRO_BATCH_WINDOW_MS = 2
+MICRO_BATCH_MAX_SIZE = 64
+
+# Seconds a caller waits for its batch before giving up with an error.
+MICRO_BATCH_TIMEOUT_SECONDS = 5
+
+# --- Metrics ---
+
+# Record per-stage latency histograms and error counters, and serve them in
+# Prometheus text format on /metrics. When off, the hot path only pays for a
+# flag check per stage and /metrics is not registered.
+METRICS_ENABLED = True
+
+# --- Prediction Cache ---
+
+# Serve repeated predictions from an in-memory LRU cache. Inputs are snapped to
+# the grid below before lookup, so nearby readings share one model call.
+PREDICTION_CACHE_ENABLED = False
+PREDICTION_CACHE_MAX_SIZE = 10000
+PREDICTION_CACHE_TTL_SECONDS = 300
+
+# Grid resolution per feature, in the feature's own units.
+PREDICTION_CACHE_RESOLUTIONS = {
+    'temperature_celsius': 0.5,
+    'cloud_cover_percentage': 1,
+    'panel_age_in_days': 1,
+    'days_since_cleaning': 1,
+    'hour': 1,
+    'day_of_year': 1,
+}
@@ -0,0 +1,58 @@
+"""
+Gunicorn settings for the production API server.
+
+Run from the backend directory:
+    gunicorn -c gunicorn.conf.py wsgi:app
+    gunicorn -c gunicorn.conf.py -w 8 wsgi:app      # override the worker count
+
+The model is loaded once in the master before the workers are forked, so its
+arrays live in memory pages all workers share (copy-on-write). Adding a worker
+costs its own interpreter state, not another copy of the model.
+"""
+import gc
+import multiprocessing
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Aliased: gunicorn treats a module-level name `config` as one of its own settings
+from backend import config as backend_config
+
+bind = backend_config.SERVER_BIND
+workers = backend_config.SERVER_WORKERS or multiprocessing.cpu_count()
+threads = backend_config.SERVER_THREADS
+worker_class = 'gthread'
+graceful_timeout = backend_config.SERVER_GRACEFUL_TIMEOUT_SECONDS
+
+# Load wsgi:app (and with it the model) in the master, before forking
+preload_app = True
+
+
+def when_ready(server):
+    # Telemetry state lives in one process: with several workers, each would
+    # hold a different subset of the panels, so turn it off before forking
+    if backend_config.TELEMETRY_ENABLED and server.num_workers > 1:
+        backend_config.TELEMETRY_ENABLED = False
+        server.log.warning(f"Telemetry disabled: panel state is per process and {server.num_workers} "
+                           f"workers were requested. Run with SERVER_WORKERS = 1 (or -w 1) to serve it.")
+
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers do not write to (and un-share) those pages.
+    gc.freeze()
+    server.log.info(f"Model loaded in master; forking {server.num_workers} workers.")
+
+
+def post_fork(server, worker):
+    # Threads do not survive fork(): each worker starts its own model watcher
+    # and telemetry scorer
+    from services.recommendation_service import RecommendationService
+    if backend_config.MODEL_HOT_RELOAD:
+        RecommendationService.model_manager.start_watcher()
+    if backend_config.TELEMETRY_ENABLED and backend_config.TELEMETRY_SCORING_ENABLED:
+        RecommendationService.telemetry_scorer.start()
+
+
+def worker_exit(server, worker):
+    from services.recommendation_service import RecommendationService
+    RecommendationService.model_manager.stop_watcher()
+    RecommendationService.telemetry_scorer.stop()
@@ -1,14 +1,18 @@
 import pandas as pd
 import numpy as np
+import argparse
 import os
+from dataset_io import FORMATS, write_dataset
 
-def simulate_solar_data(num_records=8760, output_path='../../data/historical_solar_data.csv'):
+def simulate_solar_data(num_records=8760, output_path='../../data/historical_solar_data', fmt='npy'):
     """
-    Generates simulated historical solar panel data and saves it to a CSV file.
+    Generates simulated historical solar panel data and saves it.
 
     Args:
         num_records (int): The number of hourly records to generate (default is 1 year).
-        output_path (str): The relative path to save the output CSV file.
+        output_path (str): The relative path to save the output dataset.
+        fmt (str): 'npy' for a typed columnar dataset (see dataset_io.py),
+            'csv' for a CSV file rounded to 2 decimals.
     """
     print("Starting data simulation...")
     # Set a seed for reproducibility
@@ -59,15 +63,14 @@ def simulate_solar_data(num_records=8760, output_path='../../data/historical_sol
         'power_output_kw': power_output_kw
     }
     df = pd.DataFrame(data)
-    df = df.round(2)
 
     # Ensure the output directory exists
     output_dir = os.path.dirname(output_path)
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    # Save to CSV
-    df.to_csv(output_path, index=False)
+    # Save the dataset
+    write_dataset(df, output_path, fmt=fmt, csv_decimals=2)
     print(f"Successfully generated {len(df)} records.")
     print(f"Data saved to: {os.path.abspath(output_path)}")
 
@@ -77,6 +80,11 @@ if __name__ == '__main__':
     # backend/ml_training/scripts/ -> backend/data/
     script_dir = os.path.dirname(__file__)
     data_dir = os.path.join(script_dir, '..', '..', 'data')
-    output_file_path = os.path.join(data_dir, 'historical_solar_data.csv')
-    
-    simulate_solar_data(output_path=output_file_path)
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="Simulate historical solar panel data.")
+    parser.add_argument('--format', choices=FORMATS, default='npy',
+                        help="'npy' writes a typed columnar dataset for training (default); 'csv' writes text.")
+    args = parser.parse_args()
+
+    output_file_path = os.path.join(data_dir, 'historical_solar_data' + ('.csv' if args.format == 'csv' else ''))
+    simulate_solar_data(output_path=output_file_path, fmt=args.format)
\ No newline at end of file
@@ -1,81 +1,181 @@
 import pandas as pd
 import numpy as np
+import argparse
 import os
+from dataset_io import FORMATS, ColumnarWriter
 
-def simulate_loss_data(num_records=8760*2, output_path='../../data/historical_loss_data.csv'):
+# How many rows are simulated (and held in memory) at a time in streaming mode
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+def _skip_draws(random_state, draw, count, chunk_size):
+    """Advances `random_state` past `count` draws of `draw` in bounded memory."""
+    for start in range(0, count, chunk_size):
+        draw(random_state, min(chunk_size, count - start))
+
+
+def _soiling_table(table, max_offset, step_days):
+    """
+    Extends `table` so that table[k] is the days-since-cleaning value k steps
+    after a cleaning. Values are built by repeated addition of `step_days`,
+    exactly like the original hour-by-hour loop, so results are bit-identical.
+    """
+    if max_offset < len(table):
+        return table
+    extra = np.full(max_offset + 1 - len(table), step_days)
+    extension = np.add.accumulate(np.concatenate(([table[-1]], extra)))[1:]
+    return np.concatenate((table, extension))
+
+
+def iter_loss_data(num_records=8760*2, freq='h', chunk_size=None, seed=42, start='2023-01-01'):
+    """
+    Yields the simulated loss dataset as DataFrames of at most `chunk_size`
+    rows, unrounded.
+
+    Rows match the original single-pass simulation bit for bit for a given
+    seed, whatever the chunk size: the temperature, cloud-cover and rain
+    draws each come from their own copy of the seeded random stream, advanced
+    to the position the single-pass version would have drawn them from.
+    """
+    if chunk_size is None:
+        chunk_size = num_records
+    step = pd.tseries.frequencies.to_offset(freq)
+    step_hours = pd.Timedelta(step).total_seconds() / 3600
+    start = pd.Timestamp(start)
+
+    # Rain probability and soiling increment per step (1% per hour, 1/24 day per hour)
+    rain_probability = 0.01 * step_hours
+    step_days = step_hours / 24.0
+
+    # The original draws, in order: all temperature noise, all cloud cover,
+    # then one rain draw per record after the first.
+    temperature_rng = np.random.RandomState(seed)
+    cloud_rng = np.random.RandomState(seed)
+    _skip_draws(cloud_rng, lambda rs, k: rs.normal(0, 2, k), num_records, chunk_size)
+    rain_rng = np.random.RandomState(seed)
+    _skip_draws(rain_rng, lambda rs, k: rs.normal(0, 2, k), num_records, chunk_size)
+    _skip_draws(rain_rng, lambda rs, k: rs.uniform(0, 100, k), num_records, chunk_size)
+
+    soiling_table = np.zeros(1)
+    steps_since_cleaning = 0
+
+    for chunk_start in range(0, num_records, chunk_size):
+        size = min(chunk_size, num_records - chunk_start)
+        timestamps = pd.date_range(start=start + chunk_start * step, periods=size, freq=step)
+
+        # --- Base Ideal Conditions (same as before) ---
+        day_of_year = timestamps.dayofyear
+        hour_of_day = timestamps.hour
+        temperature_celsius = 25 + (15 * np.sin(2 * np.pi * (day_of_year % 365 - 80) / 365)) + (5 * np.sin(2 * np.pi * (hour_of_day - 6) / 24)) + temperature_rng.normal(0, 2, size)
+        cloud_cover_percentage = cloud_rng.uniform(0, 100, size)
+
+        # Ideal Power Calculation
+        base_power = 10 * np.sin(np.pi * hour_of_day / 24) * (1 - cloud_cover_percentage / 120)
+        temp_factor = 1 - 0.005 * np.maximum(0, temperature_celsius - 25)
+        ideal_power_kw = np.maximum(0, base_power * temp_factor)
+
+        # --- Introduce Factors Causing Loss ---
+
+        # 1. Soiling (Dirt on Panels)
+        # Dirt accumulates every step and is reset by "cleaning" (rain).
+        # Draw every rain event at once, then count the steps since the most
+        # recent one instead of walking the records one by one.
+        rained = np.zeros(size, dtype=bool)
+        if chunk_start == 0:
+            rained[0] = True  # The panels start out clean
+            rained[1:] = rain_rng.rand(size - 1) < rain_probability
+        else:
+            rained[:] = rain_rng.rand(size) < rain_probability
+        positions = np.arange(size)
+        last_cleaning = np.maximum.accumulate(np.where(rained, positions, -1))
+        offsets = np.where(last_cleaning >= 0, positions - last_cleaning, steps_since_cleaning + 1 + positions)
+        steps_since_cleaning = int(offsets[-1])
+        soiling_table = _soiling_table(soiling_table, int(offsets.max()), step_days)
+        days_since_cleaning = soiling_table[offsets]
+
+        # Soiling Loss: Efficiency drops by 0.3% for each day without cleaning, max 20% loss
+        soiling_loss_factor = 1 - np.minimum(0.20, days_since_cleaning * 0.003)
+
+        # 2. Degradation (Aging of Panels)
+        # Panel loses a small amount of efficiency each day. 0.5% per year.
+        panel_age_in_days = (timestamps - start).days
+        degradation_loss_factor = 1 - (panel_age_in_days / 365 * 0.005)
+
+        # --- Calculate Actual Power and Energy Loss ---
+        actual_power_kw = ideal_power_kw * soiling_loss_factor * degradation_loss_factor
+
+        # The target variable for our new model
+        energy_loss_kw = ideal_power_kw - actual_power_kw
+
+        # --- Create DataFrame ---
+        data = {
+            'timestamp': timestamps,
+            'temperature_celsius': temperature_celsius,
+            'cloud_cover_percentage': cloud_cover_percentage,
+            'panel_age_in_days': panel_age_in_days,
+            'days_since_cleaning': days_since_cleaning,
+            'ideal_power_kw': ideal_power_kw,
+            'actual_power_kw': actual_power_kw,
+            'energy_loss_kw': energy_loss_kw
+        }
+        yield pd.DataFrame(data)
+
+
+def simulate_loss_data(num_records=8760*2, output_path='../../data/historical_loss_data',
+                       freq='h', chunk_size=None, seed=42, start='2023-01-01', fmt='npy'):
     """
     Generates simulated solar data including soiling and degradation effects
     to train a loss prediction model.
+
+    With `chunk_size` set, the data is simulated and appended to the output
+    one chunk at a time, so arbitrarily long horizons fit in bounded memory.
+    `fmt='npy'` writes a columnar dataset (see dataset_io.py); `fmt='csv'`
+    writes the original CSV, rounded to 3 decimals.
     """
     print("Starting loss data simulation...")
-    np.random.seed(42)
-
-    # Simulate 2 years of data to see degradation effects
-    timestamps = pd.date_range(start='2023-01-01', periods=num_records, freq='h')
-    # print(timestamps)
-
-    # --- Base Ideal Conditions (same as before) ---
-    day_of_year = timestamps.dayofyear
-    hour_of_day = timestamps.hour
-    temperature_celsius = 25 + (15 * np.sin(2 * np.pi * (day_of_year % 365 - 80) / 365)) + (5 * np.sin(2 * np.pi * (hour_of_day - 6) / 24)) + np.random.normal(0, 2, num_records)
-    cloud_cover_percentage = np.random.uniform(0, 100, num_records)
-    panel_angle_degrees = 35 # Fixed optimal angle for simplicity
-
-    # Ideal Power Calculation
-    base_power = 10 * np.sin(np.pi * hour_of_day / 24) * (1 - cloud_cover_percentage / 120)
-    temp_factor = 1 - 0.005 * np.maximum(0, temperature_celsius - 25)
-    ideal_power_kw = np.maximum(0, base_power * temp_factor)
-
-    # --- Introduce Factors Causing Loss ---
-    
-    # 1. Soiling (Dirt on Panels)
-    # Simulates dirt accumulating over time, then being reset by "cleaning" (rain)
-    days_since_cleaning = np.zeros(num_records)
-    for i in range(1, num_records):
-        # 1% chance of rain/cleaning each hour
-        if np.random.rand() < 0.01:
-            days_since_cleaning[i] = 0
-        else:
-            # Add an hour's worth of days
-            days_since_cleaning[i] = days_since_cleaning[i-1] + 1/24.0
-    
-    # Soiling Loss: Efficiency drops by 0.3% for each day without cleaning, max 20% loss
-    soiling_loss_factor = 1 - np.minimum(0.20, days_since_cleaning * 0.003)
-
-    # 2. Degradation (Aging of Panels)
-    # Panel loses a small amount of efficiency each day. 0.5% per year.
-    panel_age_in_days = (timestamps - timestamps[0]).days
-    degradation_loss_factor = 1 - (panel_age_in_days / 365 * 0.005)
-
-    # --- Calculate Actual Power and Energy Loss ---
-    actual_power_kw = ideal_power_kw * soiling_loss_factor * degradation_loss_factor
-    
-    # The target variable for our new model
-    energy_loss_kw = ideal_power_kw - actual_power_kw
-
-    # --- Create DataFrame ---
-    data = {
-        'timestamp': timestamps,
-        'temperature_celsius': temperature_celsius,
-        'cloud_cover_percentage': cloud_cover_percentage,
-        'panel_age_in_days': panel_age_in_days,
-        'days_since_cleaning': days_since_cleaning,
-        'ideal_power_kw': ideal_power_kw,
-        'actual_power_kw': actual_power_kw,
-        'energy_loss_kw': energy_loss_kw 
-    }
-    df = pd.DataFrame(data).round(3)
-
-    # Save to a new CSV
+
     output_dir = os.path.dirname(output_path)
-    if not os.path.exists(output_dir):
+    if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir)
-    df.to_csv(output_path, index=False)
-    print(f"Successfully generated {len(df)} records of loss data.")
+
+    writer = ColumnarWriter(output_path, num_records) if fmt == 'npy' else None
+    records_written = 0
+    for chunk in iter_loss_data(num_records, freq=freq, chunk_size=chunk_size, seed=seed, start=start):
+        if writer is not None:
+            writer.write(chunk)
+        else:
+            chunk = chunk.round({column: 3 for column in chunk.columns if column != 'timestamp'})
+            chunk.to_csv(output_path, index=False, mode='w' if records_written == 0 else 'a',
+                         header=records_written == 0, date_format='%Y-%m-%d %H:%M:%S')
+        records_written += len(chunk)
+        if chunk_size is not None:
+            print(f"  ...{records_written}/{num_records} records written")
+    if writer is not None:
+        writer.close()
+
+    print(f"Successfully generated {records_written} records of loss data.")
     print(f"Data saved to: {os.path.abspath(output_path)}")
 
+
 if __name__ == '__main__':
     script_dir = os.path.dirname(__file__)
     data_dir = os.path.join(script_dir, '..', '..', 'data')
-    output_file_path = os.path.join(data_dir, 'historical_loss_data.csv')
-    simulate_loss_data(output_path=output_file_path)
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="Simulate solar panel loss data.")
+    parser.add_argument('--records', type=int, default=8760*2,
+                        help="Number of records to generate (default: 2 years of hourly data).")
+    parser.add_argument('--freq', default='h',
+                        help="Time between records as a pandas frequency, e.g. 'h' or '15min' (default: 'h').")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help=f"Stream the output in chunks of this many rows (e.g. {DEFAULT_CHUNK_SIZE}) "
+                             "to keep memory bounded. Output is identical to an unchunked run.")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed (default: 42).")
+    parser.add_argument('--format', choices=FORMATS, default='npy',
+                        help="'npy' writes a typed columnar dataset for training (default); 'csv' writes text.")
+    parser.add_argument('--output', default=None,
+                        help="Output path (default: data/historical_loss_data, plus .csv for CSV output).")
+    args = parser.parse_args()
+
+    output_path = args.output or os.path.join(data_dir, 'historical_loss_data' + ('.csv' if args.format == 'csv' else ''))
+    simulate_loss_data(num_records=args.records, output_path=output_path, freq=args.freq,
+                       chunk_size=args.chunk_size, seed=args.seed, fmt=args.format)
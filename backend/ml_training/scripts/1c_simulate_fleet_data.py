@@ -0,0 +1,192 @@
+import pandas as pd
+import numpy as np
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from dataset_io import FORMATS, write_dataset
+
+# Defaults for optional columns of the panel spec table
+SPEC_DEFAULTS = {
+    'panel_angle_degrees': 35,
+    'soiling_rate_per_day': 0.003,
+    'rain_probability_per_hour': 0.01,
+    'base_temperature_celsius': 25,
+    'temperature_amplitude_celsius': 15,
+}
+
+
+def load_panel_specs(spec_path):
+    """
+    Reads the panel spec table. `panel_id` and `install_date` are required;
+    every other column falls back to SPEC_DEFAULTS.
+    """
+    specs = pd.read_csv(spec_path, parse_dates=['install_date'])
+    missing = {'panel_id', 'install_date'} - set(specs.columns)
+    if missing:
+        raise ValueError(f"Panel spec table is missing required columns: {sorted(missing)}")
+    if specs['panel_id'].duplicated().any():
+        raise ValueError("Panel spec table has duplicate panel_id values.")
+    for column, default in SPEC_DEFAULTS.items():
+        if column not in specs.columns:
+            specs[column] = default
+        specs[column] = specs[column].fillna(default)
+    return specs
+
+
+def shard_name(index, panel_id, fmt):
+    """
+    File name of a panel's shard: its position in the spec table, plus the
+    panel ID with everything but letters, digits, '-' and '_' replaced, so an
+    ID such as '../x' cannot point outside the output directory. The
+    position keeps names unique when two IDs sanitize to the same text.
+    """
+    safe_id = re.sub(r'[^A-Za-z0-9_-]+', '_', str(panel_id))[:64]
+    return f"panel_{index:05d}_{safe_id}" + ('.csv' if fmt == 'csv' else '')
+
+
+def simulate_panel(spec, timestamps, rng):
+    """
+    Simulates one panel over `timestamps` with its own random stream `rng`.
+    Same physics as 1b_simulate_loss_data.py, parameterised by the panel spec.
+    Rows before the panel's install date are dropped.
+    """
+    timestamps = timestamps[timestamps >= spec['install_date']]
+    num_records = len(timestamps)
+    step_hours = (timestamps[1] - timestamps[0]).total_seconds() / 3600 if num_records > 1 else 1.0
+
+    # --- Climate ---
+    day_of_year = timestamps.dayofyear
+    hour_of_day = timestamps.hour
+    seasonal = spec['temperature_amplitude_celsius'] * np.sin(2 * np.pi * (day_of_year % 365 - 80) / 365)
+    daily = 5 * np.sin(2 * np.pi * (hour_of_day - 6) / 24)
+    temperature_celsius = spec['base_temperature_celsius'] + seasonal + daily + rng.normal(0, 2, num_records)
+    cloud_cover_percentage = rng.uniform(0, 100, num_records)
+
+    # --- Ideal Power (tilt angle: 30-40 degrees is optimal) ---
+    base_power = 10 * np.sin(np.pi * hour_of_day / 24) * (1 - cloud_cover_percentage / 120)
+    temp_factor = 1 - 0.005 * np.maximum(0, temperature_celsius - 25)
+    angle_factor = 1 - 0.01 * abs(spec['panel_angle_degrees'] - 35)
+    ideal_power_kw = np.maximum(0, base_power * temp_factor * angle_factor)
+
+    # --- Soiling: reset by rain, counted in steps since the last rain ---
+    rained = rng.random(num_records) < spec['rain_probability_per_hour'] * step_hours
+    rained[:1] = True  # Panels start the simulation clean
+    positions = np.arange(num_records)
+    last_cleaning = np.maximum.accumulate(np.where(rained, positions, 0))
+    days_since_cleaning = (positions - last_cleaning) * (step_hours / 24.0)
+    soiling_loss_factor = 1 - np.minimum(0.20, days_since_cleaning * spec['soiling_rate_per_day'])
+
+    # --- Degradation: 0.5% per year since installation ---
+    panel_age_in_days = (timestamps - spec['install_date']).days
+    degradation_loss_factor = 1 - (panel_age_in_days / 365 * 0.005)
+
+    actual_power_kw = ideal_power_kw * soiling_loss_factor * degradation_loss_factor
+    energy_loss_kw = ideal_power_kw - actual_power_kw
+
+    data = {
+        'timestamp': timestamps,
+        'panel_id': spec['panel_id'],
+        'temperature_celsius': temperature_celsius,
+        'cloud_cover_percentage': cloud_cover_percentage,
+        'panel_angle_degrees': spec['panel_angle_degrees'],
+        'panel_age_in_days': panel_age_in_days,
+        'days_since_cleaning': days_since_cleaning,
+        'ideal_power_kw': ideal_power_kw,
+        'actual_power_kw': actual_power_kw,
+        'energy_loss_kw': energy_loss_kw,
+    }
+    return pd.DataFrame(data)
+
+
+def _simulate_shard(index, spec, seed_sequence, start, num_records, freq, output_dir, fmt):
+    """Worker: simulates one panel and writes its shard. Returns the manifest entry."""
+    started = time.perf_counter()
+    timestamps = pd.date_range(start=start, periods=num_records, freq=freq)
+    df = simulate_panel(spec, timestamps, np.random.default_rng(seed_sequence))
+
+    name = shard_name(index, spec['panel_id'], fmt)
+    write_dataset(df, os.path.join(output_dir, name), fmt=fmt)
+    return {
+        'panel_id': spec['panel_id'],
+        'path': name,
+        'records': len(df),
+        'seed_spawn_key': list(seed_sequence.spawn_key),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def simulate_fleet(spec_path, output_dir, num_records=8760*2, freq='h', start='2023-01-01',
+                   seed=42, max_workers=None, fmt='npy'):
+    """
+    Simulates every panel in the spec table in a process pool, one shard per
+    panel, and writes a `manifest.json` describing the run.
+
+    Each panel gets an independent random stream spawned from one
+    SeedSequence, in spec-table order, so results are reproducible no matter
+    how many workers run them or in which order they finish.
+    """
+    print("Starting fleet simulation...")
+    specs = load_panel_specs(spec_path)
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(specs))
+    os.makedirs(output_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    spec_records = [
+        {**row, 'install_date': pd.Timestamp(row['install_date'])}
+        for row in specs.to_dict(orient='records')
+    ]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_simulate_shard, index, spec, seed_sequence, start, num_records, freq, output_dir, fmt)
+            for index, (spec, seed_sequence) in enumerate(zip(spec_records, seed_sequences))
+        ]
+        shards = []
+        for future in futures:
+            shard = future.result()
+            shards.append(shard)
+            print(f"  panel {shard['panel_id']}: {shard['records']} records in {shard['seconds']}s")
+    elapsed = time.perf_counter() - started
+
+    manifest = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'spec_path': os.path.abspath(spec_path),
+        'seed': seed,
+        'start': str(pd.Timestamp(start)),
+        'freq': freq,
+        'format': fmt,
+        'records_per_panel': num_records,
+        'total_records': sum(shard['records'] for shard in shards),
+        'shards': shards,
+    }
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Successfully simulated {len(shards)} panels ({manifest['total_records']} records) in {elapsed:.1f}s.")
+    print(f"Shards and manifest saved to: {os.path.abspath(output_dir)}")
+    return manifest
+
+
+if __name__ == '__main__':
+    script_dir = os.path.dirname(__file__)
+    data_dir = os.path.join(script_dir, '..', '..', 'data')
+
+    parser = argparse.ArgumentParser(description="Simulate loss data for a heterogeneous fleet of panels.")
+    parser.add_argument('--spec', default=os.path.join(data_dir, 'fleet_panel_specs.csv'),
+                        help="Panel spec table (CSV, one row per panel).")
+    parser.add_argument('--output-dir', default=os.path.join(data_dir, 'fleet'),
+                        help="Directory for the per-panel shards and manifest.json.")
+    parser.add_argument('--records', type=int, default=8760*2, help="Records per panel (default: 2 years hourly).")
+    parser.add_argument('--freq', default='h', help="Time between records, e.g. 'h' or '15min'.")
+    parser.add_argument('--start', default='2023-01-01', help="First timestamp of the simulation.")
+    parser.add_argument('--seed', type=int, default=42, help="Root seed for the whole fleet (default: 42).")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument('--format', choices=FORMATS, default='npy',
+                        help="Shard format: 'npy' columnar datasets (default) or 'csv'.")
+    args = parser.parse_args()
+
+    simulate_fleet(args.spec, args.output_dir, num_records=args.records, freq=args.freq,
+                   start=args.start, seed=args.seed, max_workers=args.workers, fmt=args.format)
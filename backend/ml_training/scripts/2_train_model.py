@@ -1,34 +1,20 @@
 import pandas as pd
-from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import r2_score
+import argparse
 import joblib
 import os
+from dataset_io import resolve_dataset_path
+from feature_store import load_features
 
-def train_model(data_path='../../data/historical_solar_data.csv', model_output_path='../../ml_training/saved_model/solar_efficiency_model.pkl'):
+def train_model(data_path='../../data/historical_solar_data.csv', model_output_path='../../ml_training/saved_model/solar_efficiency_model.pkl',
+                refresh_features=False):
     """
     Loads data, trains a model to predict power output, and saves the model.
     """
     print("Starting model training...")
-    
-    # 1. Load Data
-    try:
-        df = pd.read_csv(data_path, parse_dates=['timestamp'])
-        print(f"Data loaded successfully from {data_path}")
-    except FileNotFoundError:
-        print(f"Error: Data file not found at {data_path}")
-        print("Please run '1_simulate_historical_data.py' first.")
-        return
-
-    # 2. Feature Engineering
-    df['hour'] = df['timestamp'].dt.hour
-    df['day_of_year'] = df['timestamp'].dt.dayofyear
-    df['month'] = df['timestamp'].dt.month
 
-    # Sort data by timestamp to prepare for time-series split
-    df = df.sort_values(by='timestamp').reset_index(drop=True)
-
-    # 3. Define Features (X) and Target (y)
+    # 1. Define Features (X) and Target (y)
     # CORRECTED: 'uv_index' is now removed to prevent data leakage.
     features = [
         'temperature_celsius', 
@@ -40,16 +26,28 @@ def train_model(data_path='../../data/historical_solar_data.csv', model_output_p
     ]
     target = 'power_output_kw'
 
-    X = df[features]
-    y = df[target]
+    # 2. Load Data
+    # The feature matrix comes from the feature store: built once from the
+    # needed columns (rows sorted by timestamp, ready for the time-series
+    # split) and read back from the cache on later runs.
+    try:
+        X, y = load_features(data_path, features, target, sort_by='timestamp', refresh=refresh_features)
+        print(f"Data loaded successfully from {data_path}")
+    except FileNotFoundError:
+        print(f"Error: Data file not found at {data_path}")
+        print("Please run '1_simulate_historical_data.py' first.")
+        return
+
+    # 3. Keep the feature names, so the model records them
+    X = pd.DataFrame(X, columns=features, copy=False)
     print("Features and target defined. 'uv_index' has been correctly excluded.")
 
     # 4. Split Data using Time-Series method
-    split_index = int(len(df) * 0.8)
+    split_index = int(len(X) * 0.8)
     X_train = X.iloc[:split_index]
     X_test = X.iloc[split_index:]
-    y_train = y.iloc[:split_index]
-    y_test = y.iloc[split_index:]
+    y_train = y[:split_index]
+    y_test = y[split_index:]
     
     print(f"Data split using time-series method: {len(X_train)} training records and {len(X_test)} testing records.")
 
@@ -77,7 +75,13 @@ def train_model(data_path='../../data/historical_solar_data.csv', model_output_p
 
 if __name__ == '__main__':
     script_dir = os.path.dirname(__file__)
-    data_file_path = os.path.join(script_dir, '..', '..', 'data', 'historical_solar_data.csv')
+    data_file_path = resolve_dataset_path(os.path.join(script_dir, '..', '..', 'data', 'historical_solar_data'))
     model_save_path = os.path.join(script_dir, '..', 'saved_model', 'solar_efficiency_model.pkl')
-    
-    train_model(data_path=data_file_path, model_output_path=model_save_path)
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="Train the solar power output model.")
+    parser.add_argument('--data', default=data_file_path, help="Dataset path (columnar directory or CSV).")
+    parser.add_argument('--output', default=model_save_path, help="Where to save the trained model.")
+    parser.add_argument('--refresh-features', action='store_true', help="Rebuild the cached feature matrix.")
+    args = parser.parse_args()
+
+    train_model(data_path=args.data, model_output_path=args.output, refresh_features=args.refresh_features)
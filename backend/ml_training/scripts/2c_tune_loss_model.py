@@ -0,0 +1,285 @@
+"""
+Hyperparameter search for the loss model with time-series cross-validation.
+
+Every candidate (tree count, max depth, min samples per leaf) is trained on
+rolling time-ordered folds: each fold trains on a fixed-size window of past
+rows and is scored on the rows that follow it, so no fold ever sees the
+future and every fold trains on as much data as the others. The window is
+as long as the first fold's history unless --max-train-rows sets it;
+--expanding trains each fold on all rows before its test window instead. The
+(candidate, fold) fits run in a process pool. Workers memory-map the feature
+store's cached matrix instead of receiving a copy of it.
+
+Each finished fold is appended to a results file, so an interrupted search
+picks up where it stopped when rerun with the same arguments.
+
+Alongside the MAE, every candidate's inference latency is measured with the
+NumPy forest evaluator the API serves by default. Candidates on the
+accuracy/latency frontier (no other candidate is both more accurate and
+faster) are marked. Latencies are measured while other folds train; use
+--workers 1 for the cleanest timings.
+
+Run from the scripts directory:
+    python 2c_tune_loss_model.py                          # default grid
+    python 2c_tune_loss_model.py --random 10              # 10 random candidates from the grid
+    python 2c_tune_loss_model.py --trees 25 50 --depths 8 12 none --min-samples-leaf 1 10
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import TimeSeriesSplit
+from dataset_io import resolve_dataset_path
+from feature_store import ensure_features, open_features
+
+# The evaluator lives with the serving code; make 'services' importable
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..', '..'))
+from services.forest_evaluator import ForestEvaluator, flatten_forest
+
+# Same features, in the same order, as 2b_train_loss_model.py
+FEATURES = [
+    'temperature_celsius',
+    'cloud_cover_percentage',
+    'panel_age_in_days',
+    'days_since_cleaning',
+    'hour',
+    'day_of_year'
+]
+TARGET = 'energy_loss_kw'
+
+DEFAULT_GRID = {
+    'n_estimators': [25, 50, 100],
+    'max_depth': [8, 10, 14, None],
+    'min_samples_leaf': [1, 5, 20],
+}
+
+# Rows per batch for the batch latency measurement
+LATENCY_BATCH_ROWS = 1000
+
+# Set in each worker by _init_worker: the shared, memory-mapped training data
+_X = None
+_y = None
+
+
+def rolling_folds(num_rows, n_folds, max_train_rows=None, expanding=False):
+    """
+    Time-ordered folds as (train_start, train_end, test_start, test_end)
+    row bounds. Each test window follows its training window, which rolls
+    forward with a fixed size: `max_train_rows`, or by default all the rows
+    the first fold has. With `expanding=True` (and no `max_train_rows`) the
+    training window grows to every row before the test window instead.
+    """
+    if max_train_rows is None and not expanding:
+        # TimeSeriesSplit's first training window; later folds keep its size
+        max_train_rows = num_rows - n_folds * (num_rows // (n_folds + 1))
+    splitter = TimeSeriesSplit(n_splits=n_folds, max_train_size=max_train_rows)
+    return [
+        (int(train[0]), int(train[-1]) + 1, int(test[0]), int(test[-1]) + 1)
+        for train, test in splitter.split(np.empty((num_rows, 1)))
+    ]
+
+
+def candidate_grid(grid):
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def sample_candidates(grid, num_candidates, seed):
+    """`num_candidates` distinct candidates drawn at random from the grid."""
+    candidates = candidate_grid(grid)
+    return random.Random(seed).sample(candidates, min(num_candidates, len(candidates)))
+
+
+def _init_worker(entry_dir):
+    global _X, _y
+    _X, _y = open_features(entry_dir)
+
+
+def median_seconds(func, repeats):
+    func()
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings[i] = time.perf_counter() - start
+    return float(np.median(timings))
+
+
+def evaluate_fold(params, bounds, latency_repeats):
+    """Fits one candidate on one fold's training rows and scores it on the fold's test rows."""
+    train_start, train_end, test_start, test_end = bounds
+    # Slices of the memory map: views, not copies
+    X_train, y_train = _X[train_start:train_end], _y[train_start:train_end]
+    X_test, y_test = _X[test_start:test_end], _y[test_start:test_end]
+
+    started = time.perf_counter()
+    model = RandomForestRegressor(random_state=42, n_jobs=1, **params)
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+
+    evaluator = ForestEvaluator(flatten_forest(model))
+    predictions = evaluator.predict(X_test)
+    single_row = np.ascontiguousarray(X_test[:1])
+    batch = np.ascontiguousarray(X_test[:LATENCY_BATCH_ROWS])
+    return {
+        'mae_kw': float(np.abs(predictions - y_test).mean()),
+        'fit_seconds': fit_seconds,
+        'nodes': int(sum(tree.tree_.node_count for tree in model.estimators_)),
+        'single_row_us': median_seconds(lambda: evaluator.predict(single_row), latency_repeats) * 1e6,
+        'batch_ms': median_seconds(lambda: evaluator.predict(batch), max(latency_repeats // 20, 5)) * 1e3,
+    }
+
+
+def task_key(params, bounds):
+    return json.dumps({'params': params, 'bounds': list(bounds)}, sort_keys=True)
+
+
+def load_finished(results_path):
+    """Fold results already in the results file, by task key."""
+    finished = {}
+    if os.path.exists(results_path):
+        with open(results_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by an interrupted run
+                finished[record['key']] = record
+    return finished
+
+
+def pareto_front(rows):
+    """Marks rows no other row beats on both MAE and single-row latency."""
+    for row in rows:
+        row['frontier'] = not any(
+            other['mae_kw'] <= row['mae_kw'] and other['single_row_us'] <= row['single_row_us']
+            and (other['mae_kw'] < row['mae_kw'] or other['single_row_us'] < row['single_row_us'])
+            for other in rows
+        )
+    return rows
+
+
+def summarize(candidates, folds, finished):
+    rows = []
+    for params in candidates:
+        records = [finished[task_key(params, bounds)] for bounds in folds]
+        maes = [record['mae_kw'] for record in records]
+        rows.append({
+            'params': params,
+            'mae_kw': float(np.mean(maes)),
+            'mae_std_kw': float(np.std(maes)),
+            'single_row_us': float(np.median([record['single_row_us'] for record in records])),
+            'batch_ms': float(np.median([record['batch_ms'] for record in records])),
+            'nodes': int(np.mean([record['nodes'] for record in records])),
+            'fit_seconds': float(np.mean([record['fit_seconds'] for record in records])),
+        })
+    return sorted(pareto_front(rows), key=lambda row: row['mae_kw'])
+
+
+def tune_loss_model(data_path, candidates, n_folds=4, max_train_rows=None, expanding=False, max_workers=None,
+                    results_path=None, latency_repeats=200, fresh=False):
+    """
+    Evaluates every candidate on every fold and returns one summary row per
+    candidate, most accurate first.
+    """
+    print(f"Starting hyperparameter search: {len(candidates)} candidates x {n_folds} folds...")
+    entry_dir = ensure_features(data_path, FEATURES, TARGET, sort_by='timestamp')
+    X, _ = open_features(entry_dir)
+    folds = rolling_folds(len(X), n_folds, max_train_rows, expanding)
+
+    # Results are kept per dataset version, next to nothing else
+    if results_path is None:
+        results_dir = os.path.join(script_dir, '..', 'tuning')
+        os.makedirs(results_dir, exist_ok=True)
+        results_path = os.path.join(results_dir, f'loss_model_{os.path.basename(entry_dir)}.jsonl')
+    if fresh and os.path.exists(results_path):
+        os.remove(results_path)
+    finished = load_finished(results_path)
+
+    tasks = [(params, bounds) for params in candidates for bounds in folds
+             if task_key(params, bounds) not in finished]
+    print(f"{len(candidates) * len(folds) - len(tasks)} fold results reused from {os.path.abspath(results_path)}; "
+          f"{len(tasks)} to run.")
+
+    started = time.perf_counter()
+    with open(results_path, 'a') as results_file, \
+            ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(entry_dir,)) as pool:
+        futures = {pool.submit(evaluate_fold, params, bounds, latency_repeats): (params, bounds)
+                   for params, bounds in tasks}
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                params, bounds = futures[future]
+                record = {'key': task_key(params, bounds), **future.result()}
+                results_file.write(json.dumps(record) + '\n')
+                results_file.flush()
+                finished[record['key']] = record
+                print(f"  ...{done}/{len(tasks)} folds done ({time.perf_counter() - started:.0f}s)")
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            print(f"Interrupted. {len(finished)} fold results saved; rerun the same command to resume.")
+            raise
+
+    rows = summarize(candidates, folds, finished)
+    print_summary(rows, folds)
+    return rows
+
+
+def print_summary(rows, folds):
+    train_rows = [train_end - train_start for train_start, train_end, _, _ in folds]
+    window = (f"training windows of {train_rows[0]} rows" if len(set(train_rows)) == 1
+              else f"expanding training windows of {train_rows[0]}-{train_rows[-1]} rows")
+    print(f"\n{len(folds)} time-series folds; {window}, test windows of {folds[0][3] - folds[0][2]} rows. "
+          f"* = on the accuracy/latency frontier.")
+    print(f"{'trees':>6}{'depth':>7}{'leaf':>6}{'MAE (kW)':>10}{'± std':>9}{'1 row (us)':>12}"
+          f"{f'{LATENCY_BATCH_ROWS} rows (ms)':>16}{'nodes':>9}{'fit (s)':>9}")
+    for row in rows:
+        params = row['params']
+        depth = params['max_depth'] if params['max_depth'] is not None else '-'
+        print(f"{params['n_estimators']:>6}{depth:>7}{params['min_samples_leaf']:>6}{row['mae_kw']:>10.4f}"
+              f"{row['mae_std_kw']:>9.4f}{row['single_row_us']:>12.0f}{row['batch_ms']:>16.2f}"
+              f"{row['nodes']:>9}{row['fit_seconds']:>9.2f}{'  *' if row['frontier'] else ''}")
+
+
+def parse_depth(value):
+    return None if value.lower() == 'none' else int(value)
+
+
+if __name__ == '__main__':
+    data_file_path = resolve_dataset_path(os.path.join(script_dir, '..', '..', 'data', 'historical_loss_data'))
+
+    parser = argparse.ArgumentParser(description="Tune the loss model with time-series cross-validation.")
+    parser.add_argument('--data', default=data_file_path, help="Dataset path (columnar directory or CSV).")
+    parser.add_argument('--trees', type=int, nargs='+', default=DEFAULT_GRID['n_estimators'],
+                        help="Tree counts to try.")
+    parser.add_argument('--depths', type=parse_depth, nargs='+', default=DEFAULT_GRID['max_depth'],
+                        help="Max depths to try ('none' for unlimited).")
+    parser.add_argument('--min-samples-leaf', type=int, nargs='+', default=DEFAULT_GRID['min_samples_leaf'],
+                        help="Minimum samples per leaf to try.")
+    parser.add_argument('--random', type=int, default=None, metavar='N',
+                        help="Evaluate N random candidates from the grid instead of all of them.")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for --random.")
+    parser.add_argument('--folds', type=int, default=4, help="Number of rolling time-series folds.")
+    parser.add_argument('--max-train-rows', type=int, default=None,
+                        help="Rows in the rolling training window (default: the first fold's history).")
+    parser.add_argument('--expanding', action='store_true',
+                        help="Train each fold on every earlier row instead of a fixed-size rolling window.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument('--results', default=None,
+                        help="Fold results file (default: ml_training/tuning/loss_model_<dataset key>.jsonl).")
+    parser.add_argument('--fresh', action='store_true', help="Discard earlier fold results instead of resuming.")
+    parser.add_argument('--latency-repeats', type=int, default=200, help="Timed single-row predictions per fold.")
+    args = parser.parse_args()
+
+    grid = {'n_estimators': args.trees, 'max_depth': args.depths, 'min_samples_leaf': args.min_samples_leaf}
+    candidates = sample_candidates(grid, args.random, args.seed) if args.random else candidate_grid(grid)
+    tune_loss_model(args.data, candidates, n_folds=args.folds, max_train_rows=args.max_train_rows,
+                    expanding=args.expanding, max_workers=args.workers, results_path=args.results,
+                    latency_repeats=args.latency_repeats, fresh=args.fresh)
@@ -1,22 +1,171 @@
 import joblib
 import skl2onnx
 import onnx
+import onnxruntime as ort
 from skl2onnx.common.data_types import FloatTensorType
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.model_selection import train_test_split
 import numpy as np
+import argparse
+import copy
+import gzip
 import os
+import time
+from dataset_io import load_table, resolve_dataset_path
 
-def convert_to_onnx():
+# Same features, in the same order, as 2b_train_loss_model.py
+FEATURES = [
+    'temperature_celsius',
+    'cloud_cover_percentage',
+    'panel_age_in_days',
+    'days_since_cleaning',
+    'hour',
+    'day_of_year'
+]
+TARGET = 'energy_loss_kw'
+
+# Attributes skl2onnx writes for every node although they only repeat the
+# ONNX defaults (hit rate 1.0, missing values go right). Dropping them does
+# not change predictions.
+DEFAULT_VALUED_ATTRIBUTES = ('nodes_hitrates', 'nodes_missing_value_tracks_true')
+
+
+def reduce_forest(model, n_estimators):
+    """The same forest, keeping only its first `n_estimators` trees."""
+    reduced = copy.copy(model)
+    reduced.estimators_ = model.estimators_[:n_estimators]
+    reduced.n_estimators = len(reduced.estimators_)
+    return reduced
+
+
+def distill_forest(model, X_train, n_estimators, max_depth):
+    """A smaller forest trained to reproduce the full model's predictions."""
+    student = RandomForestRegressor(n_estimators=n_estimators, max_depth=max_depth, random_state=42, n_jobs=-1)
+    student.fit(X_train, model.predict(X_train))
+    return student
+
+
+def round_mantissa(values, bits):
+    """Rounds float32 values to `bits` mantissa bits (float16 has 10), so they compress well."""
+    raw = np.asarray(values, dtype=np.float32).view(np.uint32)
+    drop = 23 - bits
+    half = np.uint32(1 << (drop - 1))
+    mask = np.uint32((0xFFFFFFFF >> drop) << drop)
+    return ((raw + half) & mask).view(np.float32)
+
+
+def compact_onnx(onnx_model, leaf_mantissa_bits=None):
+    """
+    Shrinks a converted tree ensemble in place: drops default-valued node
+    attributes and, optionally, stores leaf values with fewer mantissa bits.
+    """
+    for node in onnx_model.graph.node:
+        if not node.op_type.startswith('TreeEnsemble'):
+            continue
+        for attribute in list(node.attribute):
+            if attribute.name in DEFAULT_VALUED_ATTRIBUTES:
+                node.attribute.remove(attribute)
+            elif attribute.name == 'target_weights' and leaf_mantissa_bits is not None:
+                weights = round_mantissa(attribute.floats, leaf_mantissa_bits)
+                del attribute.floats[:]
+                attribute.floats.extend(weights.tolist())
+    return onnx_model
+
+
+def optimize_onnx(onnx_path):
+    """
+    Runs onnxruntime's offline graph optimizations and writes the result back.
+    Only the portable 'basic' level is used, so the file still runs in
+    onnxruntime-web in the browser.
+    """
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+    options.optimized_model_filepath = onnx_path
+    ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+    onnx.checker.check_model(onnx_path)
+
+
+def export_variant(model, onnx_path, leaf_mantissa_bits):
+    initial_type = [('float_input', FloatTensorType([None, len(FEATURES)]))]
+    onnx_model = skl2onnx.convert_sklearn(model, initial_types=initial_type)
+    compact_onnx(onnx_model, leaf_mantissa_bits)
+    with open(onnx_path, "wb") as f:
+        f.write(onnx_model.SerializeToString())
+    optimize_onnx(onnx_path)
+
+
+def median_seconds(func, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def evaluate_variant(onnx_path, X_holdout, y_holdout, reference):
+    """Size, load time, latency and parity of one exported file on the held-out rows."""
+    with open(onnx_path, 'rb') as f:
+        raw = f.read()
+    load_seconds = median_seconds(
+        lambda: ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider']), repeats=3
+    )
+    session = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+    input_name = session.get_inputs()[0].name
+    predictions = session.run(None, {input_name: X_holdout})[0].ravel()
+    batch = X_holdout[:1000]
+    diff = np.abs(predictions - reference)
+    return {
+        'size_mb': len(raw) / 1e6,
+        'gzip_mb': len(gzip.compress(raw)) / 1e6,
+        'load_ms': load_seconds * 1e3,
+        'batch_1000_ms': median_seconds(lambda: session.run(None, {input_name: batch}), repeats=20) * 1e3,
+        'max_abs_diff_kw': float(diff.max()),
+        'mean_abs_diff_kw': float(diff.mean()),
+        'mae_kw': float(np.abs(predictions - y_holdout).mean()),
+    }
+
+
+def parse_variant(spec):
+    """'full', 'trees:50' or 'distill:25x8' -> (name, kind, params)"""
+    if spec == 'full':
+        return 'full', 'full', {}
+    kind, _, value = spec.partition(':')
+    if kind == 'trees':
+        return f'trees_{int(value)}', kind, {'n_estimators': int(value)}
+    if kind == 'distill':
+        n_estimators, _, max_depth = value.partition('x')
+        return f'distill_{n_estimators}x{max_depth}', kind, {'n_estimators': int(n_estimators), 'max_depth': int(max_depth)}
+    raise ValueError(f"Unknown variant '{spec}'. Use full, trees:<n> or distill:<trees>x<depth>.")
+
+
+def convert_to_onnx(pkl_model_path=None, onnx_model_path=None, data_path=None, variants=('full',),
+                    ship='full', leaf_mantissa_bits=None, tolerance=1e-4, reduced_tolerance=0.005,
+                    holdout_rows=20000, distill_rows=100000):
     """
     Loads the trained .pkl model and converts it to .onnx format
     for use in the browser.
+
+    Every requested variant (the full forest, a forest cut to fewer trees, or
+    a smaller forest distilled from the full one) is converted, compacted,
+    graph-optimized and checked against the .pkl model on rows that
+    train_loss_model held out. The full forest must match within `tolerance`
+    kW on every row; reduced variants within `reduced_tolerance` kW on
+    average. The `ship` variant becomes loss_prediction_model.onnx, and only
+    if it passes.
+
+    Returns a list with one report dict per variant.
     """
     print("Starting model conversion to ONNX...")
 
     # Define paths
     script_dir = os.path.dirname(__file__)
     model_dir = os.path.join(script_dir, '..', 'saved_model')
-    pkl_model_path = os.path.join(model_dir, 'loss_prediction_model.pkl')
-    onnx_model_path = os.path.join(model_dir, 'loss_prediction_model.onnx')
+    pkl_model_path = pkl_model_path or os.path.join(model_dir, 'loss_prediction_model.pkl')
+    onnx_model_path = onnx_model_path or os.path.join(model_dir, 'loss_prediction_model.onnx')
+    data_path = data_path or resolve_dataset_path(os.path.join(script_dir, '..', '..', 'data', 'historical_loss_data'))
+    variants_dir = os.path.join(os.path.dirname(os.path.abspath(onnx_model_path)), 'onnx_variants')
+    os.makedirs(variants_dir, exist_ok=True)
 
     # 1. Load the scikit-learn model
     try:
@@ -24,23 +173,86 @@ def convert_to_onnx():
         print("Pickled model loaded successfully.")
     except FileNotFoundError:
         print(f"Error: Model file not found at {pkl_model_path}")
-        return
+        return []
+    model.set_params(n_jobs=1)
 
-    # 2. Define the input shape for the model
-    # Our model expects 6 features: ['temperature_celsius', 'cloud_cover_percentage', 
-    # 'panel_age_in_days', 'days_since_cleaning', 'hour', 'day_of_year']
-    # The shape is [None, 6], which means a variable number of inputs (batch size), each with 6 features.
-    initial_type = [('float_input', FloatTensorType([None, 6]))]
+    # 2. The rows train_loss_model held out (same split), for parity and accuracy
+    df = load_table(data_path, columns=FEATURES + [TARGET])
+    X = df[FEATURES].to_numpy(dtype=np.float32)
+    y = df[TARGET].to_numpy()
+    train_idx, holdout_idx = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+    holdout_idx = holdout_idx[:holdout_rows]
+    X_holdout, y_holdout = X[holdout_idx], y[holdout_idx]
+    reference = model.predict(X_holdout)
+    print(f"Checking parity on {len(holdout_idx)} held-out rows of {os.path.abspath(data_path)}")
 
-    # 3. Convert the model
-    print("Converting model to ONNX format...")
-    onnx_model = skl2onnx.convert_sklearn(model, initial_types=initial_type)
+    # 3. Convert, compact, optimize and evaluate every variant
+    reports = []
+    for spec in variants:
+        name, kind, params = parse_variant(spec)
+        print(f"Converting variant '{name}'...")
+        if kind == 'full':
+            variant_model = model
+        elif kind == 'trees':
+            variant_model = reduce_forest(model, params['n_estimators'])
+        else:
+            sample = np.random.default_rng(42).permutation(train_idx)[:distill_rows]
+            variant_model = distill_forest(model, X[sample], params['n_estimators'], params['max_depth'])
+
+        variant_path = os.path.join(variants_dir, f'{name}.onnx')
+        export_variant(variant_model, variant_path, leaf_mantissa_bits)
+        report = {'variant': name, 'trees': len(variant_model.estimators_),
+                  'nodes': int(sum(tree.tree_.node_count for tree in variant_model.estimators_)),
+                  'path': variant_path}
+        report.update(evaluate_variant(variant_path, X_holdout, y_holdout, reference))
+        if kind == 'full':
+            report['parity_ok'] = report['max_abs_diff_kw'] <= tolerance
+        else:
+            report['parity_ok'] = report['mean_abs_diff_kw'] <= reduced_tolerance
+        reports.append(report)
+
+    print_report(reports, tolerance, reduced_tolerance)
+
+    # 4. Ship the chosen variant as the final artifact
+    shipped = next((report for report in reports if report['variant'] == ship), None)
+    if shipped is None:
+        print(f"Error: variant '{ship}' was not exported; nothing shipped.")
+    elif not shipped['parity_ok']:
+        print(f"Error: variant '{ship}' failed the parity check; {onnx_model_path} was not updated.")
+    else:
+        with open(shipped['path'], 'rb') as src, open(onnx_model_path, 'wb') as dst:
+            dst.write(src.read())
+        print(f"Conversion successful. ONNX model ('{ship}') saved to: {os.path.abspath(onnx_model_path)}")
+    return reports
+
+
+def print_report(reports, tolerance, reduced_tolerance):
+    print(f"\nParity: full forest max |diff| <= {tolerance:g} kW; reduced variants mean |diff| <= {reduced_tolerance:g} kW")
+    print(f"{'variant':<16}{'trees':>6}{'nodes':>9}{'size MB':>9}{'gzip MB':>9}{'load ms':>9}"
+          f"{'1000 rows ms':>14}{'max diff':>10}{'mean diff':>11}{'MAE kW':>9}  parity")
+    for r in reports:
+        print(f"{r['variant']:<16}{r['trees']:>6}{r['nodes']:>9}{r['size_mb']:>9.2f}{r['gzip_mb']:>9.2f}"
+              f"{r['load_ms']:>9.1f}{r['batch_1000_ms']:>14.2f}{r['max_abs_diff_kw']:>10.2e}"
+              f"{r['mean_abs_diff_kw']:>11.2e}{r['mae_kw']:>9.4f}  {'ok' if r['parity_ok'] else 'FAIL'}")
 
-    # 4. Save the ONNX model
-    with open(onnx_model_path, "wb") as f:
-        f.write(onnx_model.SerializeToString())
-    
-    print(f"Conversion successful. ONNX model saved to: {os.path.abspath(onnx_model_path)}")
 
 if __name__ == '__main__':
-    convert_to_onnx()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Export the loss model to ONNX, with optional size-reduced variants.")
+    parser.add_argument('--variants', nargs='+', default=['full', 'trees:50', 'trees:25', 'distill:25x10'],
+                        help="Variants to export: full, trees:<n> (first n trees), distill:<trees>x<depth>.")
+    parser.add_argument('--ship', default='full',
+                        help="Variant saved as loss_prediction_model.onnx (default: full). Use the variant's "
+                             "name as printed, e.g. trees_50.")
+    parser.add_argument('--leaf-mantissa-bits', type=int, default=10,
+                        help="Store leaf values with this many mantissa bits (float16 precision: 10). "
+                             "Use 23 for lossless float32.")
+    parser.add_argument('--tolerance', type=float, default=1e-4,
+                        help="Max |diff| (kW) allowed between the full ONNX forest and the .pkl model.")
+    parser.add_argument('--reduced-tolerance', type=float, default=0.005,
+                        help="Mean |diff| (kW) allowed between a reduced variant and the .pkl model.")
+    parser.add_argument('--data', default=None, help="Dataset for the held-out parity check.")
+    args = parser.parse_args()
+
+    convert_to_onnx(data_path=args.data, variants=args.variants, ship=args.ship,
+                    leaf_mantissa_bits=None if args.leaf_mantissa_bits >= 23 else args.leaf_mantissa_bits,
+                    tolerance=args.tolerance, reduced_tolerance=args.reduced_tolerance)
@@ -0,0 +1,67 @@
+import joblib
+import numpy as np
+import pandas as pd
+import os
+import sys
+import time
+
+# The evaluator lives with the serving code; make 'services' importable
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(script_dir, '..', '..'))
+from services.forest_evaluator import ForestEvaluator, flatten_forest, save_forest
+
+
+def export_forest_arrays(pkl_model_path, npz_model_path, num_check_rows=10000):
+    """
+    Flattens the trained .pkl forest into compact node arrays (.npz) that the
+    API can serve without scikit-learn, and checks that the two give
+    identical predictions.
+    """
+    print("Starting forest export to NumPy arrays...")
+
+    # 1. Load the scikit-learn model
+    try:
+        model = joblib.load(pkl_model_path)
+        print("Pickled model loaded successfully.")
+    except FileNotFoundError:
+        print(f"Error: Model file not found at {pkl_model_path}")
+        return False
+
+    # 2. Flatten and save
+    arrays = flatten_forest(model)
+    save_forest(arrays, npz_model_path)
+    print(f"{len(arrays['roots'])} trees, {len(arrays['value'])} nodes, max depth {int(arrays['max_depth'])}.")
+
+    # 3. Verify: the exported arrays must reproduce the forest exactly
+    evaluator = ForestEvaluator.load(npz_model_path)
+    rng = np.random.default_rng(0)
+    X = np.column_stack([
+        rng.uniform(-5, 50, num_check_rows),       # temperature_celsius
+        rng.uniform(0, 100, num_check_rows),       # cloud_cover_percentage
+        rng.integers(0, 3650, num_check_rows),     # panel_age_in_days
+        rng.integers(0, 120, num_check_rows),      # days_since_cleaning
+        rng.integers(0, 24, num_check_rows),       # hour
+        rng.integers(1, 367, num_check_rows),      # day_of_year
+    ]).astype(np.float32)
+    model.set_params(n_jobs=1)
+    expected = model.predict(pd.DataFrame(X, columns=getattr(model, 'feature_names_in_', None)))
+    start = time.perf_counter()
+    actual = evaluator.predict(X)
+    elapsed = time.perf_counter() - start
+    if not np.array_equal(expected, actual):
+        os.remove(npz_model_path)
+        print(f"Error: exported arrays disagree with the model (max abs diff {np.max(np.abs(expected - actual)):.3e}).")
+        return False
+
+    print(f"Verified identical predictions on {num_check_rows} rows ({elapsed * 1e3:.1f} ms for the batch).")
+    print(f"Export successful ({os.path.getsize(npz_model_path) / 1e6:.2f} MB vs "
+          f"{os.path.getsize(pkl_model_path) / 1e6:.2f} MB pickle). Saved to: {os.path.abspath(npz_model_path)}")
+    return True
+
+
+if __name__ == '__main__':
+    model_dir = os.path.join(script_dir, '..', 'saved_model')
+    export_forest_arrays(
+        os.path.join(model_dir, 'loss_prediction_model.pkl'),
+        os.path.join(model_dir, 'loss_prediction_model.npz'),
+    )
@@ -0,0 +1,228 @@
+"""
+Bulk scoring of historical data with the loss model, for backfills and reports.
+
+Every row of the input gets the predicted hourly loss, the estimated daily
+financial loss and whether cleaning is recommended, using the same rule and
+thresholds (config.py) as /api/recommend. The input is read in chunks; each
+chunk is scored in a process pool, one vectorized model call and one
+vectorized rupee/threshold pass per chunk, and written out in input order as
+soon as it and every chunk before it are done. Only a few chunks per worker
+are in flight at a time, so memory stays bounded whatever the input size.
+
+Inputs are datasets in either format (see dataset_io.py), or a fleet
+directory written by 1c_simulate_fleet_data.py, whose shards are scored one
+after another. Rows with a missing feature are written with an empty
+prediction instead of failing the run.
+
+Run from the scripts directory:
+    python 5_score_history.py ../../data/historical_loss_data scored.csv
+    python 5_score_history.py ../../data/fleet fleet_scores --format npy --chunk-size 500000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from dataset_io import FORMATS, ColumnarWriter, is_columnar_dataset, iter_table_chunks, read_schema
+
+# The model and business rules live with the serving code; make them importable
+script_dir = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(script_dir, '..', '..'))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.dirname(BACKEND_DIR))
+from backend import config
+from services.inference_backends import FEATURES_ORDER, load_backend
+
+# Passed through to the output when the input has them
+DEFAULT_KEEP_COLUMNS = ['panel_id', 'timestamp']
+
+# Width of panel_id in npy output when a CSV input cannot tell it up front
+DEFAULT_TEXT_WIDTH = 64
+
+# Set in each worker by _init_worker
+_model = None
+
+
+def _init_worker(backend_name, model_path):
+    global _model
+    _model = load_backend(backend_name, model_path, FEATURES_ORDER)
+
+
+def score_chunk(df, keep_columns, fmt, header):
+    """
+    Scores one chunk. Returns the output rows, as CSV text (`fmt='csv'`) or
+    as a DataFrame (`fmt='npy'`), with the chunk's row counts.
+    """
+    X = np.ascontiguousarray(df[FEATURES_ORDER].to_numpy(dtype=np.float32))
+    valid = np.isfinite(X).all(axis=1)
+    predicted_hourly_loss_kw = np.full(len(X), np.nan)
+    if valid.any():
+        predicted_hourly_loss_kw[valid] = _model.predict(X if valid.all() else X[valid])
+
+    # --- Recommendation Logic (vectorized), as in generate_batch_recommendations ---
+    daily_financial_loss = predicted_hourly_loss_kw * config.PEAK_SUN_HOURS * config.ENERGY_VALUE_PER_KWH
+    action_required = daily_financial_loss > config.RECOMMENDATION_THRESHOLD_INR
+
+    out = df[keep_columns].copy()
+    out['predicted_hourly_loss_kw'] = predicted_hourly_loss_kw
+    out['estimated_daily_financial_loss'] = daily_financial_loss
+    out['action_required'] = action_required
+    if fmt == 'csv':
+        # Rounded like the API's responses
+        out = out.round({'predicted_hourly_loss_kw': 4, 'estimated_daily_financial_loss': 2})
+        out = out.to_csv(index=False, header=header, date_format='%Y-%m-%d %H:%M:%S')
+    counts = {'rows': len(X), 'action_required': int(action_required.sum()), 'invalid': int((~valid).sum())}
+    return out, counts
+
+
+def resolve_sources(paths):
+    """Expands fleet directories (with a manifest.json) into their shards."""
+    sources = []
+    for path in paths:
+        manifest_path = os.path.join(path, 'manifest.json')
+        if os.path.isdir(path) and not is_columnar_dataset(path) and os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            sources.extend(os.path.join(path, shard['path']) for shard in manifest['shards'])
+        else:
+            sources.append(path)
+    return sources
+
+
+def source_columns(path):
+    """Column names of a dataset, without reading its rows."""
+    if is_columnar_dataset(path):
+        return list(read_schema(path)['columns'])
+    with open(path) as f:
+        return f.readline().strip().split(',')
+
+
+def count_rows(path):
+    """
+    Number of rows the reader will yield for a dataset. CSV records are
+    counted by parsing one column, so blank lines, a missing final newline
+    and quoted line breaks count exactly as they do when the file is read.
+    """
+    if is_columnar_dataset(path):
+        return read_schema(path)['num_rows']
+    chunks = pd.read_csv(path, usecols=[0], dtype=str, chunksize=1_000_000)
+    return sum(len(chunk) for chunk in chunks)
+
+
+def text_dtypes(sources, keep_columns):
+    """Fixed-width dtypes for the text columns of npy output, wide enough for every source."""
+    widths = {}
+    for path in sources:
+        if not is_columnar_dataset(path):
+            return {'panel_id': np.dtype(f'U{DEFAULT_TEXT_WIDTH}')} if 'panel_id' in keep_columns else {}
+        for column, dtype in read_schema(path)['columns'].items():
+            dtype = np.dtype(dtype)
+            if column in keep_columns and dtype.kind == 'U':
+                widths[column] = max(widths.get(column, 0), dtype.itemsize // 4)
+    return {column: np.dtype(f'U{width}') for column, width in widths.items()}
+
+
+def score_history(input_paths, output_path, fmt='csv', keep_columns=None, chunk_size=200_000,
+                  max_workers=None, backend_name=None, model_path=None):
+    """
+    Scores every row of the inputs and writes the results to `output_path`
+    (a CSV file, or a columnar dataset directory with `fmt='npy'`).
+
+    Returns a summary dict with row counts and throughput.
+    """
+    print("Starting bulk scoring...")
+    sources = resolve_sources(input_paths)
+    if keep_columns is None:
+        available = set.intersection(*(set(source_columns(path)) for path in sources))
+        keep_columns = [column for column in DEFAULT_KEEP_COLUMNS if column in available]
+    total_rows = sum(count_rows(path) for path in sources)
+    print(f"{len(sources)} input(s), {total_rows:,} rows; keeping columns {keep_columns}.")
+
+    max_workers = max_workers or os.cpu_count() or 1
+    # No derived calendar columns, so both formats hold the same columns
+    writer = (ColumnarWriter(output_path, total_rows, text_dtypes(sources, keep_columns), derive_calendar=False)
+              if fmt == 'npy' else None)
+    output_file = open(output_path, 'w', newline='') if fmt == 'csv' else None
+
+    rows_done = 0
+    action_rows = 0
+    invalid_rows = 0
+    started = time.perf_counter()
+
+    def write(result):
+        nonlocal rows_done, action_rows, invalid_rows
+        out, counts = result
+        if fmt == 'csv':
+            output_file.write(out)
+        else:
+            writer.write(out)
+        rows_done += counts['rows']
+        action_rows += counts['action_required']
+        invalid_rows += counts['invalid']
+        elapsed = time.perf_counter() - started
+        print(f"  ...{rows_done:,}/{total_rows:,} rows ({rows_done / elapsed:,.0f} rows/s)")
+
+    columns = FEATURES_ORDER + [column for column in keep_columns if column not in FEATURES_ORDER]
+    # Chunks submitted but not yet written, oldest first
+    pending = deque()
+    max_pending = 2 * max_workers
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(backend_name, model_path)) as pool:
+            first = True
+            for path in sources:
+                for df in iter_table_chunks(path, columns=columns, chunk_size=chunk_size):
+                    if len(pending) >= max_pending:
+                        write(pending.popleft().result())
+                    pending.append(pool.submit(score_chunk, df, keep_columns, fmt, first))
+                    first = False
+            while pending:
+                write(pending.popleft().result())
+    except KeyboardInterrupt:
+        for future in pending:
+            future.cancel()
+        print(f"Interrupted after {rows_done:,} rows; {os.path.abspath(output_path)} is incomplete.")
+        raise
+    finally:
+        if output_file is not None:
+            output_file.close()
+    if writer is not None:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        'rows': rows_done,
+        'action_required_rows': action_rows,
+        'invalid_rows': invalid_rows,
+        'seconds': round(elapsed, 2),
+        'rows_per_second': round(rows_done / elapsed) if elapsed > 0 else None,
+        'workers': max_workers,
+        'output': os.path.abspath(output_path),
+    }
+    print(f"Scored {rows_done:,} rows in {elapsed:.1f}s ({summary['rows_per_second']:,} rows/s, "
+          f"{max_workers} worker(s)). {action_rows:,} rows need cleaning; {invalid_rows:,} had missing features.")
+    print(f"Results saved to: {summary['output']}")
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Score historical data with the loss model in bulk.")
+    parser.add_argument('inputs', nargs='+', help="Datasets (columnar directory or CSV) or fleet directories.")
+    parser.add_argument('output', help="Output CSV file, or dataset directory with --format npy.")
+    parser.add_argument('--format', choices=FORMATS, default='csv', help="Output format (default: csv).")
+    parser.add_argument('--keep', nargs='+', default=None,
+                        help="Input columns copied to the output (default: panel_id and timestamp, if present).")
+    parser.add_argument('--chunk-size', type=int, default=200_000, help="Rows per chunk.")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument('--backend', default=None,
+                        help=f"Inference backend (default: config.INFERENCE_BACKEND, '{config.INFERENCE_BACKEND}').")
+    parser.add_argument('--model', default=None, help="Model file (default: the backend's loss model).")
+    args = parser.parse_args()
+
+    score_history(args.inputs, args.output, fmt=args.format, keep_columns=args.keep, chunk_size=args.chunk_size,
+                  max_workers=args.workers, backend_name=args.backend, model_path=args.model)
@@ -0,0 +1,253 @@
+"""
+Dataset I/O shared by the simulators and training scripts.
+
+Datasets are stored in a typed columnar format: a directory with one `.npy`
+file per column plus a `schema.json`. Columns are read with memory mapping,
+so loading is instant and a trainer only touches the columns it asks for.
+Numbers are stored unrounded in compact dtypes (float32 measurements, int16
+calendar fields). CSV remains available as an import and export format.
+
+Layout of a columnar dataset:
+    historical_loss_data/
+        schema.json                 # row count, column names and dtypes
+        timestamp.npy               # datetime64[ns]
+        temperature_celsius.npy     # float32
+        hour.npy                    # int16, derived from timestamp
+        ...
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+SCHEMA_FILE = 'schema.json'
+FORMATS = ('npy', 'csv')
+
+# Calendar features derived from `timestamp` when a dataset is written, so
+# training never has to parse or decompose dates again.
+CALENDAR_COLUMNS = ('hour', 'day_of_year', 'month')
+INT16_COLUMNS = set(CALENDAR_COLUMNS)
+
+
+def storage_dtype(column, values):
+    """Picks the compact on-disk dtype for a column."""
+    values = np.asarray(values)
+    if column in INT16_COLUMNS:
+        return np.dtype(np.int16)
+    if values.dtype == np.bool_:
+        return np.dtype(np.bool_)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return np.dtype('datetime64[ns]')
+    if np.issubdtype(values.dtype, np.integer):
+        return np.dtype(np.int32)
+    if np.issubdtype(values.dtype, np.floating):
+        return np.dtype(np.float32)
+    # Text columns (e.g. panel_id) become fixed-width unicode
+    width = max((len(str(value)) for value in values), default=1)
+    return np.dtype(f'U{max(width, 1)}')
+
+
+def add_calendar_columns(df):
+    """Adds int16 hour/day_of_year/month columns computed from `timestamp`."""
+    timestamps = pd.DatetimeIndex(df['timestamp'])
+    df['hour'] = timestamps.hour.astype(np.int16)
+    df['day_of_year'] = timestamps.dayofyear.astype(np.int16)
+    df['month'] = timestamps.month.astype(np.int16)
+    return df
+
+
+def is_columnar_dataset(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, SCHEMA_FILE))
+
+
+def resolve_dataset_path(base_path):
+    """
+    Given a dataset path without extension, returns the columnar dataset if it
+    exists and the `.csv` file otherwise.
+    """
+    if is_columnar_dataset(base_path):
+        return base_path
+    return base_path + '.csv'
+
+
+class ColumnarWriter:
+    """
+    Writes a columnar dataset of a known length, one chunk at a time.
+
+    Every column is preallocated as a memory-mapped `.npy` file, and each
+    chunk is copied into place, so memory use is bounded by the chunk size.
+    A column's dtype is picked from its first chunk unless given in `dtypes`
+    (e.g. a text column whose widest value comes in a later chunk).
+    Chunks with a `timestamp` but no `hour` get CALENDAR_COLUMNS added,
+    unless `derive_calendar=False` (to write exactly the columns given).
+    """
+
+    def __init__(self, path, num_rows, dtypes=None, derive_calendar=True):
+        self.path = path
+        self.num_rows = num_rows
+        self.rows_written = 0
+        self.dtypes = dtypes or {}
+        self.derive_calendar = derive_calendar
+        self._columns = {}
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, df):
+        if self.derive_calendar and 'timestamp' in df.columns and 'hour' not in df.columns:
+            df = add_calendar_columns(df.copy())
+        if self.rows_written + len(df) > self.num_rows:
+            raise ValueError(f"Dataset was sized for {self.num_rows} rows; got more.")
+
+        for column in df.columns:
+            values = df[column].to_numpy()
+            if column not in self._columns:
+                self._columns[column] = np.lib.format.open_memmap(
+                    os.path.join(self.path, f'{column}.npy'), mode='w+',
+                    dtype=self.dtypes.get(column) or storage_dtype(column, values), shape=(self.num_rows,)
+                )
+            self._columns[column][self.rows_written:self.rows_written + len(df)] = values
+        self.rows_written += len(df)
+
+    def close(self):
+        if self.rows_written != self.num_rows:
+            raise ValueError(f"Expected {self.num_rows} rows, wrote {self.rows_written}.")
+        schema = {
+            'num_rows': self.num_rows,
+            'columns': {column: array.dtype.str for column, array in self._columns.items()},
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        }
+        for array in self._columns.values():
+            array.flush()
+        self._columns = {}
+        with open(os.path.join(self.path, SCHEMA_FILE), 'w') as f:
+            json.dump(schema, f, indent=2)
+
+
+def write_dataset(df, path, fmt='npy', csv_decimals=3):
+    """
+    Saves a DataFrame as a columnar dataset (`fmt='npy'`) or as CSV. CSV
+    output is rounded to `csv_decimals` like the original simulators wrote it.
+    """
+    if fmt == 'csv':
+        numeric = df.select_dtypes(include='number').columns
+        df.round({column: csv_decimals for column in numeric}).to_csv(
+            path, index=False, date_format='%Y-%m-%d %H:%M:%S'
+        )
+        return
+    writer = ColumnarWriter(path, len(df))
+    writer.write(df)
+    writer.close()
+
+
+def read_schema(path):
+    with open(os.path.join(path, SCHEMA_FILE)) as f:
+        return json.load(f)
+
+
+def read_columns(path, columns=None, mmap=True):
+    """
+    Returns {column: numpy array} for a columnar dataset. With `mmap=True`
+    the arrays are read-only memory maps; nothing is loaded until touched.
+    """
+    schema = read_schema(path)
+    if columns is None:
+        columns = list(schema['columns'])
+    missing = [column for column in columns if column not in schema['columns']]
+    if missing:
+        raise KeyError(f"Columns not in dataset {path}: {missing}")
+    return {
+        column: np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r' if mmap else None)
+        for column in columns
+    }
+
+
+def read_dataset(path, columns=None, mmap=True):
+    """Reads a columnar dataset (or only `columns` of it) into a DataFrame."""
+    return pd.DataFrame(read_columns(path, columns, mmap=mmap))
+
+
+def _csv_read_options(path, columns):
+    """
+    Works out which CSV columns to read for `columns`, and which calendar
+    columns have to be derived from the timestamp afterwards.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    derived = [column for column in (columns or []) if column in CALENDAR_COLUMNS and column not in header]
+    usecols = None
+    if columns is not None:
+        usecols = [column for column in columns if column in header]
+        if derived and 'timestamp' not in usecols:
+            usecols.append('timestamp')
+    parse_timestamp = 'timestamp' in header and (usecols is None or 'timestamp' in usecols)
+    options = {'usecols': usecols, 'parse_dates': ['timestamp'] if parse_timestamp else None}
+    return options, derived
+
+
+def load_table(path, columns=None):
+    """
+    Loads a dataset from either format. For a CSV, the calendar columns are
+    derived from `timestamp` when they are requested but not stored.
+    """
+    if is_columnar_dataset(path):
+        return read_dataset(path, columns)
+
+    options, derived = _csv_read_options(path, columns)
+    df = pd.read_csv(path, **options)
+    if derived:
+        df = add_calendar_columns(df)
+    return df[columns] if columns is not None else df
+
+
+def iter_table_chunks(path, columns=None, chunk_size=1_000_000, interleave=False):
+    """
+    Yields a dataset from either format as DataFrames of at most `chunk_size`
+    rows, so only one chunk is in memory at a time. Each chunk's index holds
+    the rows' positions in the dataset.
+
+    Chunks are consecutive rows by default. With `interleave=True`, a
+    columnar dataset is instead cut into strided chunks (every n-th row), so
+    each chunk spans the whole time range. CSV files are always read in order.
+    """
+    if is_columnar_dataset(path):
+        arrays = read_columns(path, columns)
+        num_rows = read_schema(path)['num_rows']
+        if interleave:
+            num_chunks = max(1, -(-num_rows // chunk_size))
+            slices = [slice(k, None, num_chunks) for k in range(num_chunks)]
+        else:
+            slices = [slice(start, start + chunk_size) for start in range(0, num_rows, chunk_size)]
+        for rows in slices:
+            index = np.arange(num_rows)[rows]
+            yield pd.DataFrame({column: np.array(array[rows]) for column, array in arrays.items()}, index=index)
+        return
+
+    options, derived = _csv_read_options(path, columns)
+    for df in pd.read_csv(path, chunksize=chunk_size, **options):
+        if derived:
+            df = add_calendar_columns(df)
+        yield df[columns] if columns is not None else df
+
+
+def export_csv(path, csv_path, chunk_size=1_000_000, decimals=3):
+    """Exports a columnar dataset to CSV in bounded memory."""
+    schema = read_schema(path)
+    arrays = read_columns(path)
+    for start in range(0, schema['num_rows'], chunk_size):
+        chunk = pd.DataFrame({column: array[start:start + chunk_size] for column, array in arrays.items()})
+        numeric = chunk.select_dtypes(include='number').columns
+        chunk.round({column: decimals for column in numeric}).to_csv(
+            csv_path, index=False, mode='w' if start == 0 else 'a', header=start == 0,
+            date_format='%Y-%m-%d %H:%M:%S'
+        )
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export a columnar dataset to CSV.")
+    parser.add_argument('dataset', help="Path of the columnar dataset directory.")
+    parser.add_argument('csv_path', help="Where to write the CSV.")
+    args = parser.parse_args()
+    export_csv(args.dataset, args.csv_path)
+    print(f"Exported {args.dataset} to {os.path.abspath(args.csv_path)}")
@@ -0,0 +1,202 @@
+"""
+Cached feature matrices for the training scripts.
+
+The first time a trainer asks for (dataset, features, target), the dataset
+is loaded, the features are assembled into a C-contiguous float32 matrix (the
+dtype scikit-learn trees train on) and saved next to the target as `.npy`
+files. Later runs memory-map those files and skip parsing, calendar features
+and column assembly entirely.
+
+Entries are keyed by a SHA-256 of the dataset's contents plus the feature
+list, target and row order, so an edited or re-simulated dataset can never
+be served from a stale cache. Hashing is skipped while the dataset files
+keep the same size and modification time.
+
+Layout:
+    data/feature_cache/
+        fingerprints.json           # dataset path -> file stats and content hash
+        <key>/
+            X.npy                   # float32, rows x features, C order
+            y.npy                   # float64 target
+            meta.json               # source, features, target, row count
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+from dataset_io import SCHEMA_FILE, is_columnar_dataset, load_table
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'feature_cache')
+
+# Bump when the way features are built changes, so old entries stop matching
+STORE_VERSION = 1
+
+FINGERPRINTS_FILE = 'fingerprints.json'
+
+
+def _dataset_files(path):
+    if is_columnar_dataset(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.endswith('.npy') or name == SCHEMA_FILE
+        )
+    return [path]
+
+
+def dataset_fingerprint(path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    SHA-256 of a dataset's contents (CSV file or columnar directory). The hash
+    is remembered with the files' sizes and mtimes, and recomputed only when
+    one of them changes.
+    """
+    files = _dataset_files(path)
+    stats = [[os.path.basename(f), os.stat(f).st_size, os.stat(f).st_mtime_ns] for f in files]
+
+    memo_path = os.path.join(cache_dir, FINGERPRINTS_FILE)
+    memo = {}
+    if os.path.exists(memo_path):
+        with open(memo_path) as f:
+            memo = json.load(f)
+    source = os.path.abspath(path)
+    entry = memo.get(source)
+    if entry is not None and entry['stats'] == stats:
+        return entry['sha256']
+
+    digest = hashlib.sha256()
+    for file_path in files:
+        digest.update(os.path.basename(file_path).encode())
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    memo[source] = {'stats': stats, 'sha256': sha256}
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(memo_path, 'w') as f:
+        json.dump(memo, f, indent=2)
+    return sha256
+
+
+def feature_key(fingerprint, features, target, sort_by=None):
+    spec = {
+        'version': STORE_VERSION,
+        'dataset_sha256': fingerprint,
+        'features': list(features),
+        'target': target,
+        'sort_by': sort_by,
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def build_features(data_path, features, target, sort_by=None):
+    """Loads the dataset and assembles (X, y) without any caching."""
+    columns = list(features) + [target]
+    if sort_by is not None and sort_by not in columns:
+        columns.append(sort_by)
+    df = load_table(data_path, columns=columns)
+    if sort_by is not None:
+        df = df.sort_values(by=sort_by, kind='stable').reset_index(drop=True)
+    X = np.ascontiguousarray(df[list(features)].to_numpy(dtype=np.float32))
+    y = df[target].to_numpy(dtype=np.float64)
+    return X, y
+
+
+def _remove_superseded(cache_dir, meta):
+    """Deletes older entries built from the same dataset path with the same feature spec."""
+    for name in os.listdir(cache_dir):
+        meta_path = os.path.join(cache_dir, name, 'meta.json')
+        if name == meta['key'] or not os.path.exists(meta_path):
+            continue
+        with open(meta_path) as f:
+            other = json.load(f)
+        same_spec = all(other.get(field) == meta[field] for field in ('source', 'features', 'target', 'sort_by'))
+        if same_spec:
+            shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+
+def ensure_features(data_path, features, target, sort_by=None, cache_dir=DEFAULT_CACHE_DIR, refresh=False):
+    """
+    Makes sure the cache holds (X, y) for `features` and `target` of a dataset
+    (columnar or CSV), building the entry if needed. Returns the entry's
+    directory, which `open_features` reads.
+
+    With `sort_by`, rows are ordered by that column first (e.g. the timestamp,
+    for a time-series split). `refresh=True` rebuilds the entry.
+    """
+    fingerprint = dataset_fingerprint(data_path, cache_dir)
+    key = feature_key(fingerprint, features, target, sort_by)
+    entry_dir = os.path.join(cache_dir, key)
+
+    if not refresh and os.path.exists(os.path.join(entry_dir, 'meta.json')):
+        print(f"Features loaded from cache {key}.")
+        return entry_dir
+
+    started = time.perf_counter()
+    X, y = build_features(data_path, features, target, sort_by)
+
+    # Write to a temporary directory first so a crash never leaves a half entry
+    tmp_dir = f'{entry_dir}.tmp{os.getpid()}'
+    os.makedirs(tmp_dir, exist_ok=True)
+    np.save(os.path.join(tmp_dir, 'X.npy'), X)
+    np.save(os.path.join(tmp_dir, 'y.npy'), y)
+    meta = {
+        'key': key,
+        'source': os.path.abspath(data_path),
+        'dataset_sha256': fingerprint,
+        'features': list(features),
+        'target': target,
+        'sort_by': sort_by,
+        'num_rows': len(X),
+        'version': STORE_VERSION,
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+    _remove_superseded(cache_dir, meta)
+
+    print(f"Features built in {time.perf_counter() - started:.2f}s and cached as {key} ({len(X)} rows).")
+    return entry_dir
+
+
+def open_features(entry_dir):
+    """
+    Memory-maps a cache entry's (X, y) read-only. Processes that open the
+    same entry share its pages instead of holding copies.
+    """
+    X = np.load(os.path.join(entry_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(entry_dir, 'y.npy'), mmap_mode='r')
+    return X, y
+
+
+def load_features(data_path, features, target, sort_by=None, cache_dir=DEFAULT_CACHE_DIR, refresh=False):
+    """
+    Returns (X, y) for `features` and `target` of a dataset, from the cache.
+
+    X is a C-contiguous float32 matrix with the features in the given order,
+    y a float64 vector, both read-only memory maps.
+    """
+    return open_features(ensure_features(data_path, features, target, sort_by, cache_dir, refresh))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the training feature cache.")
+    parser.add_argument('command', choices=['list', 'clear'], help="List cache entries or delete them all.")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Cache directory.")
+    args = parser.parse_args()
+
+    if args.command == 'clear':
+        shutil.rmtree(args.cache_dir, ignore_errors=True)
+        print(f"Removed {os.path.abspath(args.cache_dir)}")
+    elif os.path.isdir(args.cache_dir):
+        for name in sorted(os.listdir(args.cache_dir)):
+            meta_path = os.path.join(args.cache_dir, name, 'meta.json')
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                print(f"{name}  {meta['num_rows']:>10} rows  {meta['target']:<18} {meta['source']}")
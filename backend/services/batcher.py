@@ -0,0 +1,137 @@
+"""
+Micro-batching for single-row predictions: concurrent callers share one
+model call instead of each paying for its own.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into batched model calls.
+
+    Callers submit one feature row and get a Future. A worker thread takes
+    the first waiting row, keeps collecting rows for up to `window_ms` (or
+    until `max_batch_size` rows are waiting), runs one `predict` on the stack
+    and resolves every caller's future with its own prediction. A lone
+    request therefore waits at most `window_ms` longer than it would alone.
+
+    `get_model` is called for every batch, so a hot-reloaded model is picked
+    up without restarting the batcher. A batch that fails (bad row, missing
+    model, predict error) fails every future in it; the worker keeps running.
+    `predict` gives up after `timeout_seconds` rather than waiting forever.
+    """
+
+    # Upper bounds of the batch-size histogram buckets
+    BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+    def __init__(self, get_model, num_features, window_ms=2.0, max_batch_size=64, timeout_seconds=5.0):
+        self.get_model = get_model
+        self.num_features = num_features
+        self.window_seconds = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.timeout_seconds = timeout_seconds
+        self._queue = queue.SimpleQueue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_seen = 0
+        self.batch_size_counts = [0] * (len(self.BATCH_SIZE_BUCKETS) + 1)
+        self.queue_wait_seconds_total = 0.0
+        self.queue_wait_seconds_max = 0.0
+
+    def _ensure_worker(self):
+        # is_alive() also catches a worker left behind by a fork
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._worker.start()
+
+    def submit(self, values):
+        """Queues one feature row (in model order). Returns a Future for its prediction."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((values, future, time.perf_counter()))
+        return future
+
+    def predict(self, values):
+        """
+        Predicts one row through the batcher, blocking until its batch has run.
+        Raises concurrent.futures.TimeoutError if that takes over `timeout_seconds`.
+        """
+        return self.submit(values).result(timeout=self.timeout_seconds)
+
+    def _collect(self):
+        """Blocks for the first request, then gathers more until the window closes or the batch is full."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        buffer = np.empty((self.max_batch_size, self.num_features), dtype=np.float32)
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                for i, (values, _, _) in enumerate(batch):
+                    buffer[i] = values
+                model = self.get_model()
+                if model is None:
+                    raise RuntimeError("Loss prediction model not found.")
+                predictions = model.predict(buffer[:len(batch)]).tolist()
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future, _), prediction in zip(batch, predictions):
+                    if not future.done():
+                        future.set_result(prediction)
+            self._record(batch, started)
+
+    def _record(self, batch, started):
+        waits = [started - enqueued_at for _, _, enqueued_at in batch]
+        bucket = next(
+            (i for i, bound in enumerate(self.BATCH_SIZE_BUCKETS) if len(batch) <= bound),
+            len(self.BATCH_SIZE_BUCKETS),
+        )
+        with self._stats_lock:
+            self.batches += 1
+            self.rows += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.batch_size_counts[bucket] += 1
+            self.queue_wait_seconds_total += sum(waits)
+            self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, max(waits))
+
+    def stats(self):
+        with self._stats_lock:
+            labels = [f'<={bound}' for bound in self.BATCH_SIZE_BUCKETS] + [f'>{self.BATCH_SIZE_BUCKETS[-1]}']
+            return {
+                'window_ms': self.window_seconds * 1000,
+                'max_batch_size': self.max_batch_size,
+                'batches': self.batches,
+                'rows': self.rows,
+                'mean_batch_size': round(self.rows / self.batches, 2) if self.batches else 0.0,
+                'max_batch_size_seen': self.max_batch_seen,
+                'batch_size_histogram': {
+                    label: count for label, count in zip(labels, self.batch_size_counts) if count
+                },
+                'mean_queue_wait_ms': round(self.queue_wait_seconds_total / self.rows * 1000, 3) if self.rows else 0.0,
+                'max_queue_wait_ms': round(self.queue_wait_seconds_max * 1000, 3),
+            }
@@ -0,0 +1,304 @@
+"""
+Online drift and residual monitoring for the loss model.
+
+The loss model was trained on simulated data. Once it serves real panels,
+this module checks whether the inputs it sees (and the predictions it makes)
+still look like what it was trained on, without storing any request.
+
+At training time, 2b_train_loss_model.py saves a reference next to the model:
+for every feature and for the prediction, bin edges at the training data's
+deciles and the share of training rows in each bin, plus the model's held-out
+error. Bins below the training minimum and above the training maximum are
+added, with no reference rows in them.
+
+At serving time, every scored row adds one to a counter per feature and one
+for its prediction (a binary search over about a dozen edges each), so the
+cost per request is constant and memory is a few arrays of counts. Counts
+are kept for the current window of rows and the previous one; drift scores
+cover both, so they always reflect the latest one to two windows of traffic.
+When a request also reports the panel's observed loss, its residual is added
+to running sums in the same way.
+
+Drift per feature is the population stability index (PSI) between the
+reference shares and the live ones. A PSI above 0.1 is usually read as a
+moderate shift and above 0.25 as a significant one.
+"""
+import json
+import threading
+from bisect import bisect_right
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Quantile bins per feature in the reference (before duplicates are merged)
+REFERENCE_BINS = 10
+
+# Shares are clipped to this before taking logs, so empty bins stay finite
+PSI_EPSILON = 1e-4
+
+PREDICTION = 'prediction'
+
+
+def _bin_edges(values, num_bins):
+    """
+    Decile edges of `values`, with an edge at the minimum and one just above
+    the maximum, so out-of-range values land in bins of their own.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    interior = np.quantile(values, np.linspace(0, 1, num_bins + 1)[1:-1])
+    low, high = values.min(), np.nextafter(values.max(), np.inf)
+    return np.unique(np.concatenate([[low], interior, [high]]))
+
+
+def _bin_counts(edges, values):
+    """Rows per bin; bin i holds edges[i-1] <= value < edges[i]."""
+    return np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+
+
+def build_reference(X, predictions, observed_loss_kw, features, num_bins=REFERENCE_BINS):
+    """
+    The training-time reference for a model: histograms of every feature
+    column of X and of its predictions, and its error against
+    `observed_loss_kw`. Pass held-out rows, so the error is an honest one.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    predictions = np.asarray(predictions, dtype=np.float64)
+    residuals = np.asarray(observed_loss_kw, dtype=np.float64) - predictions
+
+    histograms = {}
+    for name, values in [*zip(features, X.T), (PREDICTION, predictions)]:
+        edges = _bin_edges(values, num_bins)
+        histograms[name] = {
+            'edges': edges.tolist(),
+            'shares': (_bin_counts(edges, values) / len(values)).tolist(),
+        }
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'num_rows': len(X),
+        'features': list(features),
+        'histograms': histograms,
+        'residuals': {
+            'mae_kw': float(np.abs(residuals).mean()),
+            'bias_kw': float(residuals.mean()),
+        },
+    }
+
+
+def save_reference(reference, path):
+    with open(path, 'w') as f:
+        json.dump(reference, f, indent=2)
+
+
+def population_stability_index(expected_shares, actual_counts):
+    """PSI between reference shares and live counts over the same bins."""
+    expected = np.maximum(np.asarray(expected_shares, dtype=np.float64), PSI_EPSILON)
+    actual = np.maximum(actual_counts / max(actual_counts.sum(), 1), PSI_EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+class DriftMonitor:
+    """
+    Streaming comparison of served rows with the model's training reference.
+
+    `observe` (one row) and `observe_batch` only increment counters. Every
+    `window_size` rows the current window becomes the previous one and the
+    drift scores are checked: once at least `min_samples` rows are counted
+    and a feature's or the prediction's PSI exceeds `psi_threshold`, or the
+    residual MAE exceeds `mae_ratio_threshold` times the training MAE,
+    retraining is recommended and a warning is printed.
+
+    Without a reference file the monitor stays disabled and observing costs
+    nothing.
+    """
+
+    def __init__(self, reference_path, features, window_size=5000, min_samples=500,
+                 psi_threshold=0.25, mae_ratio_threshold=2.0):
+        self.reference_path = reference_path
+        self.features = list(features)
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self.psi_threshold = psi_threshold
+        self.mae_ratio_threshold = mae_ratio_threshold
+        self._lock = threading.Lock()
+        self.reference = None
+        self._bins = None
+        self.error = None
+        self.retrain_recommended = False
+        self.retrain_signals = 0
+        self.load_reference()
+
+    @property
+    def enabled(self):
+        return self.reference is not None
+
+    def load_reference(self):
+        """(Re)reads the reference file and starts counting from zero. Returns True on success."""
+        try:
+            with open(self.reference_path) as f:
+                reference = json.load(f)
+            if reference['features'] != self.features:
+                raise ValueError(f"Reference features {reference['features']} do not match {self.features}.")
+            histograms = [reference['histograms'][name] for name in self.features + [PREDICTION]]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            with self._lock:
+                self.reference = None
+                self._bins = None
+            self.error = f"No drift reference loaded from {self.reference_path}: {e}"
+            return False
+
+        # Everything derived from the reference is swapped in as one tuple, so
+        # a reader holding it never mixes bins of two references
+        bins = (
+            # Plain lists for bisect on the single-row path, arrays for batches
+            [histogram['edges'] for histogram in histograms],
+            [np.asarray(histogram['edges']) for histogram in histograms],
+            [np.asarray(histogram['shares']) for histogram in histograms],
+        )
+        with self._lock:
+            self.reference = reference
+            self._bins = bins
+            self._reset_windows()
+            self.retrain_recommended = False
+        self.error = None
+        return True
+
+    def _reset_windows(self):
+        """Call with the lock held."""
+        self._current = self._empty_window()
+        self._previous = self._empty_window()
+
+    def _empty_window(self):
+        return {
+            'rows': 0,
+            'counts': [np.zeros(len(edges) + 1, dtype=np.int64) for edges in self._bins[1]],
+            # Residual count, sum and sum of absolute values
+            'residuals': np.zeros(3),
+        }
+
+    def reset(self):
+        with self._lock:
+            if self.reference is not None:
+                self._reset_windows()
+            self.retrain_recommended = False
+
+    def observe(self, row, prediction, observed_loss_kw=None):
+        """Counts one served row (values in feature order) and its prediction."""
+        if self.reference is None:
+            return
+        with self._lock:
+            if self._bins is None:
+                return
+            window = self._current
+            counts = window['counts']
+            edge_lists = self._bins[0]
+            for i, value in enumerate(row):
+                counts[i][bisect_right(edge_lists[i], value)] += 1
+            counts[-1][bisect_right(edge_lists[-1], prediction)] += 1
+            if observed_loss_kw is not None:
+                residual = observed_loss_kw - prediction
+                window['residuals'] += (1, residual, abs(residual))
+            window['rows'] += 1
+            rolled = window['rows'] >= self.window_size
+            if rolled:
+                self._roll()
+        if rolled:
+            self._check()
+
+    def observe_batch(self, X, predictions, observed_loss_kw=None):
+        """
+        Counts many served rows at once. `observed_loss_kw` is an array with
+        NaN where no observation was reported, or None.
+        """
+        # Binned outside the lock against a snapshot of the reference's bins
+        bins = self._bins
+        if bins is None or len(X) == 0:
+            return
+        X = np.asarray(X)
+        predictions = np.asarray(predictions, dtype=np.float64)
+        columns = [*X.T, predictions]
+        binned = [_bin_counts(edges, values) for edges, values in zip(bins[1], columns)]
+        residual_sums = None
+        if observed_loss_kw is not None:
+            residuals = np.asarray(observed_loss_kw, dtype=np.float64) - predictions
+            residuals = residuals[~np.isnan(residuals)]
+            residual_sums = (len(residuals), residuals.sum(), np.abs(residuals).sum())
+
+        with self._lock:
+            if self._bins is not bins:
+                return  # the reference was reloaded meanwhile
+            window = self._current
+            for counts, new in zip(window['counts'], binned):
+                counts += new
+            if residual_sums is not None:
+                window['residuals'] += residual_sums
+            window['rows'] += len(X)
+            rolled = window['rows'] >= self.window_size
+            if rolled:
+                self._roll()
+        if rolled:
+            self._check()
+
+    def _roll(self):
+        """Starts a new window. Call with the lock held."""
+        self._previous = self._current
+        self._current = self._empty_window()
+
+    def _check(self):
+        """Updates the retrain signal from the latest scores, warning when it turns on."""
+        scores = self.scores()
+        recommended = scores['retrain_recommended']
+        if recommended and not self.retrain_recommended:
+            self.retrain_signals += 1
+            print(f"Warning: Loss model drift detected ({'; '.join(scores['reasons'])}). Retraining is recommended.")
+        self.retrain_recommended = recommended
+
+    def scores(self):
+        """Drift scores over the current and previous windows, as a JSON-ready dict."""
+        with self._lock:
+            if self.reference is None:
+                return {'enabled': False, 'error': self.error}
+            windows = (self._previous, self._current)
+            rows = sum(window['rows'] for window in windows)
+            counts = [previous + current for previous, current in zip(self._previous['counts'], self._current['counts'])]
+            residual_count, residual_sum, residual_abs_sum = sum(window['residuals'] for window in windows)
+            reference = self.reference
+            shares = self._bins[2]
+
+        names = self.features + [PREDICTION]
+        psi = {
+            name: round(population_stability_index(reference_shares, bin_counts), 4)
+            for name, reference_shares, bin_counts in zip(names, shares, counts)
+        }
+        reasons = []
+        if rows >= self.min_samples:
+            reasons = [f"{name} PSI {value:.2f} > {self.psi_threshold}" for name, value in psi.items()
+                       if value > self.psi_threshold]
+
+        reference_mae = reference['residuals']['mae_kw']
+        residuals = {'samples': int(residual_count), 'reference_mae_kw': round(reference_mae, 4)}
+        if residual_count:
+            mae = residual_abs_sum / residual_count
+            mae_ratio = mae / reference_mae if reference_mae > 0 else None
+            residuals.update({
+                'mae_kw': round(mae, 4),
+                'bias_kw': round(residual_sum / residual_count, 4),
+                'mae_ratio': round(mae_ratio, 3) if mae_ratio is not None else None,
+            })
+            if residual_count >= self.min_samples and mae_ratio is not None and mae_ratio > self.mae_ratio_threshold:
+                reasons.append(f"residual MAE {mae_ratio:.1f}x the training MAE")
+
+        return {
+            'enabled': True,
+            'samples': int(rows),
+            'min_samples': self.min_samples,
+            'window_size': self.window_size,
+            'reference_created_at': reference['created_at'],
+            'features': {name: psi[name] for name in self.features},
+            'prediction': psi[PREDICTION],
+            'residuals': residuals,
+            'psi_threshold': self.psi_threshold,
+            'mae_ratio_threshold': self.mae_ratio_threshold,
+            'retrain_recommended': bool(reasons),
+            'reasons': reasons,
+            'retrain_signals': self.retrain_signals,
+        }
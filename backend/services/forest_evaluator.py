@@ -0,0 +1,111 @@
+"""
+A compact, NumPy-only evaluator for tree ensembles.
+
+A trained forest is flattened into five node arrays (feature, threshold,
+left, right, value) shared by all trees and stored in a single `.npz`.
+Prediction walks every tree for every row at once, one tree level per
+step, so serving needs neither scikit-learn nor pandas.
+"""
+import numpy as np
+
+# Rows evaluated together. Traversal state is (rows x trees), so blocking keeps
+# memory flat for large batches (and is slightly faster, being cache-sized).
+PREDICT_BLOCK_ROWS = 1024
+
+
+def flatten_forest(model):
+    """
+    Flattens a fitted scikit-learn forest (or single tree) regressor into
+    node arrays. Only reads attributes, so it does not import scikit-learn.
+
+    Leaves point to themselves, so a row that reaches a leaf early simply
+    stays there while deeper trees finish. Thresholds and leaf values keep
+    float64 precision so predictions match scikit-learn exactly.
+    """
+    estimators = getattr(model, 'estimators_', [model])
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+        rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+        values.append(tree.value[:, 0, 0])
+        roots.append(offset)
+
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    return {
+        'feature': np.concatenate(features).astype(np.int16),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'left': np.concatenate(lefts).astype(np.int32),
+        'right': np.concatenate(rights).astype(np.int32),
+        'value': np.concatenate(values).astype(np.float64),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'max_depth': np.asarray(max_depth, dtype=np.int32),
+        'n_features': np.asarray(model.n_features_in_, dtype=np.int32),
+    }
+
+
+def save_forest(arrays, path):
+    """Writes flattened forest arrays to an uncompressed `.npz` file."""
+    np.savez(path, **arrays)
+
+
+class ForestEvaluator:
+    """
+    Batched, vectorised traversal over flattened forest arrays.
+
+    Rows are compared as float32, the same precision scikit-learn trees use,
+    and tree outputs are summed in tree order before averaging, so results
+    are bit-identical to `RandomForestRegressor.predict`.
+    """
+
+    def __init__(self, arrays):
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.max_depth = int(arrays['max_depth'])
+        self.n_features = int(arrays['n_features'])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls({name: data[name] for name in data.files})
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.feature, self.threshold, self.left, self.right, self.value))
+
+    def predict(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (n, {self.n_features}), got {X.shape}.")
+        if len(X) > PREDICT_BLOCK_ROWS:
+            return np.concatenate([
+                self._predict_block(X[start:start + PREDICT_BLOCK_ROWS])
+                for start in range(0, len(X), PREDICT_BLOCK_ROWS)
+            ])
+        return self._predict_block(X)
+
+    def _predict_block(self, X):
+        # nodes[i, t] is where row i currently sits in tree t. Feature values
+        # are gathered from the flattened input: row i starts at i * n_features.
+        values = X.ravel()
+        row_starts = (np.arange(len(X)) * self.n_features)[:, np.newaxis]
+        nodes = np.repeat(self.roots[np.newaxis, :], len(X), axis=0)
+        for _ in range(self.max_depth):
+            go_left = values[row_starts + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        # Sequential sum over trees (cumsum), as scikit-learn accumulates them
+        return np.cumsum(self.value[nodes], axis=1)[:, -1] / len(self.roots)
@@ -0,0 +1,262 @@
+"""
+Pluggable inference backends for the loss prediction model (and the other
+tree models served through the model registry).
+
+Every backend exposes the same small interface: `predict(features)` takes a
+2-D array of rows in the model's feature order (`FEATURES_ORDER` for the
+loss model) and returns a 1-D float64 numpy array with one prediction per
+row (the hourly loss in kW for the loss model). Backends read float32 inputs
+without a copy (`input_dtype`), which is what both the forest and the ONNX
+graph compute with.
+"""
+import os
+
+import numpy as np
+from backend import config
+from .forest_evaluator import ForestEvaluator
+
+
+# The column order the loss model was trained with (see 2b_train_loss_model.py).
+FEATURES_ORDER = [
+    'temperature_celsius', 'cloud_cover_percentage', 'panel_age_in_days',
+    'days_since_cleaning', 'hour', 'day_of_year'
+]
+
+# The column order of the power output model (see 2_train_model.py).
+POWER_FEATURES_ORDER = [
+    'temperature_celsius', 'cloud_cover_percentage', 'panel_angle_degrees',
+    'hour', 'day_of_year', 'month'
+]
+
+# Ranges of the probe rows used for warm-up and parity checks, per feature
+PROBE_RANGES = {
+    'temperature_celsius': ('uniform', -5, 50),
+    'cloud_cover_percentage': ('uniform', 0, 100),
+    'panel_age_in_days': ('integers', 0, 3650),
+    'days_since_cleaning': ('integers', 0, 120),
+    'panel_angle_degrees': ('uniform', 0, 60),
+    'hour': ('integers', 0, 24),
+    'day_of_year': ('integers', 1, 367),
+    'month': ('integers', 1, 13),
+}
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'ml_training', 'saved_model')
+PKL_MODEL_PATH = os.path.join(MODEL_DIR, 'loss_prediction_model.pkl')
+ONNX_MODEL_PATH = os.path.join(MODEL_DIR, 'loss_prediction_model.onnx')
+NPZ_MODEL_PATH = os.path.join(MODEL_DIR, 'loss_prediction_model.npz')
+POWER_MODEL_PATH = os.path.join(MODEL_DIR, 'solar_efficiency_model.pkl')
+# Training distribution of the loss model, for drift monitoring (see drift_monitor.py)
+DRIFT_REFERENCE_PATH = os.path.join(MODEL_DIR, 'loss_prediction_model_reference.json')
+
+
+class SklearnBackend:
+    """
+    Runs the pickled scikit-learn forest, exactly as it was trained.
+
+    The feature names and shape are validated once here, at load time.
+    Requests then skip `RandomForestRegressor.predict` (input checks and
+    feature-name checks on every call) and walk the trees directly. Every
+    row sums its trees in tree order, as a single-threaded sklearn predict
+    does, so a row's prediction does not depend on the batch it came in.
+    Large batches are split into row blocks predicted on the forest's
+    `n_jobs` threads; sklearn instead splits by tree and adds the trees up in
+    whatever order its threads finish, which can change the last bits.
+    """
+
+    name = 'sklearn'
+    default_model_path = PKL_MODEL_PATH
+    input_dtype = np.float32
+    needs_parity_check = False
+
+    def __init__(self, model_path=None, features=None):
+        # Imported here so the other backends never pay for scikit-learn
+        import joblib
+
+        self.model_path = model_path or self.default_model_path
+        self.features = features or FEATURES_ORDER
+        self.model = joblib.load(self.model_path)
+
+        feature_names = getattr(self.model, 'feature_names_in_', None)
+        if feature_names is not None and list(feature_names) != self.features:
+            raise ValueError(f"Model was trained on features {list(feature_names)}, expected {self.features}.")
+        if self.model.n_features_in_ != len(self.features) or getattr(self.model, 'n_outputs_', 1) != 1:
+            raise ValueError("Model does not map its features to a single output.")
+        # Names are checked above; arrays in FEATURES_ORDER are passed from now on
+        if feature_names is not None:
+            del self.model.feature_names_in_
+
+        self._trees = [estimator.tree_ for estimator in self.model.estimators_]
+        self._n_jobs = joblib.effective_n_jobs(self.model.n_jobs)
+
+    @property
+    def nbytes(self):
+        """Memory held by the trees' node and value arrays."""
+        total = 0
+        for tree in self._trees:
+            state = tree.__getstate__()
+            total += state['nodes'].nbytes + state['values'].nbytes
+        return total
+
+    def predict(self, features):
+        X = np.ascontiguousarray(features, dtype=self.input_dtype)
+        num_blocks = min(self._n_jobs, -(-len(X) // config.SKLEARN_FAST_PATH_MAX_ROWS))
+        if num_blocks <= 1:
+            return self._sum_trees(X)
+
+        # Tree walks release the GIL, so row blocks run in parallel on threads
+        from joblib import Parallel, delayed
+        blocks = np.array_split(X, num_blocks)
+        return np.concatenate(
+            Parallel(n_jobs=num_blocks, prefer='threads')(delayed(self._sum_trees)(block) for block in blocks)
+        )
+
+    def _sum_trees(self, X):
+        total = np.zeros(len(X), dtype=np.float64)
+        for tree in self._trees:
+            total += tree.predict(X)[:, 0]
+        total /= len(self._trees)
+        return total
+
+
+class OnnxBackend:
+    """
+    Runs the exported `.onnx` graph with onnxruntime.
+
+    The InferenceSession is created once and reused for every call; it is
+    safe to share between request threads.
+    """
+
+    name = 'onnx'
+    default_model_path = ONNX_MODEL_PATH
+    input_dtype = np.float32
+    needs_parity_check = True
+
+    def __init__(self, model_path=None, features=None, intra_op_threads=None):
+        import onnxruntime as ort
+
+        if intra_op_threads is None:
+            intra_op_threads = config.ONNX_INTRA_OP_THREADS
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.model_path = model_path or self.default_model_path
+        self.features = features or FEATURES_ORDER
+        self.session = ort.InferenceSession(
+            self.model_path, sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    @property
+    def nbytes(self):
+        """Approximated by the graph's file size; the session holds the same tree arrays."""
+        return os.path.getsize(self.model_path)
+
+    def predict(self, features):
+        # The graph was exported with a float32 [None, n_features] input
+        X = np.ascontiguousarray(features, dtype=self.input_dtype)
+        output = self.session.run(None, {self.input_name: X})[0]
+        return output.ravel().astype(np.float64)
+
+
+class NpzBackend:
+    """
+    Runs the forest from the flattened node arrays written by
+    4_export_forest_arrays.py, using only NumPy.
+
+    Loading skips unpickling and never imports scikit-learn or pandas, which
+    keeps worker start-up fast and memory small. The export script checks
+    the arrays against the .pkl model, so no parity check is needed here.
+    """
+
+    name = 'npz'
+    default_model_path = NPZ_MODEL_PATH
+    input_dtype = np.float32
+    needs_parity_check = False
+
+    def __init__(self, model_path=None, features=None):
+        self.model_path = model_path or self.default_model_path
+        self.features = features or FEATURES_ORDER
+        self.evaluator = ForestEvaluator.load(self.model_path)
+        if self.evaluator.n_features != len(self.features):
+            raise ValueError(f"Forest expects {self.evaluator.n_features} features, not {len(self.features)}.")
+
+    @property
+    def nbytes(self):
+        return self.evaluator.nbytes
+
+    def predict(self, features):
+        return self.evaluator.predict(features)
+
+
+BACKENDS = {
+    SklearnBackend.name: SklearnBackend,
+    OnnxBackend.name: OnnxBackend,
+    NpzBackend.name: NpzBackend,
+}
+
+# Model file extension -> backend that serves it
+EXTENSION_BACKENDS = {'.pkl': SklearnBackend.name, '.onnx': OnnxBackend.name, '.npz': NpzBackend.name}
+
+
+def backend_for_path(path):
+    """The backend name for a model file, from its extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXTENSION_BACKENDS:
+        raise ValueError(f"Unknown model file type '{extension}'. Use one of: {sorted(EXTENSION_BACKENDS)}")
+    return EXTENSION_BACKENDS[extension]
+
+
+def make_probe_features(num_rows=256, seed=0, features=None):
+    """
+    Builds a deterministic spread of feature rows covering the ranges the
+    model sees in production (see PROBE_RANGES), in the order of `features`
+    (default FEATURES_ORDER). Used to compare backends with each other.
+    """
+    rng = np.random.default_rng(seed)
+    columns = []
+    for name in features or FEATURES_ORDER:
+        method, low, high = PROBE_RANGES[name]
+        columns.append(getattr(rng, method)(low, high, num_rows))
+    return np.column_stack(columns).astype(np.float64)
+
+
+def check_parity(backend, reference, tolerance=None):
+    """
+    Raises ValueError if `backend` and `reference` disagree by more than
+    `tolerance` kW on any probe row. Returns the largest absolute difference.
+    """
+    if tolerance is None:
+        tolerance = config.BACKEND_PARITY_TOLERANCE
+
+    probe = make_probe_features(features=backend.features)
+    max_diff = float(np.max(np.abs(backend.predict(probe) - reference.predict(probe))))
+    if max_diff > tolerance:
+        raise ValueError(
+            f"'{backend.name}' backend disagrees with '{reference.name}' by {max_diff:.6f} kW "
+            f"(tolerance {tolerance} kW)."
+        )
+    return max_diff
+
+
+def load_backend(name=None, model_path=None, features=None):
+    """
+    Creates the inference backend selected in `config.INFERENCE_BACKEND`.
+
+    Backends that are not exact copies of the forest (onnx) are checked
+    against the pickled sklearn model next to them (same file name, `.pkl`),
+    when it is available, before use.
+    """
+    if name is None:
+        name = config.INFERENCE_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}'. Choose one of: {sorted(BACKENDS)}")
+
+    backend = BACKENDS[name](model_path, features)
+    reference_path = os.path.splitext(backend.model_path)[0] + '.pkl'
+    if backend.needs_parity_check and config.VERIFY_BACKEND_PARITY and os.path.exists(reference_path):
+        max_diff = check_parity(backend, SklearnBackend(reference_path, features))
+        print(f"'{name}' backend matches sklearn (max abs diff {max_diff:.2e}).")
+    return backend
@@ -0,0 +1,186 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+Hot-path code records stage latencies with `observe_stage`, which costs one
+clock read and a histogram update, and nothing beyond a function call when
+METRICS_ENABLED is off. Values that already live elsewhere (model version,
+cache counters) are read by collectors at scrape time instead of being
+updated per request.
+
+Metrics are per process: under gunicorn each worker reports its own.
+"""
+import bisect
+import itertools
+import threading
+import time
+import weakref
+
+from backend import config
+
+# Upper bounds (seconds) of the latency histogram buckets: 10 us to 1 s
+LATENCY_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+class _ThreadToken:
+    """Lives in a thread's local storage, so it is freed when the thread exits."""
+
+
+class Histogram:
+    """
+    A Prometheus histogram with one fixed set of buckets per label value.
+
+    Each thread records into its own series, so `observe` takes no lock;
+    the per-thread series are summed when the histogram is rendered. When a
+    thread exits, its series are folded into a shared total, so short-lived
+    threads do not leave anything behind.
+    """
+
+    def __init__(self, name, help_text, label_name, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_name = label_name
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards = {}  # live thread -> {label value: [bucket counts..., sum, count]}
+        self._retired = {}  # the same, summed over threads that have exited
+        self._next_shard = itertools.count()
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = self._local.__dict__.get('series')
+        if shard is None:
+            shard = self._local.series = {}
+            token = self._local.token = _ThreadToken()
+            key = next(self._next_shard)
+            with self._lock:
+                self._shards[key] = shard
+            weakref.finalize(token, self._retire, key)
+        return shard
+
+    def _retire(self, key):
+        with self._lock:
+            shard = self._shards.pop(key)
+            self._add(self._retired, shard)
+
+    @staticmethod
+    def _add(totals, shard):
+        for label_value, series in list(shard.items()):
+            total = totals.setdefault(label_value, [0] * len(series))
+            for i, value in enumerate(series):
+                total[i] += value
+
+    def observe(self, label_value, value):
+        shard = self._shard()
+        series = shard.get(label_value)
+        if series is None:
+            series = shard[label_value] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        totals = {}
+        with self._lock:
+            self._add(totals, self._retired)
+            shards = list(self._shards.values())
+        for shard in shards:
+            self._add(totals, shard)
+        for label_value, series in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                labels = _format_labels([(self.label_name, label_value), ('le', bound)])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels([(self.label_name, label_value)])
+            lines.append(f'{self.name}_sum{labels} {series[-2]}')
+            lines.append(f'{self.name}_count{labels} {series[-1]}')
+        return lines
+
+
+class Counter:
+    """A Prometheus counter, one value per label value."""
+
+    def __init__(self, name, help_text, label_name):
+        self.name = name
+        self.help_text = help_text
+        self.label_name = label_name
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value, amount=1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_value, value in values:
+            lines.append(f'{self.name}{_format_labels([(self.label_name, label_value)])} {value}')
+        return lines
+
+
+STAGE_LATENCY = Histogram(
+    'solar_stage_latency_seconds',
+    'Time spent in each stage of serving a recommendation.',
+    'stage',
+)
+ERRORS = Counter('solar_errors_total', 'Requests that failed, by kind of failure.', 'kind')
+
+_metrics = [STAGE_LATENCY, ERRORS]
+_collectors = []
+
+
+def clock():
+    """Starts timing a stage. Returns 0.0 when metrics are disabled."""
+    return time.perf_counter() if config.METRICS_ENABLED else 0.0
+
+
+def observe_stage(stage, started):
+    """
+    Records the time since `started` for `stage` and returns the current
+    clock, so consecutive stages can be timed with one clock read each.
+    """
+    if not config.METRICS_ENABLED:
+        return 0.0
+    now = time.perf_counter()
+    STAGE_LATENCY.observe(stage, now - started)
+    return now
+
+
+def count_error(kind):
+    if config.METRICS_ENABLED:
+        ERRORS.inc(kind)
+
+
+def register_collector(collect):
+    """
+    Registers `collect()`, called at scrape time. It returns a list of
+    (name, type, help, [(labels, value), ...]) tuples, labels being a list of
+    (name, value) pairs.
+    """
+    _collectors.append(collect)
+
+
+def render_metrics():
+    """Returns every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        for name, metric_type, help_text, samples in collect():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in samples:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,172 @@
+"""
+Lifecycle management for the served loss model: eager loading and warm-up,
+readiness reporting, and hot reload when the model file changes on disk.
+"""
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from backend import config
+from .inference_backends import BACKENDS, MODEL_DIR, load_backend, make_probe_features
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Returns the hex SHA-256 digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def public_path(path):
+    """
+    The model path as reported by the API: relative to MODEL_DIR, or just the
+    file name for models kept elsewhere, never the server's absolute path.
+    """
+    relative = os.path.relpath(os.path.abspath(path), os.path.abspath(MODEL_DIR))
+    if relative.startswith(os.pardir):
+        return os.path.basename(path)
+    return relative
+
+
+class ModelManager:
+    """
+    Owns the model instance that RecommendationService predicts with.
+
+    A reload builds and warms up the new backend completely before swapping
+    it in with a single reference assignment, so requests that are already
+    running keep using the old model and new requests never wait on a load.
+    If the new file fails to load, the old model stays in service.
+    """
+
+    def __init__(self, backend_name=None, model_path=None):
+        self.backend_name = backend_name
+        self._model_path = model_path
+        self._model = None
+        self._info = {}
+        self._load_lock = threading.Lock()
+        self._reload_listeners = []
+        self._watcher = None
+        self._stop_event = threading.Event()
+        self.last_error = None
+        self.load_count = 0
+        self.load_failures = 0
+
+    @property
+    def model_path(self):
+        if self._model_path:
+            return self._model_path
+        backend_name = self.backend_name or config.INFERENCE_BACKEND
+        return BACKENDS[backend_name].default_model_path
+
+    def is_ready(self):
+        return self._model is not None
+
+    def get_model(self):
+        """Returns the current model, loading it on first use. None if it cannot be loaded."""
+        model = self._model
+        if model is None:
+            self.load()
+            model = self._model
+        return model
+
+    def add_reload_listener(self, callback):
+        """Registers `callback(info)` to run after every successful (re)load."""
+        self._reload_listeners.append(callback)
+
+    def load(self):
+        """
+        Loads, warms up and swaps in the model. Returns True on success.
+        Concurrent callers wait for a load that is already running instead of
+        starting a second one.
+        """
+        with self._load_lock:
+            path = self.model_path
+            try:
+                stat = os.stat(path)
+                start = time.perf_counter()
+                model = load_backend(self.backend_name, path)
+                self._warm_up(model)
+                load_seconds = time.perf_counter() - start
+                sha256 = file_sha256(path)
+            except Exception as e:
+                # A half-written or corrupt file must never take the old model down
+                # Reported on /api/model, so the server's paths are left out
+                self.last_error = str(e).replace(path, public_path(path))
+                self.load_failures += 1
+                print(f"Error: Could not load model from {os.path.abspath(path)}: {e}")
+                return False
+
+            info = {
+                'backend': model.name,
+                'path': public_path(path),
+                'sha256': sha256,
+                'version': sha256[:12],
+                'loaded_at': datetime.now(timezone.utc).isoformat(),
+                'load_seconds': round(load_seconds, 4),
+                'file_mtime': stat.st_mtime,
+                'file_size': stat.st_size,
+            }
+            # Atomic swap: in-flight requests hold a reference to the old model
+            self._model = model
+            self._info = info
+            self.last_error = None
+            self.load_count += 1
+            print(f"Model version {info['version']} loaded in {info['load_seconds']}s ({model.name} backend).")
+
+        for callback in self._reload_listeners:
+            callback(info)
+        return True
+
+    @staticmethod
+    def _warm_up(model):
+        """Runs a dummy predict so the first real request does not pay for lazy initialisation."""
+        model.predict(make_probe_features(num_rows=1))
+        model.predict(make_probe_features(num_rows=8))
+
+    def info(self):
+        """Returns metadata about the model currently in service."""
+        info = dict(self._info)
+        info['ready'] = self.is_ready()
+        if self.last_error:
+            info['last_error'] = self.last_error
+        return info
+
+    def has_changed_on_disk(self):
+        """True when the model file's mtime or size differs from the loaded copy."""
+        try:
+            stat = os.stat(self.model_path)
+        except OSError:
+            return False
+        return (stat.st_mtime, stat.st_size) != (self._info.get('file_mtime'), self._info.get('file_size'))
+
+    def check_for_update(self):
+        """Reloads the model if its file changed. Returns True when a reload happened."""
+        if self.has_changed_on_disk():
+            print("Model file changed on disk. Reloading...")
+            return self.load()
+        return False
+
+    def start_watcher(self, interval_seconds=None):
+        """Starts a daemon thread that polls the model file and hot-reloads it."""
+        if interval_seconds is None:
+            interval_seconds = config.MODEL_RELOAD_INTERVAL_SECONDS
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        def watch():
+            while not self._stop_event.wait(interval_seconds):
+                self.check_for_update()
+
+        self._stop_event.clear()
+        self._watcher = threading.Thread(target=watch, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
@@ -0,0 +1,280 @@
+"""
+Named, versioned models served next to the default loss model.
+
+The default loss model stays with ModelManager (eager load, warm-up, hot
+reload). Every other model (the power output model, per-region loss models,
+per-site models for a large fleet) is listed in the registry and only loaded
+when a request first asks for it. Loaded models are kept in least recently
+used order; once their total size exceeds MODEL_MEMORY_BUDGET_MB, the coldest
+ones are dropped and loaded again the next time they are needed. The
+default model is always resident and does not count against the budget.
+
+Models are listed in a JSON manifest (MODEL_REGISTRY_MANIFEST):
+
+    {
+      "models": {
+        "loss-east": {
+          "kind": "loss",
+          "default_version": "v2",
+          "versions": {"v1": "registry/loss-east/v1.npz", "v2": "registry/loss-east/v2.npz"}
+        }
+      }
+    }
+
+Relative paths are resolved against the manifest's directory, and the
+backend is picked from the file extension (.npz, .pkl or .onnx).
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from backend import config
+from .inference_backends import (
+    FEATURES_ORDER, POWER_FEATURES_ORDER, backend_for_path, load_backend, make_probe_features,
+)
+
+# What each kind of model predicts from, in column order
+MODEL_KINDS = {
+    'loss': FEATURES_ORDER,       # hourly energy loss (kW)
+    'power': POWER_FEATURES_ORDER,  # power output (kW)
+}
+
+
+class ModelNotFoundError(LookupError):
+    """Raised for a model name or version the registry does not know."""
+
+
+class ModelRegistry:
+    """
+    Resolves (name, version) to a model, loading registered models lazily
+    and evicting the least recently used ones beyond the memory budget.
+
+    Models evicted while a request still uses them stay valid for that
+    request; they are freed once the last reference goes.
+    """
+
+    def __init__(self, default_manager, default_name=None):
+        self.default_manager = default_manager
+        self.default_name = default_name or config.DEFAULT_MODEL_NAME
+        self._models = {}             # name -> {'kind', 'default_version', 'versions': {version: path}}
+        self._loaded = OrderedDict()  # (name, version) -> loaded entry, least recently used first
+        self._loaded_bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.hits = 0
+        self.loads = 0
+        self.load_failures = 0
+        self.evictions = 0
+
+    @property
+    def loaded_bytes(self):
+        return self._loaded_bytes
+
+    def register(self, name, kind, versions, default_version=None):
+        """
+        Adds (or replaces) a model. `versions` maps version labels to model
+        files; the default version is the last label in sorted order unless
+        given. Loaded versions of a replaced model are dropped.
+        """
+        if name == self.default_name:
+            raise ValueError(f"'{name}' is the default model's name and cannot be registered.")
+        if kind not in MODEL_KINDS:
+            raise ValueError(f"Unknown model kind '{kind}'. Choose one of: {sorted(MODEL_KINDS)}")
+        if not versions:
+            raise ValueError(f"Model '{name}' needs at least one version.")
+        default_version = default_version or sorted(versions)[-1]
+        if default_version not in versions:
+            raise ValueError(f"Default version '{default_version}' of model '{name}' is not one of its versions.")
+        for path in versions.values():
+            backend_for_path(path)  # raises for unsupported file types
+
+        with self._lock:
+            self._models[name] = {'kind': kind, 'default_version': default_version, 'versions': dict(versions)}
+            for key in [key for key in self._loaded if key[0] == name]:
+                self._drop(key)
+
+    def load_manifest(self, path):
+        """
+        Registers every model in a manifest file. Returns how many were
+        registered; a missing or invalid manifest registers none.
+        """
+        if not os.path.exists(path):
+            return 0
+        base_dir = os.path.dirname(os.path.abspath(path))
+        try:
+            with open(path) as f:
+                models = json.load(f)['models']
+            for name, spec in models.items():
+                versions = {
+                    version: os.path.join(base_dir, model_path)
+                    for version, model_path in spec['versions'].items()
+                }
+                self.register(name, spec['kind'], versions, spec.get('default_version'))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Error: Could not read model registry manifest {os.path.abspath(path)}: {e}")
+            return 0
+        print(f"Model registry: {len(models)} model(s) registered from {os.path.abspath(path)}")
+        return len(models)
+
+    def resolve(self, name=None, version=None, kind=None):
+        """
+        Returns the (name, version) a request refers to, filling in defaults.
+        The default model resolves to version None. Raises ModelNotFoundError,
+        also when `kind` is given and the model is of another kind.
+        """
+        if kind is not None and self.kind(name) != kind:
+            raise ModelNotFoundError(
+                f"Model '{name or self.default_name}' is a {self.kind(name)} model, not a {kind} model."
+            )
+        if name is None or name == self.default_name:
+            current = self.default_manager.info().get('version')
+            if version is not None and version != current:
+                raise ModelNotFoundError(
+                    f"Model '{self.default_name}' only serves its current version ({current})."
+                )
+            return self.default_name, None
+        spec = self._models.get(name)
+        if spec is None:
+            raise ModelNotFoundError(f"Unknown model '{name}'.")
+        version = version or spec['default_version']
+        if version not in spec['versions']:
+            raise ModelNotFoundError(f"Model '{name}' has no version '{version}'.")
+        return name, version
+
+    def kind(self, name):
+        if name is None or name == self.default_name:
+            return 'loss'
+        spec = self._models.get(name)
+        if spec is None:
+            raise ModelNotFoundError(f"Unknown model '{name}'.")
+        return spec['kind']
+
+    def get(self, name=None, version=None):
+        """
+        Returns the model for (name, version), loading it on first use.
+        None if its file cannot be loaded. Raises ModelNotFoundError.
+        """
+        name, version = self.resolve(name, version)
+        if version is None:
+            return self.default_manager.get_model()
+
+        key = (name, version)
+        model = self._lookup(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        # Concurrent requests for the same cold model wait for one load
+        with load_lock:
+            model = self._lookup(key)
+            if model is not None:
+                return model
+            entry = self._load(name, version)
+            if entry is None:
+                return None
+            with self._lock:
+                self._loaded[key] = entry
+                self._loaded_bytes += entry['nbytes']
+                self._evict()
+        return entry['model']
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._loaded.get(key)
+            if entry is None:
+                return None
+            self._loaded.move_to_end(key)
+            self.hits += 1
+            return entry['model']
+
+    def _load(self, name, version):
+        spec = self._models[name]
+        path = spec['versions'][version]
+        features = MODEL_KINDS[spec['kind']]
+        try:
+            start = time.perf_counter()
+            model = load_backend(backend_for_path(path), path, features)
+            # Warm up, like the default model, before the first real request
+            model.predict(make_probe_features(num_rows=1, features=features))
+            load_seconds = time.perf_counter() - start
+        except Exception as e:
+            self.load_failures += 1
+            print(f"Error: Could not load model '{name}' version '{version}' from {os.path.abspath(path)}: {e}")
+            return None
+
+        self.loads += 1
+        print(f"Model '{name}' version '{version}' loaded in {load_seconds:.4f}s ({model.name} backend).")
+        return {
+            'model': model,
+            'nbytes': model.nbytes,
+            'backend': model.name,
+            'loaded_at': datetime.now(timezone.utc).isoformat(),
+            'load_seconds': round(load_seconds, 4),
+        }
+
+    def _evict(self):
+        """Drops least recently used models until the loaded ones fit the budget. Call with the lock held."""
+        budget = config.MODEL_MEMORY_BUDGET_MB * 1024 * 1024
+        # The most recently used model always stays, even if it alone exceeds the budget
+        while self._loaded_bytes > budget and len(self._loaded) > 1:
+            key = next(iter(self._loaded))
+            self._drop(key)
+            self.evictions += 1
+            print(f"Model '{key[0]}' version '{key[1]}' evicted to stay within {config.MODEL_MEMORY_BUDGET_MB} MB.")
+
+    def _drop(self, key):
+        entry = self._loaded.pop(key)
+        self._loaded_bytes -= entry['nbytes']
+
+    def info(self):
+        """Registered models, which versions are loaded, and the budget counters."""
+        with self._lock:
+            loaded = {key: dict(entry) for key, entry in self._loaded.items()}
+            models = {name: dict(spec) for name, spec in self._models.items()}
+            loaded_bytes = self._loaded_bytes
+
+        default_info = self.default_manager.info()
+        listing = [{
+            'name': self.default_name,
+            'kind': 'loss',
+            'default': True,
+            'default_version': default_info.get('version'),
+            'versions': [default_info['version']] if default_info['ready'] else [],
+            'loaded_versions': {
+                default_info['version']: {
+                    'backend': default_info['backend'],
+                    'loaded_at': default_info['loaded_at'],
+                    'load_seconds': default_info['load_seconds'],
+                }
+            } if default_info['ready'] else {},
+        }]
+        for name, spec in sorted(models.items()):
+            listing.append({
+                'name': name,
+                'kind': spec['kind'],
+                'default': False,
+                'default_version': spec['default_version'],
+                'versions': sorted(spec['versions']),
+                'loaded_versions': {
+                    version: {
+                        'backend': entry['backend'],
+                        'size_mb': round(entry['nbytes'] / (1024 * 1024), 2),
+                        'loaded_at': entry['loaded_at'],
+                        'load_seconds': entry['load_seconds'],
+                    }
+                    for (loaded_name, version), entry in loaded.items() if loaded_name == name
+                },
+            })
+        return {
+            'memory_budget_mb': config.MODEL_MEMORY_BUDGET_MB,
+            'loaded_mb': round(loaded_bytes / (1024 * 1024), 2),
+            'hits': self.hits,
+            'loads': self.loads,
+            'load_failures': self.load_failures,
+            'evictions': self.evictions,
+            'models': listing,
+        }
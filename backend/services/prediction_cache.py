@@ -0,0 +1,76 @@
+"""
+A bounded LRU cache for loss predictions, keyed on quantized feature vectors.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Maps a quantized feature vector to the model's prediction for it.
+
+    Each feature is snapped to a grid (e.g. 0.5 °C for temperature, 1 % for
+    cloud cover) before lookup, so callers whose inputs fall in the same grid
+    cell share one entry. Entries expire after `ttl_seconds`, and the least
+    recently used entry is evicted once `max_size` is reached.
+    """
+
+    def __init__(self, features, resolutions, max_size=10000, ttl_seconds=300):
+        self.features = list(features)
+        self.steps = [float(resolutions.get(name, 1)) for name in self.features]
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, conditions):
+        """Quantizes a conditions dict into a hashable cache key."""
+        return tuple(round(conditions[name] / step) for name, step in zip(self.features, self.steps))
+
+    def key_to_features(self, key):
+        """Returns the grid point a key stands for, in feature order."""
+        return [index * step for index, step in zip(key, self.steps)]
+
+    def get(self, key):
+        """Returns the cached prediction for `key`, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops every entry, e.g. after the model has been reloaded."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -1,30 +1,173 @@
-import joblib
-import pandas as pd
+import functools
 import os
+import threading
+
+import numpy as np
 from backend import config
+from . import metrics
+from .batcher import MicroBatcher
+from .drift_monitor import DriftMonitor
+from .inference_backends import (
+    DRIFT_REFERENCE_PATH, FEATURES_ORDER, MODEL_DIR, POWER_FEATURES_ORDER, POWER_MODEL_PATH,
+)
+from .model_manager import ModelManager
+from .model_registry import ModelNotFoundError, ModelRegistry
+from .prediction_cache import PredictionCache
+from .telemetry import PanelStateTable, TelemetryScorer
+
+
+# Per-thread scratch space for the single-row fast path
+_thread_state = threading.local()
 
 
 class RecommendationService:
-    _loss_model = None
+    # Owns loading, warm-up and hot reload of the loss model (see model_manager.py)
+    model_manager = ModelManager()
+
+    # Other named and versioned models, loaded on first use (see model_registry.py)
+    model_registry = ModelRegistry(model_manager)
+
+    # Optional cache of predictions keyed on quantized inputs (see prediction_cache.py)
+    prediction_cache = PredictionCache(
+        FEATURES_ORDER,
+        config.PREDICTION_CACHE_RESOLUTIONS,
+        max_size=config.PREDICTION_CACHE_MAX_SIZE,
+        ttl_seconds=config.PREDICTION_CACHE_TTL_SECONDS,
+    )
+
+    # Optional coalescing of concurrent single-row predictions (see batcher.py)
+    batcher = MicroBatcher(
+        lambda: RecommendationService.model_manager.get_model(),
+        len(FEATURES_ORDER),
+        window_ms=config.MICRO_BATCH_WINDOW_MS,
+        max_batch_size=config.MICRO_BATCH_MAX_SIZE,
+        timeout_seconds=config.MICRO_BATCH_TIMEOUT_SECONDS,
+    )
+
+    # Drift of the rows the default loss model scores from its training data (see drift_monitor.py)
+    drift_monitor = DriftMonitor(
+        DRIFT_REFERENCE_PATH,
+        FEATURES_ORDER,
+        window_size=config.DRIFT_WINDOW_SIZE,
+        min_samples=config.DRIFT_MIN_SAMPLES,
+        psi_threshold=config.DRIFT_PSI_THRESHOLD,
+        mae_ratio_threshold=config.DRIFT_MAE_RATIO_THRESHOLD,
+    )
+
+    # Per-panel state fed by /api/telemetry, scored in the background (see telemetry.py)
+    panel_states = PanelStateTable(config.TELEMETRY_MAX_PANELS)
+    telemetry_scorer = TelemetryScorer(
+        panel_states,
+        lambda: RecommendationService.model_manager.get_model(),
+        interval_seconds=config.TELEMETRY_SCORE_INTERVAL_SECONDS,
+        max_batch_size=config.MAX_BATCH_SIZE,
+        on_scored=lambda X, predictions, observed: RecommendationService._monitor_batch(X, predictions, observed),
+    )
+
+    @classmethod
+    def _get_model(cls, model_name=None, model_version=None, kind='loss'):
+        """
+        Returns the requested model, loading it on first use if needed (None if
+        it cannot be loaded). Without a name or version, that is the default
+        loss model. Raises ModelNotFoundError for an unknown model or version,
+        or for a model of another kind.
+        """
+        if model_name is None and model_version is None:
+            return cls.model_manager.get_model()
+        name, version = cls.model_registry.resolve(model_name, model_version, kind)
+        return cls.model_registry.get(name, version)
+
+    @classmethod
+    def _is_default_model(cls, model):
+        """The prediction cache and micro-batcher only hold results of the default model."""
+        return model is cls.model_manager.get_model()
+
+    @classmethod
+    def _monitor_batch(cls, X, predictions, observed_loss_kw=None):
+        """Feeds rows scored by the default loss model to the drift monitor."""
+        if config.DRIFT_MONITORING_ENABLED:
+            cls.drift_monitor.observe_batch(X, predictions, observed_loss_kw)
+
+    @staticmethod
+    def _row_buffer():
+        """
+        Returns this thread's preallocated (1, n_features) input row.
+        Filling it in place avoids building a DataFrame for every request.
+        """
+        buffer = getattr(_thread_state, 'row', None)
+        if buffer is None:
+            buffer = _thread_state.row = np.empty((1, len(FEATURES_ORDER)), dtype=np.float32)
+        return buffer
 
     @classmethod
-    def _get_model(cls):
-        """Loads the loss prediction model."""
-        if cls._loss_model is None:
-            # UPDATED PATH: This path will work once the file is moved to the 'services' folder.
-            script_dir = os.path.dirname(__file__)
-            model_path = os.path.join(script_dir, '..', 'ml_training', 'saved_model', 'loss_prediction_model.pkl')
-            try:
-                print(f"Attempting to load model from: {os.path.abspath(model_path)}")
-                cls._loss_model = joblib.load(model_path)
-                print("Model loaded successfully.")
-            except FileNotFoundError:
-                print("Error: Model file not found at the specified path.")
-                return None
-        return cls._loss_model
+    def _predict_loss(cls, model, current_conditions, shared=True):
+        """
+        Predicts the hourly loss (kW) for one conditions dict. Returns a plain float.
+        `shared=False` bypasses the prediction cache and micro-batcher (for models
+        other than the default one).
+        """
+        started = metrics.clock()
+        cache = cls.prediction_cache if config.PREDICTION_CACHE_ENABLED and shared else None
+        if cache is not None:
+            key = cache.make_key(current_conditions)
+            value = cache.get(key)
+            if value is not None:
+                return value
+            values = cache.key_to_features(key)
+        else:
+            # Converted here so a bad value fails this request, not a shared batch
+            values = [float(current_conditions[name]) for name in FEATURES_ORDER]
+
+        if config.MICRO_BATCHING_ENABLED and shared:
+            started = metrics.observe_stage('features', started)
+            value = cls.batcher.predict(values)
+        else:
+            row = cls._row_buffer()
+            row[0] = values
+            started = metrics.observe_stage('features', started)
+            value = float(model.predict(row)[0])
+        metrics.observe_stage('predict', started)
+        if cache is not None:
+            cache.put(key, value)
+        return value
 
     @classmethod
-    def generate_recommendations(cls, current_conditions):
+    def _predict_losses(cls, model, conditions_list, shared=True):
+        """
+        Predicts the hourly loss (kW) for each conditions dict with one model call.
+
+        With the prediction cache enabled (and `shared`), inputs are snapped to
+        the cache's grid; cached grid points are served directly and only the
+        misses are sent to the model.
+        """
+        if not config.PREDICTION_CACHE_ENABLED or not shared:
+            X = np.array(
+                [[conditions[name] for name in FEATURES_ORDER] for conditions in conditions_list],
+                dtype=np.float32,
+            )
+            return model.predict(X)
+
+        cache = cls.prediction_cache
+        losses = np.empty(len(conditions_list))
+        missing = {}  # cache key -> positions waiting for it
+        for i, conditions in enumerate(conditions_list):
+            key = cache.make_key(conditions)
+            value = cache.get(key)
+            if value is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                losses[i] = value
+
+        if missing:
+            missing_keys = list(missing)
+            X = np.array([cache.key_to_features(key) for key in missing_keys], dtype=np.float32)
+            for key, value in zip(missing_keys, model.predict(X).tolist()):
+                cache.put(key, value)
+                losses[missing[key]] = value
+        return losses
+
+    @classmethod
+    def generate_recommendations(cls, current_conditions, model_name=None, model_version=None):
         """
         Predicts energy loss and generates a maintenance recommendation.
 
@@ -39,57 +182,419 @@ class RecommendationService:
                                         'hour': 12,
                                         'day_of_year': 150
                                     }
+            An optional 'observed_loss_kw' (the loss actually measured) is
+            only used for drift monitoring.
+            model_name (str): A loss model from the registry (default: the
+                default loss model). model_version picks one of its versions.
         
         Returns:
             dict: A dictionary containing the prediction and a recommendation.
         """
-        model = cls._get_model()
+        try:
+            model = cls._get_model(model_name, model_version)
+        except ModelNotFoundError as e:
+            metrics.count_error('unknown_model')
+            return {"error": str(e)}
         if model is None:
+            metrics.count_error('model_unavailable')
             return {"error": "Loss prediction model not found."}
 
         try:
-            # Prepare data for prediction
-            df = pd.DataFrame([current_conditions])
-            features_order = [
-                'temperature_celsius', 'cloud_cover_percentage', 'panel_age_in_days',
-                'days_since_cleaning', 'hour', 'day_of_year'
-            ]
-            df = df[features_order]
-
             # Predict the current hourly loss
-            predicted_hourly_loss_kw = model.predict(df)[0]
-            # print(model.predict(df))
+            shared = model_name is None or cls._is_default_model(model)
+            predicted_hourly_loss_kw = cls._predict_loss(model, current_conditions, shared=shared)
+            started = metrics.clock()
+
+            if shared and config.DRIFT_MONITORING_ENABLED:
+                cls.drift_monitor.observe(
+                    [current_conditions[name] for name in FEATURES_ORDER],
+                    predicted_hourly_loss_kw,
+                    current_conditions.get('observed_loss_kw'),
+                )
+                started = metrics.observe_stage('monitor', started)
 
             # --- Recommendation Logic ---
             # Estimate the financial loss over a full day (e.g., 8 peak sun hours)
-            estimated_daily_loss_kwh = predicted_hourly_loss_kw * 8
+            estimated_daily_loss_kwh = predicted_hourly_loss_kw * config.PEAK_SUN_HOURS
             daily_financial_loss = estimated_daily_loss_kwh * config.ENERGY_VALUE_PER_KWH
-            
-
-            recommendation = "No immediate action required. System performing within expected parameters."
-            action_required = False
-
-            # CORRECTED RULE: Lower the threshold to make it more sensitive.
-            # Let's trigger a recommendation if the daily loss is greater than the threshold
-            if daily_financial_loss > config.RECOMMENDATION_THRESHOLD_INR:
-                action_required = True
-                recommendation = (
-                    f"High energy loss detected due to soiling. "
-                    f"Estimated daily financial loss: ₹{daily_financial_loss:.2f}. "
-                    f"Recommend scheduling panel cleaning. The cost of cleaning (₹{config.CLEANING_COST}) "
-                    f"could be recovered in approximately {config.CLEANING_COST / daily_financial_loss:.1f} days."
-                )
+            action_required = bool(daily_financial_loss > config.RECOMMENDATION_THRESHOLD_INR)
 
-            return {
-                "predicted_hourly_loss_kw": round(predicted_hourly_loss_kw, 4),
-                "estimated_daily_financial_loss": round(daily_financial_loss, 2),
-                "action_required": action_required,
-                "recommendation_message": recommendation
-            }
+            recommendation = cls._format_recommendation(predicted_hourly_loss_kw, daily_financial_loss, action_required)
+            metrics.observe_stage('format', started)
+            return recommendation
 
         except Exception as e:
+            metrics.count_error('recommendation')
             return {"error": f"An error occurred during recommendation generation: {e}"}
 
+    @classmethod
+    def generate_batch_recommendations(cls, conditions_list, model_name=None, model_version=None):
+        """
+        Scores many panels with a single model call.
+
+        Args:
+            conditions_list (list): A list of condition dicts, each shaped like
+                the `current_conditions` argument of `generate_recommendations`.
+            model_name, model_version: As for `generate_recommendations`.
+
+        Returns:
+            list: One result dict per input, in the same order. Every result has
+            the same keys as a single recommendation.
+        """
+        try:
+            model = cls._get_model(model_name, model_version)
+        except ModelNotFoundError as e:
+            return [{"error": str(e)} for _ in conditions_list]
+        if model is None:
+            return [{"error": "Loss prediction model not found."} for _ in conditions_list]
+        if not conditions_list:
+            return []
+
+        try:
+            # One feature matrix for the whole fleet, one RandomForest pass
+            shared = cls._is_default_model(model)
+            predicted_hourly_loss_kw = cls._predict_losses(model, conditions_list, shared=shared)
+            if shared and config.DRIFT_MONITORING_ENABLED:
+                cls._monitor_batch(
+                    [[conditions[name] for name in FEATURES_ORDER] for conditions in conditions_list],
+                    predicted_hourly_loss_kw,
+                    [conditions.get('observed_loss_kw', np.nan) for conditions in conditions_list],
+                )
+
+            # --- Recommendation Logic (vectorized) ---
+            daily_financial_loss = (
+                predicted_hourly_loss_kw * config.PEAK_SUN_HOURS * config.ENERGY_VALUE_PER_KWH
+            )
+            action_required = daily_financial_loss > config.RECOMMENDATION_THRESHOLD_INR
+
+            return [
+                cls._format_recommendation(loss, daily, action)
+                for loss, daily, action in zip(
+                    predicted_hourly_loss_kw.tolist(),
+                    daily_financial_loss.tolist(),
+                    action_required.tolist(),
+                )
+            ]
+
+        except Exception as e:
+            return [
+                {"error": f"An error occurred during recommendation generation: {e}"}
+                for _ in conditions_list
+            ]
+
+    @staticmethod
+    def schedule_rows(horizon_days, num_panels=1):
+        """Model rows needed to plan `num_panels` panels over `horizon_days`."""
+        rows_per_hour = horizon_days + horizon_days * (horizon_days + 1) // 2
+        return num_panels * len(config.SCHEDULE_SAMPLE_HOURS) * rows_per_hour
+
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _schedule_grid(horizon_days):
+        """
+        The (day, days since the plan started or cleaning happened) pairs of
+        one panel's plan, shared by every panel with the same horizon.
+
+        Day t of the horizon is scored once as it would be without cleaning,
+        and once for every possible cleaning day d <= t (days_since_cleaning =
+        t - d). The first `horizon_days` pairs are the uncleaned days; the
+        rest follow np.tril_indices order. `uncleaned` marks the pairs whose
+        days_since_cleaning still adds the panel's current value.
+        """
+        days = np.arange(horizon_days)
+        cleaned_day, cleaning_day = np.tril_indices(horizon_days)
+        day = np.concatenate([days, cleaned_day]).astype(np.float32)
+        elapsed = np.concatenate([days, cleaned_day - cleaning_day]).astype(np.float32)
+        uncleaned = np.arange(len(day)) < horizon_days
+        for array in (day, elapsed, uncleaned):
+            array.setflags(write=False)
+        return day, elapsed, uncleaned
+
+    @classmethod
+    def _schedule_features(cls, conditions, horizon_days, hours, out=None):
+        """
+        Builds every feature row one panel's cleaning plan needs, in the
+        order of `_schedule_grid`, repeated for each sampled hour. Fills
+        `out` (shape (len(hours) * grid rows, n_features)) when given.
+        """
+        day, elapsed, uncleaned = cls._schedule_grid(horizon_days)
+        n = len(day)
+        X = out if out is not None else np.empty((len(hours) * n, len(FEATURES_ORDER)), dtype=np.float32)
+        block = X[:n]
+        columns = {
+            'temperature_celsius': conditions['temperature_celsius'],
+            'cloud_cover_percentage': conditions['cloud_cover_percentage'],
+            'panel_age_in_days': conditions['panel_age_in_days'] + day,
+            'days_since_cleaning': elapsed + np.where(uncleaned, conditions['days_since_cleaning'], 0),
+            'hour': hours[0],
+            'day_of_year': (conditions['day_of_year'] - 1 + day) % 365 + 1,
+        }
+        for j, name in enumerate(FEATURES_ORDER):
+            block[:, j] = columns[name]
+        # Other hours only differ in the hour column
+        hour_column = FEATURES_ORDER.index('hour')
+        for h in range(1, len(hours)):
+            X[h * n:(h + 1) * n] = block
+            X[h * n:(h + 1) * n, hour_column] = hours[h]
+        return X
+
+    @staticmethod
+    def _plan_cleaning(daily_loss_inr, horizon_days):
+        """
+        Picks the best day to clean from one panel's daily losses (INR).
+
+        `daily_loss_inr` is laid out like `_schedule_features` rows. Cleaning
+        on day d costs CLEANING_COST, plus the uncleaned losses before d,
+        plus the post-cleaning losses from d onwards.
+        """
+        uncleaned = daily_loss_inr[:horizon_days]
+        cleaned = np.zeros((horizon_days, horizon_days))  # cleaned[t, d]
+        cleaned[np.tril_indices(horizon_days)] = daily_loss_inr[horizon_days:]
+
+        loss_before = np.concatenate([[0.0], np.cumsum(uncleaned)[:-1]])
+        loss_after = cleaned.sum(axis=0)
+        total_cost = config.CLEANING_COST + loss_before + loss_after
+        cost_without_cleaning = float(uncleaned.sum())
+
+        best_day = int(np.argmin(total_cost))
+        action_required = bool(total_cost[best_day] < cost_without_cleaning)
+        break_even_day = None
+        if action_required:
+            # First day on which the savings since cleaning cover its cost
+            savings = np.cumsum(uncleaned[best_day:] - cleaned[best_day:, best_day])
+            break_even_day = best_day + int(np.argmax(savings >= config.CLEANING_COST))
+
+        if action_required:
+            recommendation = (
+                f"Clean the panels in {best_day} day(s). "
+                f"The cleaning (₹{config.CLEANING_COST}) pays for itself by day {break_even_day} and saves "
+                f"₹{cost_without_cleaning - total_cost[best_day]:.2f} over the next {horizon_days} days."
+            )
+        else:
+            recommendation = (
+                f"No cleaning needed in the next {horizon_days} days. Expected losses are "
+                f"₹{cost_without_cleaning:.2f} without cleaning and at least ₹{total_cost[best_day]:.2f} "
+                f"with it, including the cost of cleaning (₹{config.CLEANING_COST})."
+            )
+
+        return {
+            "horizon_days": horizon_days,
+            "action_required": action_required,
+            "best_cleaning_day": best_day if action_required else None,
+            "break_even_day": break_even_day,
+            "cost_without_cleaning_inr": round(cost_without_cleaning, 2),
+            "cost_with_best_cleaning_inr": round(float(total_cost[best_day]), 2),
+            "daily_loss_without_cleaning_inr": np.round(uncleaned, 2).tolist(),
+            "recommendation_message": recommendation
+        }
+
+    @classmethod
+    def generate_batch_cleaning_schedules(cls, conditions_list, horizon_days=None, model_name=None, model_version=None):
+        """
+        Finds the best cleaning day over the next `horizon_days` for many
+        panels. Panels are scored together, one model call per
+        SCHEDULE_CHUNK_ROWS rows, so memory stays bounded for large fleets.
+
+        Args:
+            conditions_list (list): Condition dicts shaped like the
+                `current_conditions` argument of `generate_recommendations`.
+                Temperature and cloud cover are assumed to hold over the
+                horizon; `hour` is replaced by SCHEDULE_SAMPLE_HOURS.
+            horizon_days (int): Days to plan ahead, day 0 being today.
+            model_name, model_version: As for `generate_recommendations`.
+
+        Returns:
+            list: One plan dict per input, in the same order.
+        """
+        horizon_days = horizon_days or config.SCHEDULE_DEFAULT_HORIZON_DAYS
+        try:
+            model = cls._get_model(model_name, model_version)
+        except ModelNotFoundError as e:
+            return [{"error": str(e)} for _ in conditions_list]
+        if model is None:
+            return [{"error": "Loss prediction model not found."} for _ in conditions_list]
+        if not conditions_list:
+            return []
+
+        try:
+            hours = config.SCHEDULE_SAMPLE_HOURS
+            rows_per_panel = cls.schedule_rows(horizon_days)
+            panels_per_chunk = max(1, config.SCHEDULE_CHUNK_ROWS // rows_per_panel)
+            buffer = np.empty((min(panels_per_chunk, len(conditions_list)) * rows_per_panel, len(FEATURES_ORDER)),
+                              dtype=np.float32)
+            plans = []
+            for start in range(0, len(conditions_list), panels_per_chunk):
+                chunk = conditions_list[start:start + panels_per_chunk]
+                for i, conditions in enumerate(chunk):
+                    cls._schedule_features(conditions, horizon_days, hours,
+                                           out=buffer[i * rows_per_panel:(i + 1) * rows_per_panel])
+                predicted_hourly_loss_kw = np.asarray(model.predict(buffer[:len(chunk) * rows_per_panel]))
+
+                # Mean over the sampled hours, scaled to a day like generate_recommendations
+                daily_loss_inr = (
+                    predicted_hourly_loss_kw.reshape(len(chunk), len(hours), -1).mean(axis=1)
+                    * config.PEAK_SUN_HOURS * config.ENERGY_VALUE_PER_KWH
+                )
+                plans.extend(cls._plan_cleaning(panel_loss, horizon_days) for panel_loss in daily_loss_inr)
+            return plans
+
+        except Exception as e:
+            return [
+                {"error": f"An error occurred during schedule generation: {e}"}
+                for _ in conditions_list
+            ]
+
+    @classmethod
+    def generate_cleaning_schedule(cls, current_conditions, horizon_days=None, model_name=None, model_version=None):
+        """Finds the best cleaning day for one panel. See generate_batch_cleaning_schedules."""
+        return cls.generate_batch_cleaning_schedules([current_conditions], horizon_days, model_name, model_version)[0]
+
+    @classmethod
+    def predict_power_output(cls, conditions_list, model_name='power', model_version=None):
+        """
+        Predicts each panel's power output (kW) with a power model from the registry.
+
+        Args:
+            conditions_list (list): Condition dicts with the keys in
+                POWER_FEATURES_ORDER.
+
+        Returns:
+            list: One {"predicted_power_output_kw": ...} dict per input, in the
+            same order.
+        """
+        try:
+            model = cls._get_model(model_name, model_version, kind='power')
+        except ModelNotFoundError as e:
+            return [{"error": str(e)} for _ in conditions_list]
+        if model is None:
+            return [{"error": "Power output model not found."} for _ in conditions_list]
+        if not conditions_list:
+            return []
+
+        try:
+            X = np.array(
+                [[conditions[name] for name in POWER_FEATURES_ORDER] for conditions in conditions_list],
+                dtype=np.float32,
+            )
+            return [
+                {"predicted_power_output_kw": round(power, 4)}
+                for power in model.predict(X).tolist()
+            ]
+        except Exception as e:
+            return [{"error": f"An error occurred during power prediction: {e}"} for _ in conditions_list]
+
+    @classmethod
+    def get_panel_status(cls, panel_id):
+        """
+        Returns a panel's telemetry state and, once it has been scored, the
+        recommendation for its latest score. None for an unknown panel.
+        """
+        status = cls.panel_states.snapshot(panel_id)
+        if status is None or status['predicted_hourly_loss_kw'] is None:
+            return status
+        loss = status['predicted_hourly_loss_kw']
+        daily_financial_loss = loss * config.PEAK_SUN_HOURS * config.ENERGY_VALUE_PER_KWH
+        action_required = bool(daily_financial_loss > config.RECOMMENDATION_THRESHOLD_INR)
+        status['recommendation'] = cls._format_recommendation(loss, daily_financial_loss, action_required)
+        return status
+
+    @staticmethod
+    def _format_recommendation(predicted_hourly_loss_kw, daily_financial_loss, action_required):
+        """Builds the response dict for one panel from its predicted loss."""
+        recommendation = "No immediate action required. System performing within expected parameters."
+
+        # Trigger a recommendation if the daily loss is greater than the threshold
+        if action_required:
+            recommendation = (
+                f"High energy loss detected due to soiling. "
+                f"Estimated daily financial loss: ₹{daily_financial_loss:.2f}. "
+                f"Recommend scheduling panel cleaning. The cost of cleaning (₹{config.CLEANING_COST}) "
+                f"could be recovered in approximately {config.CLEANING_COST / daily_financial_loss:.1f} days."
+            )
+
+        return {
+            "predicted_hourly_loss_kw": round(predicted_hourly_loss_kw, 4),
+            "estimated_daily_financial_loss": round(daily_financial_loss, 2),
+            "action_required": action_required,
+            "recommendation_message": recommendation
+        }
+
+
+# Cached predictions belong to the model that made them
+RecommendationService.model_manager.add_reload_listener(
+    lambda info: RecommendationService.prediction_cache.clear()
+)
+
+# A retrained model comes with a new reference; drift counts start over
+RecommendationService.model_manager.add_reload_listener(
+    lambda info: RecommendationService.drift_monitor.load_reference()
+)
+
+# The power output model trained by 2_train_model.py, plus the manifest's models
+RecommendationService.model_registry.register('power', 'power', {'current': POWER_MODEL_PATH})
+RecommendationService.model_registry.load_manifest(os.path.join(MODEL_DIR, config.MODEL_REGISTRY_MANIFEST))
+
+
+def _collect_metrics():
+    """Scrape-time metrics for /metrics, read from the model manager, cache and batcher."""
+    manager = RecommendationService.model_manager
+    info = manager.info()
+    collected = [
+        ('solar_model_info', 'gauge', 'The model in service (value is always 1).',
+         [([('backend', info.get('backend', '')), ('version', info.get('version', ''))], 1)]),
+        ('solar_model_ready', 'gauge', '1 once a model is loaded and warmed up.',
+         [([], int(info['ready']))]),
+        ('solar_model_loads_total', 'counter', 'Model loads and hot reloads, by result.',
+         [([('result', 'success')], manager.load_count), ([('result', 'failure')], manager.load_failures)]),
+    ]
+    if config.PREDICTION_CACHE_ENABLED:
+        cache = RecommendationService.prediction_cache
+        collected.append(('solar_prediction_cache_lookups_total', 'counter', 'Prediction cache lookups, by result.',
+                          [([('result', 'hit')], cache.hits), ([('result', 'miss')], cache.misses)]))
+        collected.append(('solar_prediction_cache_evictions_total', 'counter', 'Entries evicted from the prediction cache.',
+                          [([], cache.evictions)]))
+    if config.MICRO_BATCHING_ENABLED:
+        batcher = RecommendationService.batcher
+        collected.append(('solar_micro_batches_total', 'counter', 'Model calls made by the micro-batcher.',
+                          [([], batcher.batches)]))
+        collected.append(('solar_micro_batch_rows_total', 'counter', 'Rows predicted by the micro-batcher.',
+                          [([], batcher.rows)]))
+    telemetry = RecommendationService.panel_states.stats()
+    scorer = RecommendationService.telemetry_scorer
+    collected.append(('solar_telemetry_panels', 'gauge', 'Panels with telemetry state.', [([], telemetry['panels'])]))
+    collected.append(('solar_telemetry_pending_scores', 'gauge', 'Panels whose state changed since their last score.',
+                      [([], telemetry['pending_scores'])]))
+    collected.append(('solar_telemetry_events_total', 'counter', 'Telemetry events ingested, by result.',
+                      [([('result', 'accepted')], telemetry['events_accepted']),
+                       ([('result', 'stale')], telemetry['events_stale']),
+                       ([('result', 'rejected')], telemetry['events_rejected'])]))
+    collected.append(('solar_telemetry_scored_rows_total', 'counter', 'Panels scored by the telemetry scorer.',
+                      [([], scorer.rows_scored)]))
+    monitor = RecommendationService.drift_monitor
+    if config.DRIFT_MONITORING_ENABLED and monitor.enabled:
+        drift = monitor.scores()
+        collected.append(('solar_drift_psi', 'gauge', 'Population stability index of recent rows against training data.',
+                          [([('feature', name)], value) for name, value in drift['features'].items()]
+                          + [([('feature', 'prediction')], drift['prediction'])]))
+        collected.append(('solar_drift_samples', 'gauge', 'Rows covered by the drift scores.', [([], drift['samples'])]))
+        if 'mae_ratio' in drift['residuals'] and drift['residuals']['mae_ratio'] is not None:
+            collected.append(('solar_drift_residual_mae_ratio', 'gauge',
+                              'Residual MAE of recent rows as a multiple of the training MAE.',
+                              [([], drift['residuals']['mae_ratio'])]))
+        collected.append(('solar_drift_retrain_recommended', 'gauge', '1 while drift exceeds the retrain thresholds.',
+                          [([], int(drift['retrain_recommended']))]))
+    registry = RecommendationService.model_registry
+    collected.append(('solar_registry_models_loaded_bytes', 'gauge',
+                      'Memory held by lazily loaded registry models.', [([], registry.loaded_bytes)]))
+    collected.append(('solar_registry_events_total', 'counter', 'Registry lookups served from memory, loads and evictions.',
+                      [([('event', 'hit')], registry.hits), ([('event', 'load')], registry.loads),
+                       ([('event', 'load_failure')], registry.load_failures),
+                       ([('event', 'eviction')], registry.evictions)]))
+    return collected
+
+
+metrics.register_collector(_collect_metrics)
+
 
 # Example of how to use the service
 if __name__ == '__main__':
@@ -0,0 +1,419 @@
+"""
+Streaming telemetry ingestion: per-panel state kept up to date from events,
+and batch scoring of the panels that changed.
+
+Clients post newline-delimited JSON events instead of computing the model's
+features themselves:
+
+    {"type": "panel", "panel_id": "bbsr-001", "install_date": "2021-03-15"}
+    {"type": "reading", "panel_id": "bbsr-001", "timestamp": "2025-06-01T12:00:00",
+     "temperature_celsius": 31.5, "cloud_cover_percentage": 20, "power_kw": 3.9,
+     "ideal_power_kw": 4.3}
+    {"type": "cleaning", "panel_id": "bbsr-001", "timestamp": "2025-06-02T08:00:00"}
+    {"type": "rain", "panel_id": "bbsr-001", "timestamp": "2025-06-03T15:00:00"}
+
+Rain washes the panels like a cleaning does, as in the training data. A
+panel counts as clean from its install date until its first cleaning or
+rain event. Timestamps are ISO 8601 strings or Unix seconds, read as the
+panel's local wall-clock time (hour and day of year come straight from them).
+A reading's optional `ideal_power_kw` (what a clean panel would produce, e.g.
+from a reference cell) makes `ideal_power_kw - power_kw` its observed loss.
+
+State lives in one preallocated NumPy array per field, a row per panel, so
+memory per panel is fixed whatever the event rate. Readings overwrite the
+panel's latest values; events older than the state they would change are
+ignored. Panels whose state changed are scored together, one model call per
+interval, by TelemetryScorer.
+
+The state is held by one process. Under gunicorn with several workers each
+would see a different subset of the events, so gunicorn.conf.py turns
+telemetry off (TELEMETRY_ENABLED) when it starts more than one worker.
+"""
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from .inference_backends import FEATURES_ORDER
+
+SECONDS_PER_DAY = 86400.0
+
+EVENT_TYPES = ('panel', 'reading', 'cleaning', 'rain')
+
+# Events applied per lock acquisition while ingesting a stream
+APPLY_CHUNK_EVENTS = 1000
+
+# Unix seconds that datetime can represent (years 1 to 9999)
+_EPOCH = datetime(1970, 1, 1)
+MIN_TIMESTAMP = (datetime.min - _EPOCH).total_seconds()
+MAX_TIMESTAMP = (datetime.max.replace(microsecond=0) - _EPOCH).total_seconds()
+
+
+def parse_timestamp(value):
+    """
+    ISO 8601 string, date or Unix seconds -> wall-clock seconds since the epoch.
+    Raises ValueError for NaN, infinity and seconds outside years 1 to 9999.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        seconds = float(value)
+        if not MIN_TIMESTAMP <= seconds <= MAX_TIMESTAMP:  # also false for NaN
+            raise ValueError(f"Timestamp out of range: {value!r}")
+        return seconds
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        # Keep the local wall-clock time: hour and day of year are read from it
+        return (value.replace(tzinfo=None) - _EPOCH).total_seconds()
+    if isinstance(value, date):
+        return (value - date(1970, 1, 1)).days * SECONDS_PER_DAY
+    raise ValueError(f"Invalid timestamp: {value!r}")
+
+
+def format_timestamp(seconds):
+    """Wall-clock seconds -> ISO 8601 string (None for NaN)."""
+    if np.isnan(seconds):
+        return None
+    return (_EPOCH + timedelta(seconds=float(seconds))).isoformat()
+
+
+def parse_event(line):
+    """One NDJSON line -> event dict. Raises ValueError for anything else."""
+    event = json.loads(line)
+    if not isinstance(event, dict):
+        raise ValueError("Each line must be a JSON object.")
+    return event
+
+
+def calendar_features(timestamps):
+    """(hour, day_of_year) for an array of wall-clock seconds."""
+    seconds = np.asarray(timestamps, dtype=np.float64).astype('datetime64[s]')
+    days = seconds.astype('datetime64[D]')
+    hour = (seconds - days).astype(np.int64) // 3600
+    day_of_year = (days - days.astype('datetime64[Y]')).astype(np.int64) + 1
+    return hour, day_of_year
+
+
+class PanelStateTable:
+    """
+    Per-panel state for up to `max_panels` panels, one array per field.
+
+    `panel_id -> row` is the only per-panel Python object. The arrays start
+    at `initial_capacity` rows and double as panels are added, up to
+    `max_panels`; events for new panels beyond that are rejected.
+    """
+
+    # Field -> dtype. Times are wall-clock seconds; NaN means unknown.
+    FIELDS = {
+        'installed_at': np.float64,
+        'last_cleaned_at': np.float64,
+        'last_reading_at': np.float64,
+        'scored_at': np.float64,
+        'temperature_celsius': np.float32,
+        'cloud_cover_percentage': np.float32,
+        'power_kw': np.float32,
+        'ideal_power_kw': np.float32,
+        'predicted_loss_kw': np.float32,
+        'dirty': np.bool_,  # changed since it was last scored
+    }
+
+    def __init__(self, max_panels, initial_capacity=1024):
+        self.max_panels = max_panels
+        self._index = {}
+        self._ids = []
+        self._capacity = min(initial_capacity, max_panels)
+        self._arrays = {name: self._empty(name, self._capacity) for name in self.FIELDS}
+        self._lock = threading.Lock()
+        self.events_accepted = 0
+        self.events_rejected = 0
+        self.events_stale = 0
+
+    def _empty(self, name, size):
+        dtype = self.FIELDS[name]
+        return np.zeros(size, dtype=dtype) if dtype is np.bool_ else np.full(size, np.nan, dtype=dtype)
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in self._arrays.values())
+
+    def _row(self, panel_id):
+        """The panel's row, adding it if new. Call with the lock held."""
+        row = self._index.get(panel_id)
+        if row is not None:
+            return row
+        if len(self._ids) >= self.max_panels:
+            raise ValueError(f"Panel limit reached ({self.max_panels} panels); '{panel_id}' was not added.")
+        if len(self._ids) == self._capacity:
+            self._grow()
+        row = self._index[panel_id] = len(self._ids)
+        self._ids.append(panel_id)
+        return row
+
+    def _grow(self):
+        capacity = min(self._capacity * 2, self.max_panels)
+        for name, array in self._arrays.items():
+            grown = self._empty(name, capacity)
+            grown[:len(array)] = array
+            self._arrays[name] = grown
+        self._capacity = capacity
+
+    def apply(self, events):
+        """
+        Applies a list of parsed events (dicts) in order. Returns (accepted,
+        stale, errors): stale events were valid but older than the state
+        they would change, and errors lists (position, message) for the
+        events that were rejected.
+        """
+        accepted = stale = 0
+        errors = []
+        a = self._arrays
+        with self._lock:
+            for position, event in enumerate(events):
+                try:
+                    kind = event.get('type', 'reading')
+                    if kind not in EVENT_TYPES:
+                        raise ValueError(f"Unknown event type '{kind}'.")
+                    panel_id = event['panel_id']
+                    if not isinstance(panel_id, str):
+                        raise ValueError("panel_id must be a string.")
+                    if kind == 'panel':
+                        installed_at = parse_timestamp(event['install_date'])
+                        last_cleaned = event.get('last_cleaned')
+                        last_cleaned_at = parse_timestamp(last_cleaned) if last_cleaned is not None else None
+                        row = self._row(panel_id)
+                        a['installed_at'][row] = installed_at
+                        if last_cleaned_at is not None:
+                            a['last_cleaned_at'][row] = last_cleaned_at
+                        a['dirty'][row] = True
+                    elif kind == 'reading':
+                        timestamp = parse_timestamp(event['timestamp'])
+                        temperature = float(event['temperature_celsius'])
+                        cloud_cover = float(event['cloud_cover_percentage'])
+                        power = event.get('power_kw')
+                        power = float(power) if power is not None else np.nan
+                        ideal_power = event.get('ideal_power_kw')
+                        ideal_power = float(ideal_power) if ideal_power is not None else np.nan
+                        row = self._row(panel_id)
+                        if timestamp < a['last_reading_at'][row]:
+                            stale += 1  # an older reading than the one held
+                            continue
+                        a['last_reading_at'][row] = timestamp
+                        a['temperature_celsius'][row] = temperature
+                        a['cloud_cover_percentage'][row] = cloud_cover
+                        a['power_kw'][row] = power
+                        a['ideal_power_kw'][row] = ideal_power
+                        a['dirty'][row] = True
+                    else:  # cleaning or rain
+                        timestamp = parse_timestamp(event['timestamp'])
+                        row = self._row(panel_id)
+                        if timestamp < a['last_cleaned_at'][row]:
+                            stale += 1
+                            continue
+                        a['last_cleaned_at'][row] = timestamp
+                        a['dirty'][row] = True
+                except (KeyError, ValueError, TypeError, AttributeError) as e:
+                    message = f"Missing field {e}." if isinstance(e, KeyError) else str(e)
+                    errors.append((position, message))
+                    continue
+                accepted += 1
+            self.events_accepted += accepted
+            self.events_stale += stale
+            self.events_rejected += len(errors)
+        return accepted, stale, errors
+
+    def _features(self, rows, at):
+        """Feature matrix (FEATURES_ORDER) for `rows` evaluated at wall-clock times `at`."""
+        a = self._arrays
+        installed_at = a['installed_at'][rows]
+        last_cleaned_at = np.where(np.isnan(a['last_cleaned_at'][rows]), installed_at, a['last_cleaned_at'][rows])
+        hour, day_of_year = calendar_features(at)
+        columns = {
+            'temperature_celsius': a['temperature_celsius'][rows],
+            'cloud_cover_percentage': a['cloud_cover_percentage'][rows],
+            'panel_age_in_days': np.floor(np.maximum(at - installed_at, 0) / SECONDS_PER_DAY),
+            'days_since_cleaning': np.floor(np.maximum(at - last_cleaned_at, 0) / SECONDS_PER_DAY),
+            'hour': hour,
+            'day_of_year': day_of_year,
+        }
+        return np.column_stack([columns[name] for name in FEATURES_ORDER]).astype(np.float32)
+
+    def take_pending(self, limit=None):
+        """
+        Claims up to `limit` changed panels that can be scored (install date
+        and a reading known). Returns (rows, X, scored_at, observed_loss_kw),
+        X evaluated at each panel's latest reading; observed_loss_kw is NaN
+        where the reading did not report both powers.
+        """
+        a = self._arrays
+        with self._lock:
+            count = len(self._ids)
+            ready = a['dirty'][:count] & ~np.isnan(a['installed_at'][:count]) & ~np.isnan(a['last_reading_at'][:count])
+            rows = np.flatnonzero(ready)[:limit]
+            a['dirty'][rows] = False
+            at = a['last_reading_at'][rows]
+            observed_loss_kw = a['ideal_power_kw'][rows] - a['power_kw'][rows]
+            return rows, self._features(rows, at), at, observed_loss_kw
+
+    def mark_pending(self, rows):
+        """Puts claimed rows back, e.g. after a failed scoring run."""
+        with self._lock:
+            self._arrays['dirty'][rows] = True
+
+    def store_scores(self, rows, predicted_loss_kw, scored_at):
+        with self._lock:
+            self._arrays['predicted_loss_kw'][rows] = predicted_loss_kw
+            self._arrays['scored_at'][rows] = scored_at
+
+    def conditions(self, panel_id, now):
+        """
+        The model's input dict for a panel at wall-clock time `now` (a
+        datetime), from its latest reading. None for an unknown panel;
+        ValueError when its install date or readings are missing.
+        """
+        with self._lock:
+            row = self._index.get(panel_id)
+            if row is None:
+                return None
+            if np.isnan(self._arrays['installed_at'][row]) or np.isnan(self._arrays['last_reading_at'][row]):
+                raise ValueError(f"Panel '{panel_id}' needs an install date and at least one reading.")
+            X = self._features(np.array([row]), np.array([parse_timestamp(now)]))
+        return {name: X[0, j].item() for j, name in enumerate(FEATURES_ORDER)}
+
+    def snapshot(self, panel_id):
+        """The panel's raw state as a JSON-ready dict, or None for an unknown panel."""
+        with self._lock:
+            row = self._index.get(panel_id)
+            if row is None:
+                return None
+            values = {name: array[row].item() for name, array in self._arrays.items()}
+
+        def as_value(value, digits):
+            return None if np.isnan(value) else round(value, digits)
+
+        return {
+            'panel_id': panel_id,
+            'installed_at': format_timestamp(values['installed_at']),
+            'last_cleaned_at': format_timestamp(values['last_cleaned_at']),
+            'last_reading_at': format_timestamp(values['last_reading_at']),
+            'temperature_celsius': as_value(values['temperature_celsius'], 2),
+            'cloud_cover_percentage': as_value(values['cloud_cover_percentage'], 2),
+            'power_kw': as_value(values['power_kw'], 4),
+            'ideal_power_kw': as_value(values['ideal_power_kw'], 4),
+            'predicted_hourly_loss_kw': as_value(values['predicted_loss_kw'], 4),
+            'scored_at': format_timestamp(values['scored_at']),
+            'pending_score': values['dirty'],
+        }
+
+    def stats(self):
+        with self._lock:
+            count = len(self._ids)
+            pending = int(self._arrays['dirty'][:count].sum())
+            return {
+                'panels': count,
+                'max_panels': self.max_panels,
+                'capacity': self._capacity,
+                'state_bytes': self.nbytes,
+                'pending_scores': pending,
+                'events_accepted': self.events_accepted,
+                'events_rejected': self.events_rejected,
+                'events_stale': self.events_stale,
+            }
+
+
+class TelemetryScorer:
+    """
+    Scores changed panels in the background, one model call per batch.
+
+    Every `interval_seconds` the panels whose state changed are claimed and
+    predicted together (at most `max_batch_size` per call, looping until none
+    are left). Many readings for a panel within one interval cost a single
+    prediction. `get_model` is called for every batch, so a hot-reloaded
+    model is picked up. `on_scored(X, predictions, observed_loss_kw)`, if
+    given, is called with every scored batch. Errors are counted in
+    `failures` and never stop the background thread.
+    """
+
+    def __init__(self, table, get_model, interval_seconds=10, max_batch_size=5000, on_scored=None):
+        self.table = table
+        self.get_model = get_model
+        self.on_scored = on_scored
+        self.interval_seconds = interval_seconds
+        self.max_batch_size = max_batch_size
+        self._worker = None
+        self._stop_event = threading.Event()
+        self.batches = 0
+        self.rows_scored = 0
+        self.failures = 0
+        self.last_run_seconds = 0.0
+
+    def score_pending(self):
+        """Scores every panel that changed since its last score. Returns how many were scored."""
+        started = time.perf_counter()
+        scored = 0
+        while True:
+            rows, X, at, observed_loss_kw = self.table.take_pending(self.max_batch_size)
+            if len(rows) == 0:
+                break
+            try:
+                model = self.get_model()
+                if model is None:
+                    raise RuntimeError("Loss prediction model not found.")
+                predictions = model.predict(X)
+                self.table.store_scores(rows, predictions, at)
+            except Exception as e:
+                # Leave the rows pending so the next run retries them
+                self.table.mark_pending(rows)
+                self.failures += 1
+                print(f"Error: Telemetry scoring failed: {e}")
+                break
+            if self.on_scored is not None:
+                try:
+                    self.on_scored(X, predictions, observed_loss_kw)
+                except Exception as e:
+                    # The scores are stored; only the callback (e.g. drift monitoring) missed this batch
+                    self.failures += 1
+                    print(f"Error: Telemetry on_scored callback failed: {e}")
+            self.batches += 1
+            self.rows_scored += len(rows)
+            scored += len(rows)
+        self.last_run_seconds = time.perf_counter() - started
+        return scored
+
+    def start(self):
+        """Starts the background scoring thread (once per process)."""
+        if self._worker is not None and self._worker.is_alive():
+            return
+
+        def run():
+            while not self._stop_event.wait(self.interval_seconds):
+                try:
+                    self.score_pending()
+                except Exception as e:
+                    # Keep the thread alive: panels would otherwise never be scored again
+                    self.failures += 1
+                    print(f"Error: Telemetry scoring run failed: {e}")
+
+        self._stop_event.clear()
+        self._worker = threading.Thread(target=run, name='telemetry-scorer', daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def stats(self):
+        return {
+            'interval_seconds': self.interval_seconds,
+            'running': self._worker is not None and self._worker.is_alive(),
+            'batches': self.batches,
+            'rows_scored': self.rows_scored,
+            'failures': self.failures,
+            'last_run_ms': round(self.last_run_seconds * 1000, 3),
+        }
+
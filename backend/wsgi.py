@@ -0,0 +1,17 @@
+"""
+WSGI entry point for production serving.
+
+Run from the backend directory:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import os
+import sys
+
+# `from backend import config` needs the repository root on the path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+
+# The model is loaded here, once, in the gunicorn master (preload_app). The
+# hot-reload watcher is started per worker by gunicorn.conf.py after the fork.
+app = create_app(start_watcher=False)
@@ -0,0 +1,86 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# The backend imports its packages as `services`/`api` and its config as
+# `backend.config`, so both the backend directory and the repository root
+# need to be importable (as they are when running from backend/).
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(REPO_DIR, 'backend')
+for path in (BACKEND_DIR, REPO_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+SCRIPTS_DIR = os.path.join(BACKEND_DIR, 'ml_training', 'scripts')
+
+
+@pytest.fixture
+def load_script(monkeypatch):
+    """
+    Imports one of the numbered ml_training scripts (not valid module names)
+    as `name`. The module is registered in sys.modules so process pool
+    workers can unpickle its functions.
+    """
+    def load(filename, name):
+        monkeypatch.syspath_prepend(SCRIPTS_DIR)
+        spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPTS_DIR, filename))
+        module = importlib.util.module_from_spec(spec)
+        monkeypatch.setitem(sys.modules, name, module)
+        spec.loader.exec_module(module)
+        return module
+    return load
+
+
+@pytest.fixture
+def api_client():
+    """A test client for the API blueprint alone, without loading a model at start-up."""
+    from flask import Flask
+    from api.routes import api_blueprint
+
+    app = Flask(__name__)
+    app.register_blueprint(api_blueprint, url_prefix='/api')
+    return app.test_client()
+
+
+@pytest.fixture
+def serve_model(monkeypatch):
+    """
+    Puts a model in service as the default loss model, with the optional
+    cache, micro-batcher and drift monitor off unless a test turns them on.
+    """
+    from backend import config
+    from services.recommendation_service import RecommendationService
+
+    monkeypatch.setattr(config, 'PREDICTION_CACHE_ENABLED', False)
+    monkeypatch.setattr(config, 'MICRO_BATCHING_ENABLED', False)
+    monkeypatch.setattr(config, 'DRIFT_MONITORING_ENABLED', False)
+
+    def serve(model):
+        monkeypatch.setattr(RecommendationService.model_manager, '_model', model)
+        return model
+    return serve
+
+
+@pytest.fixture(scope='session')
+def trained_forest(tmp_path_factory):
+    """
+    A small loss forest trained on probe rows, saved as loss_prediction_model.pkl
+    and .npz in a temporary directory. Returns (model, directory).
+    """
+    import joblib
+    import pandas as pd
+    from sklearn.ensemble import RandomForestRegressor
+    from services.forest_evaluator import flatten_forest, save_forest
+    from services.inference_backends import FEATURES_ORDER, make_probe_features
+
+    X = pd.DataFrame(make_probe_features(num_rows=2000, seed=1), columns=FEATURES_ORDER)
+    y = 0.02 * X['days_since_cleaning'] + 0.01 * X['cloud_cover_percentage'] - 0.005 * X['temperature_celsius']
+    model = RandomForestRegressor(n_estimators=8, max_depth=6, random_state=0).fit(X, y)
+
+    directory = tmp_path_factory.mktemp('saved_model')
+    joblib.dump(model, directory / 'loss_prediction_model.pkl')
+    save_forest(flatten_forest(model), str(directory / 'loss_prediction_model.npz'))
+    return model, directory
@@ -0,0 +1,63 @@
+import numpy as np
+
+from backend import config
+from services.inference_backends import FEATURES_ORDER
+from services.recommendation_service import RecommendationService
+
+PANEL = {'temperature_celsius': 30, 'cloud_cover_percentage': 20, 'panel_age_in_days': 365, 'days_since_cleaning': 10}
+
+
+class SoilingModel:
+    """Loss grows by 0.05 kW per day since cleaning; records every call's row count."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, X):
+        self.calls.append(len(X))
+        return np.asarray(X)[:, FEATURES_ORDER.index('days_since_cleaning')] * 0.05
+
+
+def test_batch_scores_every_panel_in_one_model_call(api_client, serve_model):
+    model = serve_model(SoilingModel())
+    panels = [dict(PANEL, days_since_cleaning=days) for days in (0, 10, 100)]
+
+    response = api_client.post('/api/recommend/batch', json=panels)
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert model.calls == [3]
+    assert [result['predicted_hourly_loss_kw'] for result in results] == [0.0, 0.5, 5.0]
+    assert [result['action_required'] for result in results] == [False, True, True]
+
+
+def test_batch_results_match_single_panel_results(api_client, serve_model):
+    serve_model(SoilingModel())
+    panels = [dict(PANEL, days_since_cleaning=days) for days in (3, 40)]
+    batch = api_client.post('/api/recommend/batch', json={'panels': panels}).get_json()['results']
+    singles = [api_client.post('/api/recommend', json=panel).get_json() for panel in panels]
+    assert batch == singles
+
+
+def test_invalid_panels_get_errors_without_failing_the_batch(api_client, serve_model):
+    model = serve_model(SoilingModel())
+    panels = [PANEL, 'not an object', dict(PANEL, temperature_celsius='hot'), dict(PANEL, days_since_cleaning=20)]
+
+    results = api_client.post('/api/recommend/batch', json=panels).get_json()['results']
+
+    assert ['error' in result for result in results] == [False, True, True, False]
+    assert model.calls == [2]
+
+
+def test_batch_size_limit_and_bad_payloads(api_client, serve_model, monkeypatch):
+    serve_model(SoilingModel())
+    monkeypatch.setattr(config, 'MAX_BATCH_SIZE', 2)
+    assert api_client.post('/api/recommend/batch', json=[PANEL] * 3).status_code == 413
+    assert api_client.post('/api/recommend/batch', json={'panels': 'x'}).status_code == 400
+    assert api_client.post('/api/recommend/batch', json=[]).get_json() == {'count': 0, 'results': []}
+
+
+def test_missing_model_gives_an_error_per_panel(monkeypatch):
+    monkeypatch.setattr(RecommendationService.model_manager, 'get_model', lambda: None)
+    results = RecommendationService.generate_batch_recommendations([dict(PANEL, hour=12, day_of_year=1)] * 2)
+    assert all('error' in result for result in results) and len(results) == 2
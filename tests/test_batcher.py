@@ -0,0 +1,82 @@
+import threading
+from concurrent.futures import TimeoutError
+
+import numpy as np
+import pytest
+
+from services.batcher import MicroBatcher
+
+
+class SumModel:
+    """Predicts the sum of each row, and records the batch sizes it saw."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, X):
+        self.batch_sizes.append(len(X))
+        return X.sum(axis=1)
+
+
+def test_concurrent_rows_share_one_batch():
+    model = SumModel()
+    batcher = MicroBatcher(lambda: model, num_features=2, window_ms=200, max_batch_size=8)
+    futures = [batcher.submit([i, 1]) for i in range(8)]
+
+    assert [f.result(timeout=5) for f in futures] == [i + 1 for i in range(8)]
+    assert model.batch_sizes == [8]
+    assert batcher.stats()['rows'] == 8
+
+
+def test_bad_row_fails_its_batch_and_keeps_the_worker_alive():
+    model = SumModel()
+    batcher = MicroBatcher(lambda: model, num_features=2, window_ms=50, max_batch_size=4)
+    good = batcher.submit([1, 2])
+    bad = batcher.submit(['not a number', 2])
+
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+    with pytest.raises(ValueError):
+        good.result(timeout=5)
+
+    # The same worker still serves later submissions
+    assert batcher.predict([3, 4]) == 7
+    assert batcher._worker.is_alive()
+
+
+def test_missing_model_fails_futures():
+    batcher = MicroBatcher(lambda: None, num_features=2, window_ms=1)
+    with pytest.raises(RuntimeError):
+        batcher.predict([1, 2])
+
+
+def test_predict_times_out_instead_of_hanging():
+    release = threading.Event()
+
+    class SlowModel:
+        def predict(self, X):
+            release.wait(5)
+            return np.zeros(len(X))
+
+    batcher = MicroBatcher(lambda: SlowModel(), num_features=1, window_ms=1, timeout_seconds=0.05)
+    try:
+        with pytest.raises(TimeoutError):
+            batcher.predict([1])
+    finally:
+        release.set()
+
+
+def test_non_numeric_input_returns_an_error_with_batching_on(serve_model, monkeypatch):
+    from backend import config
+    from services.recommendation_service import RecommendationService
+
+    model = serve_model(SumModel())
+    monkeypatch.setattr(config, 'MICRO_BATCHING_ENABLED', True)
+    conditions = {
+        'temperature_celsius': 'hot', 'cloud_cover_percentage': 20, 'panel_age_in_days': 365,
+        'days_since_cleaning': 10, 'hour': 12, 'day_of_year': 100,
+    }
+
+    assert 'error' in RecommendationService.generate_recommendations(conditions)
+    # The request never reached the batcher's shared worker
+    assert model.batch_sizes == []
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.inference_backends import FEATURES_ORDER
+
+
+@pytest.fixture
+def dataset_io(load_script):
+    return load_script('dataset_io.py', 'dataset_io')
+
+
+def frame(num_rows=6):
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-12-31 22:00', periods=num_rows, freq='h'),
+        'panel_id': ['a'] * num_rows,
+        'value': np.arange(num_rows, dtype=np.float64),
+    })
+
+
+def test_columnar_round_trip_with_derived_calendar_columns(tmp_path, dataset_io):
+    dataset_io.write_dataset(frame(), str(tmp_path / 'ds'))
+    df = dataset_io.read_dataset(str(tmp_path / 'ds'))
+    assert set(df.columns) == {'timestamp', 'panel_id', 'value', 'hour', 'day_of_year', 'month'}
+    assert df['hour'].tolist() == [22, 23, 0, 1, 2, 3]
+    assert df['day_of_year'].tolist()[:3] == [366, 366, 1]
+    assert df['hour'].dtype == np.int16 and df['value'].dtype == np.float32
+
+
+def test_writer_can_skip_derived_columns(tmp_path, dataset_io):
+    writer = dataset_io.ColumnarWriter(str(tmp_path / 'ds'), 6, derive_calendar=False)
+    writer.write(frame()[:4])
+    writer.write(frame()[4:])
+    writer.close()
+    assert list(dataset_io.read_schema(str(tmp_path / 'ds'))['columns']) == ['timestamp', 'panel_id', 'value']
+
+
+def test_writer_checks_the_row_count(tmp_path, dataset_io):
+    writer = dataset_io.ColumnarWriter(str(tmp_path / 'ds'), 4)
+    with pytest.raises(ValueError):
+        writer.write(frame())
+    writer.write(frame()[:2])
+    with pytest.raises(ValueError):
+        writer.close()
+
+
+def test_interleaved_chunks_cover_every_row_once(tmp_path, dataset_io):
+    df = frame(10)
+    dataset_io.write_dataset(df, str(tmp_path / 'ds'))
+    chunks = list(dataset_io.iter_table_chunks(str(tmp_path / 'ds'), ['value'], chunk_size=3, interleave=True))
+    values = np.concatenate([chunk['value'].to_numpy() for chunk in chunks])
+    assert sorted(values.tolist()) == df['value'].tolist()
+
+
+def test_load_table_reads_both_formats_alike(tmp_path, dataset_io):
+    df = frame(30)
+    dataset_io.write_dataset(df, str(tmp_path / 'ds'))
+    dataset_io.write_dataset(df, str(tmp_path / 'ds.csv'), fmt='csv')
+    columns = ['timestamp', 'value', 'hour', 'month']
+    from_npy = dataset_io.load_table(str(tmp_path / 'ds'), columns)
+    from_csv = dataset_io.load_table(str(tmp_path / 'ds.csv'), columns)
+    assert list(from_npy.columns) == list(from_csv.columns) == columns
+    np.testing.assert_array_equal(from_npy['timestamp'], from_csv['timestamp'])
+    np.testing.assert_array_equal(from_npy['hour'], from_csv['hour'])
+    np.testing.assert_allclose(from_npy['value'], from_csv['value'])
+
+
+def test_columns_are_memory_mapped_and_checked(tmp_path, dataset_io):
+    dataset_io.write_dataset(frame(), str(tmp_path / 'ds'))
+    arrays = dataset_io.read_columns(str(tmp_path / 'ds'), ['value'])
+    assert list(arrays) == ['value'] and isinstance(arrays['value'], np.memmap)
+    with pytest.raises(KeyError):
+        dataset_io.read_columns(str(tmp_path / 'ds'), ['missing'])
+
+
+def test_resolve_dataset_path_prefers_the_columnar_dataset(tmp_path, dataset_io):
+    base = str(tmp_path / 'ds')
+    assert dataset_io.resolve_dataset_path(base) == base + '.csv'
+    dataset_io.write_dataset(frame(), base)
+    assert dataset_io.resolve_dataset_path(base) == base
+
+
+def test_sequential_chunks_keep_row_positions(tmp_path, dataset_io):
+    df = frame(10)
+    dataset_io.write_dataset(df, str(tmp_path / 'ds'))
+    dataset_io.write_dataset(df, str(tmp_path / 'ds.csv'), fmt='csv')
+    for path in (tmp_path / 'ds', tmp_path / 'ds.csv'):
+        chunks = list(dataset_io.iter_table_chunks(str(path), ['value', 'hour'], chunk_size=4))
+        assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+        assert np.concatenate([chunk.index for chunk in chunks]).tolist() == list(range(10))
+        assert pd.concat(chunks)['hour'].tolist() == [22, 23, 0, 1, 2, 3, 4, 5, 6, 7]
+
+
+def test_export_csv_matches_a_direct_csv_write(tmp_path, dataset_io):
+    df = frame(10)
+    df['value'] = df['value'] / 3
+    dataset_io.write_dataset(df, str(tmp_path / 'ds'))
+    dataset_io.export_csv(str(tmp_path / 'ds'), str(tmp_path / 'exported.csv'), chunk_size=3)
+    dataset_io.write_dataset(dataset_io.add_calendar_columns(df.copy()), str(tmp_path / 'direct.csv'), fmt='csv')
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'exported.csv'), pd.read_csv(tmp_path / 'direct.csv'))
+
+
+class ConstantModel:
+    def predict(self, X):
+        return np.full(len(X), 0.5)
+
+
+def test_score_history_writes_the_same_columns_in_both_formats(tmp_path, load_script, dataset_io, monkeypatch):
+    score = load_script('5_score_history.py', 'score_history')
+    monkeypatch.setattr(score, 'load_backend', lambda *args: ConstantModel())
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.random((50, len(FEATURES_ORDER))), columns=FEATURES_ORDER)
+    data.insert(0, 'timestamp', pd.date_range('2024-01-01', periods=50, freq='h'))
+    data.insert(0, 'panel_id', 'p1')
+    data.loc[3, 'hour'] = np.nan
+    data.to_csv(tmp_path / 'history.csv', index=False)
+
+    csv_summary = score.score_history([str(tmp_path / 'history.csv')], str(tmp_path / 'out.csv'),
+                                      chunk_size=20, max_workers=1)
+    score.score_history([str(tmp_path / 'history.csv')], str(tmp_path / 'out'), fmt='npy',
+                        chunk_size=20, max_workers=1)
+
+    from_csv = pd.read_csv(tmp_path / 'out.csv')
+    from_npy = dataset_io.read_dataset(str(tmp_path / 'out'))
+    assert list(from_npy.columns) == list(from_csv.columns)
+    assert csv_summary['rows'] == 50 and csv_summary['invalid_rows'] == 1
+    assert from_csv['predicted_hourly_loss_kw'].isna().tolist() == from_npy['predicted_hourly_loss_kw'].isna().tolist()
+
+
+@pytest.mark.parametrize('body', [
+    'a,b\n1,2\n3,4\n\n\n',      # trailing blank lines
+    'a,b\n1,2\n\n3,4',            # blank line inside, no final newline
+    'a,b\n1,"x\ny"\n3,4\n',       # quoted line break
+])
+def test_count_rows_matches_what_the_reader_yields(tmp_path, load_script, dataset_io, body):
+    score = load_script('5_score_history.py', 'score_history')
+    path = tmp_path / 'data.csv'
+    path.write_text(body)
+    read = sum(len(chunk) for chunk in dataset_io.iter_table_chunks(str(path), chunk_size=1))
+    assert score.count_rows(str(path)) == read == 2
@@ -0,0 +1,109 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from services import drift_monitor
+from services.drift_monitor import DriftMonitor, build_reference, save_reference
+
+FEATURES = ['a', 'b']
+
+
+def write_reference(path, shift=0.0, num_bins=10, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(5000, 2)) + shift
+    predictions = X.sum(axis=1)
+    save_reference(build_reference(X, predictions, predictions + 0.1, FEATURES, num_bins=num_bins), path)
+    return X, predictions
+
+
+def make_monitor(path, **kwargs):
+    return DriftMonitor(str(path), FEATURES, **{'window_size': 1000, 'min_samples': 500, **kwargs})
+
+
+def test_no_drift_on_training_like_rows_and_drift_on_shifted_ones(tmp_path):
+    path = tmp_path / 'reference.json'
+    write_reference(path)
+    monitor = make_monitor(path)
+
+    X, predictions = write_reference(tmp_path / 'same.json', seed=1)
+    monitor.observe_batch(X[:900], predictions[:900])
+    scores = monitor.scores()
+    assert scores['samples'] == 900
+    assert max(scores['features'].values()) < 0.1 and not scores['retrain_recommended']
+
+    monitor.reset()
+    X, predictions = write_reference(tmp_path / 'shifted.json', shift=2.0, seed=2)
+    monitor.observe_batch(X[:999], predictions[:999])
+    assert monitor.scores()['retrain_recommended']
+    # Filling the window runs the check and raises the signal once
+    monitor.observe(X[999], predictions[999])
+    assert monitor.retrain_recommended and monitor.retrain_signals == 1
+
+
+def test_windows_roll_and_cover_the_latest_two(tmp_path):
+    path = tmp_path / 'reference.json'
+    X, predictions = write_reference(path)
+    monitor = make_monitor(path, window_size=100)
+    for start in range(0, 350, 50):
+        monitor.observe_batch(X[start:start + 50], predictions[start:start + 50])
+    # 350 rows: windows of 100 rolled three times, the previous one plus 50 current rows remain
+    assert monitor.scores()['samples'] == 150
+
+
+def test_residual_ratio_uses_the_reference_mae(tmp_path):
+    path = tmp_path / 'reference.json'
+    X, predictions = write_reference(path)
+    monitor = make_monitor(path, window_size=10000)
+    monitor.observe_batch(X[:600], predictions[:600], predictions[:600] + 0.5)
+    residuals = monitor.scores()['residuals']
+    assert residuals['samples'] == 600
+    assert residuals['mae_ratio'] == 5.0
+    assert monitor.scores()['retrain_recommended']
+
+
+def test_batch_binned_against_a_replaced_reference_is_dropped(tmp_path, monkeypatch):
+    path = tmp_path / 'reference.json'
+    X, predictions = write_reference(path)
+    monitor = make_monitor(path)
+    bin_counts = drift_monitor._bin_counts
+
+    def reload_while_binning(edges, values):
+        # Another thread reloads a reference with the same number of bins
+        if not reloaded:
+            reloaded.append(True)
+            write_reference(path, shift=1.0)
+            monitor.load_reference()
+        return bin_counts(edges, values)
+
+    reloaded = []
+    monkeypatch.setattr(drift_monitor, '_bin_counts', reload_while_binning)
+    monitor.observe_batch(X[:100], predictions[:100])
+    assert reloaded and monitor.scores()['samples'] == 0
+
+
+def test_missing_reference_disables_the_monitor(tmp_path):
+    monitor = make_monitor(tmp_path / 'missing.json')
+    monitor.observe([1.0, 2.0], 3.0)
+    monitor.observe_batch(np.ones((3, 2)), np.ones(3))
+    assert monitor.scores()['enabled'] is False
+
+
+def test_incremental_training_replaces_the_reference(tmp_path, load_script):
+    train = load_script('2b_train_loss_model.py', 'train_loss_model')
+
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.random((2000, len(train.FEATURES))), columns=train.FEATURES)
+    data[train.TARGET] = data['days_since_cleaning'] * 0.5
+    data_path = tmp_path / 'loss.csv'
+    data.to_csv(data_path, index=False)
+    model_path = tmp_path / 'model.pkl'
+    reference_path = tmp_path / 'model_reference.json'
+    reference_path.write_text(json.dumps({'stale': True}))
+
+    report = train.train_loss_model_incremental(str(data_path), str(model_path), chunk_size=500, trees_per_chunk=2)
+
+    reference = json.loads(reference_path.read_text())
+    assert reference['features'] == train.FEATURES
+    assert reference['num_rows'] == 400  # every 5th row is held out
+    assert reference['residuals']['mae_kw'] == report['mae_kw']
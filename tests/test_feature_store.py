@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+FEATURES = ['a', 'b']
+
+
+@pytest.fixture
+def store(load_script):
+    return load_script('feature_store.py', 'feature_store')
+
+
+def write_csv(path, num_rows=20, scale=1.0):
+    data = pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=num_rows, freq='h')[::-1],
+        'a': np.arange(num_rows) * scale,
+        'b': np.arange(num_rows) * 2.0,
+        'y': np.arange(num_rows) * 0.5,
+    })
+    data.to_csv(path, index=False)
+    return data
+
+
+def entries(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if os.path.isdir(os.path.join(cache_dir, name)))
+
+
+def test_features_are_built_once_then_memory_mapped(store, tmp_path, monkeypatch):
+    data_path, cache_dir = str(tmp_path / 'data.csv'), str(tmp_path / 'cache')
+    write_csv(data_path)
+    X, y = store.load_features(data_path, FEATURES, 'y', cache_dir=cache_dir)
+    assert X.dtype == np.float32 and X.flags.c_contiguous and y.dtype == np.float64
+    np.testing.assert_array_equal(X[:, 1], np.arange(20) * 2.0)
+
+    def no_rebuild(*args, **kwargs):
+        raise AssertionError("features rebuilt from a cached dataset")
+
+    monkeypatch.setattr(store, 'build_features', no_rebuild)
+    X, y = store.load_features(data_path, FEATURES, 'y', cache_dir=cache_dir)
+    assert isinstance(X, np.memmap) and not X.flags.writeable
+    assert len(entries(cache_dir)) == 1
+
+
+def test_an_edited_dataset_replaces_its_entry(store, tmp_path):
+    data_path, cache_dir = str(tmp_path / 'data.csv'), str(tmp_path / 'cache')
+    write_csv(data_path)
+    first = store.ensure_features(data_path, FEATURES, 'y', cache_dir=cache_dir)
+    write_csv(data_path, scale=3.0)
+    second = store.ensure_features(data_path, FEATURES, 'y', cache_dir=cache_dir)
+
+    assert first != second and entries(cache_dir) == [os.path.basename(second)]
+    X, _ = store.open_features(second)
+    np.testing.assert_array_equal(X[:, 0], np.arange(20) * 3.0)
+
+
+def test_other_feature_specs_get_their_own_entries(store, tmp_path):
+    data_path, cache_dir = str(tmp_path / 'data.csv'), str(tmp_path / 'cache')
+    data = write_csv(data_path)
+    store.ensure_features(data_path, FEATURES, 'y', cache_dir=cache_dir)
+    X, y = store.load_features(data_path, ['b'], 'y', sort_by='timestamp', cache_dir=cache_dir)
+    assert len(entries(cache_dir)) == 2
+    np.testing.assert_array_equal(y, data['y'].to_numpy()[::-1])
+
+
+def test_fingerprints_are_memoized_until_the_files_change(store, tmp_path, monkeypatch):
+    data_path, cache_dir = str(tmp_path / 'data.csv'), str(tmp_path / 'cache')
+    write_csv(data_path)
+    fingerprint = store.dataset_fingerprint(data_path, cache_dir)
+
+    class NoHashing:
+        @staticmethod
+        def sha256(*args):
+            raise AssertionError("dataset rehashed")
+
+    monkeypatch.setattr(store, 'hashlib', NoHashing)
+    assert store.dataset_fingerprint(data_path, cache_dir) == fingerprint
+    monkeypatch.undo()
+
+    os.utime(data_path, ns=(0, 0))
+    # Same contents under a new mtime: rehashed, same fingerprint
+    assert store.dataset_fingerprint(data_path, cache_dir) == fingerprint
+
+
+def test_columnar_datasets_are_fingerprinted_by_content(store, tmp_path, load_script):
+    dataset_io = load_script('dataset_io.py', 'dataset_io')
+    path, cache_dir = str(tmp_path / 'data'), str(tmp_path / 'cache')
+    dataset_io.write_dataset(write_csv(str(tmp_path / 'data.csv')), path)
+    fingerprint = store.dataset_fingerprint(path, cache_dir)
+    np.save(os.path.join(path, 'a.npy'), np.zeros(20, dtype=np.float32))
+    assert store.dataset_fingerprint(path, cache_dir) != fingerprint
+
+
+def test_training_uses_the_given_cache_dir(load_script, tmp_path):
+    train = load_script('2b_train_loss_model.py', 'train_loss_model')
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.random((200, len(train.FEATURES))), columns=train.FEATURES)
+    data[train.TARGET] = data['days_since_cleaning']
+    data.to_csv(tmp_path / 'loss.csv', index=False)
+
+    train.train_loss_model(str(tmp_path / 'loss.csv'), str(tmp_path / 'model' / 'model.pkl'),
+                           feature_cache_dir=str(tmp_path / 'cache'))
+    assert len(entries(str(tmp_path / 'cache'))) == 1
+    assert (tmp_path / 'model' / 'model_reference.json').exists()
@@ -0,0 +1,33 @@
+import json
+import os
+
+import pandas as pd
+
+
+def test_shard_names_stay_inside_the_output_directory(load_script):
+    fleet = load_script('1c_simulate_fleet_data.py', 'simulate_fleet_data')
+    for index, panel_id in enumerate(['../../etc/x', '/abs/path', 'a/b', 'a_b', '..', 7]):
+        name = fleet.shard_name(index, panel_id, 'npy')
+        assert os.sep not in name and '..' not in name
+        assert name.startswith(f'panel_{index:05d}_')
+    # IDs that sanitize alike still get distinct shards
+    assert fleet.shard_name(2, 'a/b', 'csv') != fleet.shard_name(3, 'a_b', 'csv')
+
+
+def test_fleet_is_reproducible_and_listed_in_the_manifest(tmp_path, load_script):
+    fleet = load_script('1c_simulate_fleet_data.py', 'simulate_fleet_data')
+    spec_path = tmp_path / 'specs.csv'
+    pd.DataFrame({'panel_id': ['../escape', 'b'], 'install_date': ['2022-01-01', '2022-06-01']}).to_csv(spec_path, index=False)
+
+    manifests = []
+    for workers in (1, 2):
+        output_dir = tmp_path / f'fleet_{workers}'
+        fleet.simulate_fleet(str(spec_path), str(output_dir), num_records=48, max_workers=workers, fmt='csv')
+        manifests.append(json.loads((output_dir / 'manifest.json').read_text()))
+        assert sorted(os.listdir(output_dir)) == sorted(['manifest.json'] + [s['path'] for s in manifests[-1]['shards']])
+    assert not (tmp_path / 'escape').exists()
+
+    first, second = ([pd.read_csv(tmp_path / f'fleet_{w}' / s['path']) for s in m['shards']]
+                     for w, m in zip((1, 2), manifests))
+    for a, b in zip(first, second):
+        pd.testing.assert_frame_equal(a, b)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services import forest_evaluator
+from services.forest_evaluator import ForestEvaluator, flatten_forest, save_forest
+from services.inference_backends import FEATURES_ORDER, make_probe_features
+
+
+def sklearn_predictions(model, X):
+    return model.predict(pd.DataFrame(X.astype(np.float32), columns=FEATURES_ORDER))
+
+
+def test_blocked_prediction_is_bit_identical(trained_forest):
+    model, directory = trained_forest
+    evaluator = ForestEvaluator.load(str(directory / 'loss_prediction_model.npz'))
+    X = make_probe_features(num_rows=2 * forest_evaluator.PREDICT_BLOCK_ROWS + 17, seed=5)
+    assert np.array_equal(evaluator.predict(X), sklearn_predictions(model, X))
+
+
+def test_unbalanced_trees_and_single_trees_match():
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.tree import DecisionTreeRegressor
+
+    X = make_probe_features(num_rows=500, seed=6)
+    frame = pd.DataFrame(X, columns=FEATURES_ORDER)
+    # Unlimited depth with a leaf-size floor leaves leaves at many different depths
+    y = np.where(frame['hour'] < 6, 0.0, frame['days_since_cleaning'] ** 2)
+    probe = make_probe_features(num_rows=300, seed=7)
+    for model in (RandomForestRegressor(n_estimators=5, min_samples_leaf=3, random_state=0).fit(frame, y),
+                  DecisionTreeRegressor(max_depth=4, random_state=0).fit(frame, y)):
+        evaluator = ForestEvaluator(flatten_forest(model))
+        assert np.array_equal(evaluator.predict(probe), sklearn_predictions(model, probe))
+
+
+def test_input_shape_is_checked(trained_forest):
+    _, directory = trained_forest
+    evaluator = ForestEvaluator.load(str(directory / 'loss_prediction_model.npz'))
+    with pytest.raises(ValueError):
+        evaluator.predict(np.zeros((3, len(FEATURES_ORDER) + 1)))
+    with pytest.raises(ValueError):
+        evaluator.predict(np.zeros(len(FEATURES_ORDER)))
+
+
+def test_export_script_writes_verified_arrays(trained_forest, tmp_path, load_script, monkeypatch):
+    export = load_script('4_export_forest_arrays.py', 'export_forest_arrays')
+    _, directory = trained_forest
+    pkl_path = str(directory / 'loss_prediction_model.pkl')
+    assert export.export_forest_arrays(pkl_path, str(tmp_path / 'model.npz'), num_check_rows=500)
+    assert ForestEvaluator.load(str(tmp_path / 'model.npz')).nbytes > 0
+
+    def corrupted(model):
+        arrays = flatten_forest(model)
+        arrays['value'] = arrays['value'] + 1e-9
+        return arrays
+
+    monkeypatch.setattr(export, 'flatten_forest', corrupted)
+    assert not export.export_forest_arrays(pkl_path, str(tmp_path / 'bad.npz'), num_check_rows=500)
+    assert not (tmp_path / 'bad.npz').exists()
+    assert not export.export_forest_arrays(str(tmp_path / 'missing.pkl'), str(tmp_path / 'x.npz'))
+
+
+def test_saved_arrays_round_trip(trained_forest, tmp_path):
+    model, _ = trained_forest
+    arrays = flatten_forest(model)
+    save_forest(arrays, str(tmp_path / 'forest.npz'))
+    loaded = ForestEvaluator.load(str(tmp_path / 'forest.npz'))
+    assert len(loaded.roots) == len(model.estimators_)
+    assert loaded.max_depth == max(tree.tree_.max_depth for tree in model.estimators_)
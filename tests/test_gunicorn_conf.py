@@ -0,0 +1,80 @@
+import gc
+import importlib.util
+import logging
+import os
+
+import pytest
+
+from backend import config
+from conftest import BACKEND_DIR
+from services.batcher import MicroBatcher
+from services.recommendation_service import RecommendationService
+
+
+@pytest.fixture
+def gunicorn_conf(monkeypatch):
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', os.path.join(BACKEND_DIR, 'gunicorn.conf.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(config, 'TELEMETRY_ENABLED', True)
+    yield module
+    gc.unfreeze()
+
+
+class FakeServer:
+    def __init__(self, num_workers):
+        self.num_workers = num_workers
+        self.log = logging.getLogger('test.gunicorn')
+
+
+def test_settings_come_from_the_backend_config(gunicorn_conf):
+    assert gunicorn_conf.preload_app is True
+    assert gunicorn_conf.worker_class == 'gthread'
+    assert gunicorn_conf.bind == config.SERVER_BIND
+    assert gunicorn_conf.workers >= 1
+
+
+@pytest.mark.parametrize('num_workers, telemetry', [(1, True), (4, False)])
+def test_telemetry_is_only_served_by_a_single_worker(gunicorn_conf, num_workers, telemetry):
+    gunicorn_conf.when_ready(FakeServer(num_workers))
+    assert config.TELEMETRY_ENABLED is telemetry
+    assert gc.get_freeze_count() > 0
+
+
+def test_post_fork_starts_the_per_worker_threads(gunicorn_conf, monkeypatch):
+    started = []
+    monkeypatch.setattr(config, 'MODEL_HOT_RELOAD', True)
+    monkeypatch.setattr(config, 'TELEMETRY_SCORING_ENABLED', True)
+    monkeypatch.setattr(RecommendationService.model_manager, 'start_watcher', lambda: started.append('watcher'))
+    monkeypatch.setattr(RecommendationService.telemetry_scorer, 'start', lambda: started.append('scorer'))
+    gunicorn_conf.post_fork(FakeServer(1), worker=None)
+    assert started == ['watcher', 'scorer']
+
+    started.clear()
+    monkeypatch.setattr(config, 'TELEMETRY_ENABLED', False)
+    gunicorn_conf.post_fork(FakeServer(1), worker=None)
+    assert started == ['watcher']
+
+
+class SumModel:
+    def predict(self, X):
+        return X.sum(axis=1)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork()")
+def test_batcher_restarts_its_worker_in_a_forked_child():
+    batcher = MicroBatcher(lambda: SumModel(), num_features=2, window_ms=1)
+    assert batcher.predict([1, 2]) == 3
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            result = batcher.predict([2, 3])
+            os.write(write_fd, str(result).encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    with os.fdopen(read_fd) as pipe:
+        assert float(pipe.read()) == 5
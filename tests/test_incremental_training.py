@@ -0,0 +1,52 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def train(load_script):
+    return load_script('2b_train_loss_model.py', 'train_loss_model')
+
+
+def write_data(train, path, num_rows=2000, seed=0):
+    from dataset_io import write_dataset
+
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(rng.random((num_rows, len(train.FEATURES))), columns=train.FEATURES)
+    data[train.TARGET] = data['days_since_cleaning'] * 0.5
+    write_dataset(data, str(path))
+    return data
+
+
+def test_each_chunk_adds_trees_and_resume_extends_the_forest(tmp_path, train):
+    data_path, model_path = tmp_path / 'loss', tmp_path / 'model.pkl'
+    write_data(train, data_path)
+
+    report = train.train_loss_model_incremental(str(data_path), str(model_path), chunk_size=500, trees_per_chunk=3)
+    assert report['trees'] == 12
+    assert len(joblib.load(model_path).estimators_) == 12
+
+    write_data(train, data_path, num_rows=1000, seed=1)
+    report = train.train_loss_model_incremental(str(data_path), str(model_path), chunk_size=500,
+                                                trees_per_chunk=3, resume=True)
+    model = joblib.load(model_path)
+    assert report['trees'] == len(model.estimators_) == 18
+    assert not model.warm_start
+
+
+def test_streaming_evaluation_matches_a_direct_computation(tmp_path, train):
+    data_path, model_path = tmp_path / 'loss', tmp_path / 'model.pkl'
+    data = write_data(train, data_path)
+    train.train_loss_model_incremental(str(data_path), str(model_path), chunk_size=700, trees_per_chunk=2)
+    model = joblib.load(model_path)
+
+    mae, bias, (X, predictions, y) = train.evaluate_streaming(model, str(data_path), 300, 5, sample_rows=100)
+    holdout = data.iloc[::5]
+    residuals = holdout[train.TARGET].to_numpy(np.float32) - model.predict(holdout[train.FEATURES].astype(np.float32))
+    assert mae == pytest.approx(np.abs(residuals).mean(), rel=1e-5)
+    assert bias == pytest.approx(residuals.mean(), rel=1e-4, abs=1e-6)
+    # The drift sample is capped and consists of held-out rows only
+    assert X.shape == (100, len(train.FEATURES)) and len(predictions) == len(y) == 100
+    assert np.isin(X[:, 0], holdout[train.FEATURES[0]].to_numpy(np.float32)).all()
+    np.testing.assert_allclose(predictions, model.predict(pd.DataFrame(X, columns=train.FEATURES)))
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend import config
+from services.inference_backends import (
+    FEATURES_ORDER, backend_for_path, check_parity, load_backend, make_probe_features,
+)
+
+
+def reference_predictions(model, X):
+    return model.predict(pd.DataFrame(X.astype(np.float32), columns=FEATURES_ORDER))
+
+
+@pytest.fixture(scope='module')
+def onnx_path(trained_forest):
+    skl2onnx = pytest.importorskip('skl2onnx')
+    pytest.importorskip('onnxruntime')
+    from skl2onnx.common.data_types import FloatTensorType
+
+    model, directory = trained_forest
+    onnx_model = skl2onnx.convert_sklearn(model, initial_types=[('float_input', FloatTensorType([None, len(FEATURES_ORDER)]))])
+    path = directory / 'loss_prediction_model.onnx'
+    path.write_bytes(onnx_model.SerializeToString())
+    return path
+
+
+@pytest.mark.parametrize('name, extension', [('sklearn', '.pkl'), ('npz', '.npz')])
+def test_exact_backends_reproduce_the_forest(trained_forest, name, extension):
+    model, directory = trained_forest
+    backend = load_backend(name, str(directory / f'loss_prediction_model{extension}'))
+    X = make_probe_features(num_rows=300, seed=3)
+    expected = reference_predictions(model, X)
+    assert np.array_equal(backend.predict(X), expected)
+    # Single rows go through the fast paths
+    assert backend.predict(X[:1])[0] == expected[0]
+    assert backend_for_path(backend.model_path) == name
+
+
+def test_onnx_backend_is_parity_checked_against_the_pickle(onnx_path, trained_forest):
+    model, _ = trained_forest
+    backend = load_backend('onnx', str(onnx_path))
+    X = make_probe_features(num_rows=50, seed=4)
+    np.testing.assert_allclose(backend.predict(X), reference_predictions(model, X), atol=config.BACKEND_PARITY_TOLERANCE)
+
+
+def test_parity_check_rejects_a_backend_that_disagrees(trained_forest):
+    _, directory = trained_forest
+    reference = load_backend('sklearn', str(directory / 'loss_prediction_model.pkl'))
+
+    class Shifted:
+        name = 'shifted'
+        features = FEATURES_ORDER
+
+        def predict(self, X):
+            return reference.predict(X) + 0.01
+
+    with pytest.raises(ValueError, match='disagrees'):
+        check_parity(Shifted(), reference, tolerance=1e-4)
+
+
+def test_unknown_backend_and_extension_are_rejected():
+    with pytest.raises(ValueError):
+        load_backend('tensorflow')
+    with pytest.raises(ValueError):
+        backend_for_path('model.h5')
@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import BACKEND_DIR
+
+
+@pytest.fixture
+def simulator(load_script):
+    return load_script('1b_simulate_loss_data.py', 'simulate_loss_data')
+
+
+@pytest.mark.parametrize('chunk_size', [1, 97, 1000])
+def test_chunked_output_matches_a_single_pass(simulator, chunk_size):
+    whole = pd.concat(simulator.iter_loss_data(1000, seed=7), ignore_index=True)
+    chunked = pd.concat(simulator.iter_loss_data(1000, seed=7, chunk_size=chunk_size), ignore_index=True)
+    pd.testing.assert_frame_equal(chunked, whole, check_exact=True)
+
+
+def test_default_run_reproduces_the_committed_dataset(simulator, tmp_path):
+    output = tmp_path / 'loss.csv'
+    simulator.simulate_loss_data(output_path=str(output), fmt='csv', chunk_size=5000)
+    committed = os.path.join(BACKEND_DIR, 'data', 'historical_loss_data.csv')
+    assert output.read_text() == open(committed).read()
+
+
+def test_soiling_grows_between_rain_events(simulator):
+    df = next(simulator.iter_loss_data(2000, freq='30min', seed=3))
+    days = df['days_since_cleaning'].to_numpy()
+    assert days[0] == 0
+    resets = np.flatnonzero(np.diff(days) < 0) + 1
+    assert len(resets) and (days[resets] == 0).all()
+    # Half-hour steps add 1/48 of a day between rain events
+    steps = np.diff(days)[np.diff(days) > 0]
+    np.testing.assert_allclose(steps, 1 / 48)
+    assert (df['energy_loss_kw'] >= 0).all()
@@ -0,0 +1,106 @@
+import threading
+
+import numpy as np
+import pytest
+
+from backend import config
+from services import metrics
+from services.metrics import Counter, Histogram
+
+PANEL = {'temperature_celsius': 30, 'cloud_cover_percentage': 20, 'panel_age_in_days': 365, 'days_since_cleaning': 10}
+
+
+class ZeroModel:
+    def predict(self, X):
+        return np.zeros(len(X))
+
+
+def sample(text, line_start):
+    """The value of the first exposition line starting with `line_start`, or 0."""
+    for line in text.splitlines():
+        if line.startswith(line_start + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(config, 'METRICS_ENABLED', True)
+
+
+def test_histogram_buckets_are_cumulative_and_summed_over_threads():
+    histogram = Histogram('latency_seconds', 'Test latency.', 'stage', buckets=(0.1, 1.0))
+
+    def record():
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe('parse', value)
+
+    threads = [threading.Thread(target=record) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    text = '\n'.join(histogram.render())
+    assert '# TYPE latency_seconds histogram' in text
+    assert sample(text, 'latency_seconds_bucket{stage="parse",le="0.1"}') == 3
+    assert sample(text, 'latency_seconds_bucket{stage="parse",le="1.0"}') == 6
+    assert sample(text, 'latency_seconds_bucket{stage="parse",le="+Inf"}') == 9
+    assert sample(text, 'latency_seconds_count{stage="parse"}') == 9
+    assert sample(text, 'latency_seconds_sum{stage="parse"}') == pytest.approx(16.65)
+
+
+def test_exited_threads_are_folded_into_the_totals():
+    histogram = Histogram('latency_seconds', 'Test latency.', 'stage', buckets=(0.1, 1.0))
+    for _ in range(500):
+        thread = threading.Thread(target=histogram.observe, args=('parse', 0.5))
+        thread.start()
+        thread.join()
+    histogram.observe('parse', 0.05)
+
+    assert len(histogram._shards) == 1  # only the live main thread's
+    text = '\n'.join(histogram.render())
+    assert sample(text, 'latency_seconds_count{stage="parse"}') == 501
+    assert sample(text, 'latency_seconds_bucket{stage="parse",le="0.1"}') == 1
+    assert sample(text, 'latency_seconds_sum{stage="parse"}') == pytest.approx(250.05)
+
+
+def test_counter_renders_one_series_per_label():
+    counter = Counter('errors_total', 'Test errors.', 'kind')
+    counter.inc('invalid_input')
+    counter.inc('invalid_input', 2)
+    counter.inc('unknown_model')
+    lines = counter.render()
+    assert lines[2:] == ['errors_total{kind="invalid_input"} 3', 'errors_total{kind="unknown_model"} 1']
+
+
+def test_nothing_is_recorded_while_disabled(monkeypatch):
+    monkeypatch.setattr(config, 'METRICS_ENABLED', False)
+    before = metrics.render_metrics()
+    assert metrics.clock() == 0.0 and metrics.observe_stage('parse', 0.0) == 0.0
+    metrics.count_error('invalid_input')
+    assert sample(metrics.render_metrics(), 'solar_errors_total{kind="invalid_input"}') == \
+        sample(before, 'solar_errors_total{kind="invalid_input"}')
+
+
+def test_requests_record_every_stage_and_errors(enabled, api_client, serve_model):
+    serve_model(ZeroModel())
+    before = metrics.render_metrics()
+    assert api_client.post('/api/recommend', json=PANEL).status_code == 200
+    assert api_client.post('/api/recommend', json={'temperature_celsius': 'hot'}).status_code == 400
+    after = metrics.render_metrics()
+
+    for stage in ('parse', 'features', 'predict', 'format', 'serialize', 'total'):
+        series = f'solar_stage_latency_seconds_count{{stage="{stage}"}}'
+        assert sample(after, series) == sample(before, series) + 1, stage
+    series = 'solar_errors_total{kind="invalid_input"}'
+    assert sample(after, series) == sample(before, series) + 1
+
+
+def test_collectors_are_read_at_scrape_time(monkeypatch):
+    monkeypatch.setattr(metrics, '_collectors', [])
+    values = iter([1, 2])
+    metrics.register_collector(lambda: [('test_gauge', 'gauge', 'A test gauge.', [([('name', 'a')], next(values))])])
+    assert sample(metrics.render_metrics(), 'test_gauge{name="a"}') == 1
+    text = metrics.render_metrics()
+    assert '# TYPE test_gauge gauge' in text and sample(text, 'test_gauge{name="a"}') == 2
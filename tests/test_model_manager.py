@@ -0,0 +1,80 @@
+import os
+import shutil
+
+from services.inference_backends import MODEL_DIR
+from services.model_manager import ModelManager, file_sha256, public_path
+
+
+def copy_model(trained_forest, tmp_path):
+    _, directory = trained_forest
+    path = tmp_path / 'model.npz'
+    shutil.copy(directory / 'loss_prediction_model.npz', path)
+    return path
+
+
+def test_not_ready_until_loaded(tmp_path):
+    manager = ModelManager('npz', str(tmp_path / 'missing.npz'))
+    assert not manager.is_ready()
+    assert manager.get_model() is None
+    assert manager.load_failures == 1 and 'last_error' in manager.info()
+
+
+def test_load_reports_version_and_notifies_listeners(trained_forest, tmp_path):
+    path = copy_model(trained_forest, tmp_path)
+    manager = ModelManager('npz', str(path))
+    seen = []
+    manager.add_reload_listener(seen.append)
+
+    assert manager.load() and manager.is_ready()
+    info = manager.info()
+    assert info['version'] == file_sha256(path)[:12] and info['backend'] == 'npz'
+    assert seen == [manager._info]
+
+
+def test_hot_reload_swaps_in_a_changed_file(trained_forest, tmp_path):
+    path = copy_model(trained_forest, tmp_path)
+    manager = ModelManager('npz', str(path))
+    manager.load()
+    old_model = manager.get_model()
+    assert not manager.check_for_update()
+
+    # A rewritten file (new size and mtime) is picked up on the next check
+    with open(path, 'ab') as f:
+        f.write(b'\0')
+    os.utime(path, (1, 1))
+    assert manager.has_changed_on_disk()
+    assert manager.check_for_update()
+    assert manager.get_model() is not old_model and manager.load_count == 2
+
+
+def test_corrupt_file_keeps_the_old_model_in_service(trained_forest, tmp_path):
+    path = copy_model(trained_forest, tmp_path)
+    manager = ModelManager('npz', str(path))
+    manager.load()
+    old_model = manager.get_model()
+
+    path.write_bytes(b'half-written')
+    assert not manager.check_for_update()
+    assert manager.get_model() is old_model and manager.is_ready()
+    assert manager.load_failures == 1 and manager.info()['last_error']
+
+
+def test_info_does_not_reveal_server_paths(trained_forest, tmp_path):
+    path = copy_model(trained_forest, tmp_path)
+    manager = ModelManager('npz', str(path))
+    manager.load()
+    assert manager.info()['path'] == path.name
+
+    path.unlink()
+    assert not manager.load()
+    assert str(tmp_path) not in manager.info()['last_error']
+    assert public_path(os.path.join(MODEL_DIR, 'registry', 'east.npz')) == os.path.join('registry', 'east.npz')
+
+
+def test_ready_route(api_client, monkeypatch):
+    from services.recommendation_service import RecommendationService
+
+    monkeypatch.setattr(RecommendationService.model_manager, '_model', None)
+    assert api_client.get('/api/ready').status_code == 503
+    monkeypatch.setattr(RecommendationService.model_manager, '_model', object())
+    assert api_client.get('/api/ready').get_json() == {'ready': True}
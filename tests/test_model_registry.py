@@ -0,0 +1,134 @@
+import json
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend import config
+from services import model_registry
+from services.inference_backends import FEATURES_ORDER, make_probe_features
+from services.model_registry import ModelNotFoundError, ModelRegistry
+
+
+class DefaultManager:
+    def __init__(self):
+        self.model = object()
+
+    def info(self):
+        return {'version': 'abc', 'ready': True, 'backend': 'npz', 'loaded_at': None, 'load_seconds': 0.1}
+
+    def get_model(self):
+        return self.model
+
+
+@pytest.fixture
+def npz_models(trained_forest, tmp_path):
+    """Three copies of the test forest as separate registry model files."""
+    _, directory = trained_forest
+    paths = []
+    for name in ('east', 'west', 'north'):
+        path = tmp_path / f'{name}.npz'
+        shutil.copy(directory / 'loss_prediction_model.npz', path)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def registry():
+    return ModelRegistry(DefaultManager(), default_name='loss')
+
+
+def test_resolve_fills_in_defaults_and_rejects_unknown_models(registry, npz_models):
+    registry.register('east', 'loss', {'v1': npz_models[0], 'v2': npz_models[1]})
+    assert registry.resolve() == ('loss', None)
+    assert registry.resolve('loss', 'abc') == ('loss', None)
+    assert registry.resolve('east') == ('east', 'v2')
+    assert registry.resolve('east', 'v1', kind='loss') == ('east', 'v1')
+    for name, version, kind in (('west', None, None), ('east', 'v3', None), ('loss', 'old', None), ('east', None, 'power')):
+        with pytest.raises(ModelNotFoundError):
+            registry.resolve(name, version, kind)
+
+
+def test_registration_is_validated(registry, npz_models):
+    for args in (('loss', 'loss', {'v1': npz_models[0]}),
+                 ('east', 'weather', {'v1': npz_models[0]}),
+                 ('east', 'loss', {}),
+                 ('east', 'loss', {'v1': npz_models[0]}, 'v2'),
+                 ('east', 'loss', {'v1': 'model.h5'})):
+        with pytest.raises(ValueError):
+            registry.register(*args)
+
+
+def test_models_load_on_first_use_and_stay_loaded(registry, npz_models, trained_forest):
+    model, _ = trained_forest
+    registry.register('east', 'loss', {'v1': npz_models[0]})
+    assert registry.loads == 0 and registry.loaded_bytes == 0
+
+    served = registry.get('east')
+    X = make_probe_features(num_rows=20, seed=9)
+    np.testing.assert_array_equal(served.predict(X), model.predict(pd.DataFrame(X.astype(np.float32), columns=FEATURES_ORDER)))
+    assert registry.get('east') is served
+    assert (registry.loads, registry.hits) == (1, 1) and registry.loaded_bytes == served.nbytes
+    assert registry.get() is registry.default_manager.model
+
+
+def test_least_recently_used_models_are_evicted_over_budget(registry, npz_models, monkeypatch):
+    for name, path in zip(('east', 'west', 'north'), npz_models):
+        registry.register(name, 'loss', {'v1': path})
+    size = registry.get('east').nbytes
+    # Room for two models
+    monkeypatch.setattr(config, 'MODEL_MEMORY_BUDGET_MB', 2.5 * size / (1024 * 1024))
+
+    registry.get('west')
+    registry.get('east')
+    registry.get('north')
+    loaded = {model['name']: list(model['loaded_versions']) for model in registry.info()['models']}
+    assert loaded == {'loss': ['abc'], 'east': ['v1'], 'west': [], 'north': ['v1']}
+    assert registry.evictions == 1 and registry.loaded_bytes == 2 * size
+
+
+def test_concurrent_requests_share_one_load(registry, npz_models, monkeypatch):
+    registry.register('east', 'loss', {'v1': npz_models[0]})
+    loads = []
+    real_load = model_registry.load_backend
+
+    def slow_load(*args):
+        loads.append(args)
+        threading.Event().wait(0.05)
+        return real_load(*args)
+
+    monkeypatch.setattr(model_registry, 'load_backend', slow_load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get('east'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1 and len(results) == 4 and len({id(model) for model in results}) == 1
+
+
+def test_broken_files_and_manifests(registry, npz_models, tmp_path):
+    (tmp_path / 'broken.npz').write_bytes(b'not a model')
+    manifest = tmp_path / 'model_registry.json'
+    manifest.write_text(json.dumps({'models': {
+        'east': {'kind': 'loss', 'versions': {'v1': 'east.npz', 'v2': 'broken.npz'}, 'default_version': 'v1'},
+    }}))
+    assert registry.load_manifest(str(manifest)) == 1
+    assert registry.get('east') is not None
+    assert registry.get('east', 'v2') is None and registry.load_failures == 1
+
+    manifest.write_text('{"models": {"east": {"kind": "loss"}}}')
+    assert registry.load_manifest(str(manifest)) == 0
+    assert registry.load_manifest(str(tmp_path / 'missing.json')) == 0
+
+
+def test_api_rejects_unknown_models(api_client):
+    response = api_client.post('/api/recommend', json={
+        'temperature_celsius': 30, 'cloud_cover_percentage': 20, 'panel_age_in_days': 365,
+        'days_since_cleaning': 10, 'model': 'nowhere',
+    })
+    assert response.status_code == 404
+    assert response.get_json()['error']
+    assert api_client.get('/api/models').status_code == 200
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.inference_backends import FEATURES_ORDER, make_probe_features
+
+pytest.importorskip('skl2onnx')
+pytest.importorskip('onnxruntime')
+
+
+@pytest.fixture
+def convert(load_script):
+    return load_script('3_convert_model_to_onnx.py', 'convert_model_to_onnx')
+
+
+@pytest.fixture
+def holdout_data(trained_forest, tmp_path):
+    model, _ = trained_forest
+    data = pd.DataFrame(make_probe_features(num_rows=500, seed=8), columns=FEATURES_ORDER)
+    data['energy_loss_kw'] = model.predict(data)
+    path = tmp_path / 'loss.csv'
+    data.to_csv(path, index=False)
+    return str(path)
+
+
+def test_parse_variant(convert):
+    assert convert.parse_variant('full') == ('full', 'full', {})
+    assert convert.parse_variant('trees:25') == ('trees_25', 'trees', {'n_estimators': 25})
+    assert convert.parse_variant('distill:25x8') == ('distill_25x8', 'distill', {'n_estimators': 25, 'max_depth': 8})
+    with pytest.raises(ValueError):
+        convert.parse_variant('prune:3')
+
+
+def test_reduce_forest_keeps_the_first_trees_and_leaves_the_model_alone(convert, trained_forest):
+    model, _ = trained_forest
+    reduced = convert.reduce_forest(model, 3)
+    assert reduced.estimators_ == model.estimators_[:3] and reduced.n_estimators == 3
+    assert len(model.estimators_) == 8
+
+
+def test_round_mantissa_keeps_float16_precision(convert):
+    values = np.array([0.1, 1.2345678, 1000.123, -3.3], dtype=np.float32)
+    rounded = convert.round_mantissa(values, 10)
+    np.testing.assert_allclose(rounded, values, rtol=2 ** -11)
+    assert (rounded.view(np.uint32) & np.uint32(0x1FFF) == 0).all()
+
+
+def test_export_ships_the_full_forest_when_it_matches(convert, trained_forest, holdout_data, tmp_path):
+    _, directory = trained_forest
+    onnx_path = tmp_path / 'model.onnx'
+    reports = convert.convert_to_onnx(str(directory / 'loss_prediction_model.pkl'), str(onnx_path), holdout_data,
+                                      variants=('full', 'trees:4'), ship='full')
+
+    assert [report['variant'] for report in reports] == ['full', 'trees_4']
+    assert reports[0]['parity_ok']
+    assert reports[0]['max_abs_diff_kw'] <= 1e-4 and reports[1]['trees'] == 4
+    assert (tmp_path / 'onnx_variants' / 'trees_4.onnx').exists()
+    assert onnx_path.read_bytes() == (tmp_path / 'onnx_variants' / 'full.onnx').read_bytes()
+
+
+def test_compaction_drops_default_attributes(convert, trained_forest, tmp_path):
+    import onnx
+
+    model, _ = trained_forest
+    path = str(tmp_path / 'compact.onnx')
+    convert.export_variant(model, path, leaf_mantissa_bits=None)
+    names = {attribute.name for node in onnx.load(path).graph.node for attribute in node.attribute}
+    assert names and not names & set(convert.DEFAULT_VALUED_ATTRIBUTES)
+
+
+def test_a_variant_that_fails_parity_is_not_shipped(convert, trained_forest, holdout_data, tmp_path):
+    _, directory = trained_forest
+    onnx_path = tmp_path / 'model.onnx'
+    reports = convert.convert_to_onnx(str(directory / 'loss_prediction_model.pkl'), str(onnx_path), holdout_data,
+                                      variants=('trees:1',), ship='trees_1', reduced_tolerance=0.0)
+    assert not reports[0]['parity_ok']
+    assert not onnx_path.exists()
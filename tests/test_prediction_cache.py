@@ -0,0 +1,71 @@
+import numpy as np
+
+from backend import config
+from services import prediction_cache
+from services.inference_backends import FEATURES_ORDER
+from services.prediction_cache import PredictionCache
+from services.recommendation_service import RecommendationService
+
+CONDITIONS = {
+    'temperature_celsius': 30.2, 'cloud_cover_percentage': 20.4, 'panel_age_in_days': 365,
+    'days_since_cleaning': 10, 'hour': 12, 'day_of_year': 100,
+}
+
+
+def make_cache(**kwargs):
+    return PredictionCache(FEATURES_ORDER, config.PREDICTION_CACHE_RESOLUTIONS, **kwargs)
+
+
+def test_nearby_inputs_share_a_grid_key():
+    cache = make_cache()
+    key = cache.make_key(CONDITIONS)
+    assert cache.make_key(dict(CONDITIONS, temperature_celsius=30.1)) == key
+    assert cache.make_key(dict(CONDITIONS, temperature_celsius=31.0)) != key
+    assert cache.key_to_features(key)[:2] == [30.0, 20.0]
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(max_size=2)
+    cache.put('a', 1.0)
+    cache.put('b', 2.0)
+    assert cache.get('a') == 1.0  # 'a' is now the most recently used
+    cache.put('c', 3.0)
+    assert cache.get('b') is None and cache.get('a') == 1.0 and cache.get('c') == 3.0
+    stats = cache.stats()
+    assert stats['size'] == 2 and stats['evictions'] == 1 and stats['hits'] == 3 and stats['misses'] == 1
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache.time, 'monotonic', lambda: now[0])
+    cache = make_cache(ttl_seconds=10)
+    cache.put('a', 1.0)
+    now[0] += 9.9
+    assert cache.get('a') == 1.0
+    now[0] += 0.2
+    assert cache.get('a') is None and cache.stats()['size'] == 0
+
+
+class CountingModel:
+    def __init__(self):
+        self.rows = 0
+
+    def predict(self, X):
+        self.rows += len(X)
+        return np.asarray(X)[:, 0] * 0.01
+
+
+def test_service_serves_repeats_from_the_cache(serve_model, monkeypatch):
+    model = serve_model(CountingModel())
+    monkeypatch.setattr(config, 'PREDICTION_CACHE_ENABLED', True)
+    monkeypatch.setattr(RecommendationService, 'prediction_cache', make_cache())
+
+    first = RecommendationService.generate_recommendations(dict(CONDITIONS))
+    again = RecommendationService.generate_recommendations(dict(CONDITIONS, temperature_celsius=30.1))
+    assert first == again and model.rows == 1
+
+    # Batches only send the grid points not cached yet, each once
+    batch = [dict(CONDITIONS), dict(CONDITIONS, temperature_celsius=35), dict(CONDITIONS, temperature_celsius=35.1)]
+    results = RecommendationService.generate_batch_recommendations(batch)
+    assert model.rows == 2
+    assert results[0] == first and results[1] == results[2]
@@ -0,0 +1,64 @@
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import BACKEND_DIR
+
+
+@pytest.fixture
+def benchmarks(monkeypatch):
+    path = os.path.join(BACKEND_DIR, 'benchmarks', 'run_benchmarks.py')
+    spec = importlib.util.spec_from_file_location('run_benchmarks', path)
+    module = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, 'run_benchmarks', module)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_flatten_joins_nested_keys(benchmarks):
+    results = {'serving': {'single_row': {'p50_ms': 1.0}}, 'http': {'requests_per_second': 10.0}}
+    assert benchmarks.flatten(results) == {'serving.single_row.p50_ms': 1.0, 'http.requests_per_second': 10.0}
+
+
+def test_regressions_respect_the_direction_of_each_metric(benchmarks):
+    baseline = {'serving': {'p50_ms': 1.0, 'p99_ms': 2.0}, 'http': {'requests_per_second': 100.0, 'removed_ms': 1.0}}
+    results = {'serving': {'p50_ms': 1.1, 'p99_ms': 3.0}, 'http': {'requests_per_second': 70.0}, 'new': {'p50_ms': 5.0}}
+    rows = {row['metric']: row for row in benchmarks.compare(results, baseline, tolerance=0.2)}
+    assert set(rows) == {'serving.p50_ms', 'serving.p99_ms', 'http.requests_per_second'}
+    assert not rows['serving.p50_ms']['regression']
+    assert rows['serving.p99_ms']['regression'] and rows['serving.p99_ms']['change'] == pytest.approx(0.5)
+    # Throughput is worse when it drops
+    assert rows['http.requests_per_second']['regression']
+    faster = benchmarks.compare({'http': {'requests_per_second': 200.0}}, baseline, tolerance=0.2)
+    assert not faster[0]['regression']
+
+
+def run(benchmarks, monkeypatch, *args):
+    monkeypatch.setattr(sys, 'argv', ['run_benchmarks.py', '--only', 'serving', *args])
+    benchmarks.main()
+
+
+def test_baseline_round_trip_and_failing_on_regression(benchmarks, monkeypatch, tmp_path):
+    latency = {'p50_ms': 1.0}
+    monkeypatch.setitem(benchmarks.BENCHMARKS, 'serving', lambda quick: dict(latency))
+    baseline = str(tmp_path / 'baseline.json')
+    output = str(tmp_path / 'run.json')
+
+    run(benchmarks, monkeypatch, '--baseline', baseline, '--output', output, '--save-baseline')
+    saved = json.loads(open(baseline).read())
+    assert saved['results'] == {'serving': {'p50_ms': 1.0}}
+    assert saved['environment']['cpu_count'] == os.cpu_count()
+
+    latency['p50_ms'] = 1.1
+    run(benchmarks, monkeypatch, '--baseline', baseline, '--output', output, '--fail-on-regression')
+    assert json.loads(open(output).read())['comparison']['metrics'][0]['regression'] is False
+
+    latency['p50_ms'] = 2.0
+    with pytest.raises(SystemExit) as exit_info:
+        run(benchmarks, monkeypatch, '--baseline', baseline, '--output', output, '--fail-on-regression')
+    assert exit_info.value.code == 1
+    # The baseline is only replaced on request
+    assert json.loads(open(baseline).read())['results'] == {'serving': {'p50_ms': 1.0}}
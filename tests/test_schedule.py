@@ -0,0 +1,101 @@
+import numpy as np
+
+from backend import config
+from services.inference_backends import FEATURES_ORDER
+from services.recommendation_service import RecommendationService
+
+CONDITIONS = {
+    'temperature_celsius': 30.0, 'cloud_cover_percentage': 20.0, 'panel_age_in_days': 365,
+    'days_since_cleaning': 10, 'hour': 9, 'day_of_year': 360,
+}
+
+
+class SoilingModel:
+    """Loss grows by 0.1 kW per day since cleaning; counts the rows per call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, X):
+        self.calls.append(len(X))
+        return X[:, FEATURES_ORDER.index('days_since_cleaning')] * 0.1
+
+
+def plan(uncleaned, cleaned, horizon_days):
+    """Lays out per-day losses like _schedule_features and plans them."""
+    triangle = np.array([cleaned(t, d) for t, d in zip(*np.tril_indices(horizon_days))])
+    return RecommendationService._plan_cleaning(np.concatenate([uncleaned, triangle]), horizon_days)
+
+
+def test_plan_picks_first_day_and_break_even(monkeypatch):
+    monkeypatch.setattr(config, 'CLEANING_COST', 2000)
+    result = plan(np.full(30, 100.0), lambda t, d: 0.0, 30)
+    assert result['action_required']
+    assert result['best_cleaning_day'] == 0
+    # 100 INR saved per day covers the 2000 INR cleaning on day 19 (the 20th day)
+    assert result['break_even_day'] == 19
+    assert result['cost_with_best_cleaning_inr'] == 2000
+    assert result['cost_without_cleaning_inr'] == 3000
+
+
+def test_break_even_counts_only_savings_after_cleaning(monkeypatch):
+    monkeypatch.setattr(config, 'CLEANING_COST', 100)
+    # Soiling only costs money from day 5; cleaning on day 0 first saves on day 5
+    result = plan(np.array([0.0] * 5 + [50.0] * 5), lambda t, d: 0.0, 10)
+    assert result['best_cleaning_day'] == 0
+    assert result['break_even_day'] == 6
+
+
+def test_plan_skips_cleaning_that_does_not_pay(monkeypatch):
+    monkeypatch.setattr(config, 'CLEANING_COST', 2000)
+    result = plan(np.full(10, 10.0), lambda t, d: 0.0, 10)
+    assert not result['action_required']
+    assert result['best_cleaning_day'] is None and result['break_even_day'] is None
+
+
+def test_schedule_features_layout(monkeypatch):
+    monkeypatch.setattr(config, 'SCHEDULE_SAMPLE_HOURS', (10, 14))
+    horizon_days = 4
+    X = RecommendationService._schedule_features(CONDITIONS, horizon_days, config.SCHEDULE_SAMPLE_HOURS)
+    rows = horizon_days + horizon_days * (horizon_days + 1) // 2
+    assert X.shape == (2 * rows, len(FEATURES_ORDER))
+    assert RecommendationService.schedule_rows(horizon_days, 3) == 3 * len(X)
+
+    column = {name: X[:, j] for j, name in enumerate(FEATURES_ORDER)}
+    assert column['hour'][:rows].tolist() == [10] * rows and column['hour'][rows:].tolist() == [14] * rows
+    # Uncleaned days keep soiling; day 3 cleaned on day 1 is 2 days from cleaning
+    assert column['days_since_cleaning'][:horizon_days].tolist() == [10, 11, 12, 13]
+    cleaned_day, cleaning_day = np.tril_indices(horizon_days)
+    assert column['days_since_cleaning'][horizon_days:rows].tolist() == (cleaned_day - cleaning_day).tolist()
+    # Day of year wraps at the end of the year
+    assert column['day_of_year'][:horizon_days].tolist() == [360, 361, 362, 363]
+    # The second hour repeats the grid with only the hour changed
+    hour_column = FEATURES_ORDER.index('hour')
+    assert np.array_equal(np.delete(X[:rows], hour_column, axis=1), np.delete(X[rows:], hour_column, axis=1))
+
+
+def test_chunked_scoring_matches_one_call(serve_model, monkeypatch):
+    model = serve_model(SoilingModel())
+    panels = [dict(CONDITIONS, days_since_cleaning=ds) for ds in (0, 30, 60)]
+
+    whole = RecommendationService.generate_batch_cleaning_schedules(panels, 20)
+    rows_per_panel = RecommendationService.schedule_rows(20)
+    assert model.calls == [3 * rows_per_panel]
+
+    monkeypatch.setattr(config, 'SCHEDULE_CHUNK_ROWS', rows_per_panel)
+    model.calls.clear()
+    assert RecommendationService.generate_batch_cleaning_schedules(panels, 20) == whole
+    assert model.calls == [rows_per_panel] * 3
+
+
+def test_batch_route_caps_total_rows_not_panels(api_client, serve_model, monkeypatch):
+    client = api_client
+    serve_model(SoilingModel())
+    monkeypatch.setattr(config, 'MAX_SCHEDULE_ROWS', RecommendationService.schedule_rows(90, 2))
+
+    too_many = client.post('/api/schedule/batch', json={'panels': [CONDITIONS] * 3, 'horizon_days': 90})
+    assert too_many.status_code == 413
+    assert 'At most 2 panels' in too_many.get_json()['error']
+    # A shorter horizon fits many more panels under the same limit
+    ok = client.post('/api/schedule/batch', json={'panels': [CONDITIONS] * 20, 'horizon_days': 10})
+    assert ok.status_code == 200 and ok.get_json()['count'] == 20
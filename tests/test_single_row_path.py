@@ -0,0 +1,66 @@
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend import config
+from services.inference_backends import FEATURES_ORDER, SklearnBackend, make_probe_features
+from services.recommendation_service import RecommendationService
+
+
+@pytest.mark.parametrize('num_rows', [1, 2, config.SKLEARN_FAST_PATH_MAX_ROWS, config.SKLEARN_FAST_PATH_MAX_ROWS + 1])
+def test_tree_walk_is_bit_identical_to_forest_predict(trained_forest, num_rows):
+    model, directory = trained_forest
+    backend = SklearnBackend(str(directory / 'loss_prediction_model.pkl'))
+    X = make_probe_features(num_rows=num_rows, seed=5)
+    expected = model.predict(pd.DataFrame(X.astype(np.float32), columns=FEATURES_ORDER))
+    assert np.array_equal(backend.predict(X), expected)
+
+
+@pytest.mark.parametrize('num_rows', [1, 63, 64, 65, 1000])
+def test_predictions_do_not_depend_on_the_batch_size(trained_forest, tmp_path, num_rows, monkeypatch):
+    model, _ = trained_forest
+    path = tmp_path / 'threaded.pkl'
+    joblib.dump(model.set_params(n_jobs=-1), path)
+    model.set_params(n_jobs=None)
+    backend = SklearnBackend(str(path))
+    # Force the row-block split, whatever the number of cores here
+    monkeypatch.setattr(backend, '_n_jobs', 4)
+    monkeypatch.setattr(config, 'SKLEARN_FAST_PATH_MAX_ROWS', 16)
+
+    X = make_probe_features(num_rows=1000, seed=11)
+    whole = backend.predict(X)
+    assert np.array_equal(backend.predict(X[:num_rows]), whole[:num_rows])
+    assert np.array_equal(whole, model.predict(pd.DataFrame(X.astype(np.float32), columns=FEATURES_ORDER)))
+
+
+def test_feature_names_are_checked_once_at_load(trained_forest, tmp_path):
+    model, _ = trained_forest
+    path = tmp_path / 'renamed.pkl'
+    joblib.dump(model, path)
+    with pytest.raises(ValueError, match='features'):
+        SklearnBackend(str(path), features=list(reversed(FEATURES_ORDER)))
+
+
+def test_single_row_prediction_matches_the_model(trained_forest, serve_model):
+    model, directory = trained_forest
+    serve_model(SklearnBackend(str(directory / 'loss_prediction_model.pkl')))
+    row = make_probe_features(num_rows=1, seed=6)[0]
+    conditions = dict(zip(FEATURES_ORDER, row.tolist()))
+
+    result = RecommendationService.generate_recommendations(conditions)
+
+    expected = model.predict(pd.DataFrame([row.astype(np.float32)], columns=FEATURES_ORDER))[0]
+    assert result['predicted_hourly_loss_kw'] == round(float(expected), 4)
+
+
+def test_row_buffer_is_reused_per_thread_and_not_shared():
+    buffers = []
+    first = RecommendationService._row_buffer()
+    assert RecommendationService._row_buffer() is first and first.shape == (1, len(FEATURES_ORDER))
+    thread = threading.Thread(target=lambda: buffers.append(RecommendationService._row_buffer()))
+    thread.start()
+    thread.join()
+    assert buffers[0] is not first
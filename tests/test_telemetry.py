@@ -0,0 +1,133 @@
+import math
+import time
+
+import numpy as np
+import pytest
+
+from backend import config
+from services.inference_backends import FEATURES_ORDER
+from services.telemetry import PanelStateTable, TelemetryScorer, parse_timestamp
+
+
+class ConstantModel:
+    def predict(self, X):
+        return np.full(len(X), 0.5)
+
+
+def load_panel(table, panel_id='p1'):
+    return table.apply([
+        {'type': 'panel', 'panel_id': panel_id, 'install_date': '2025-01-01'},
+        {'type': 'reading', 'panel_id': panel_id, 'timestamp': '2025-01-11T12:00:00',
+         'temperature_celsius': 30, 'cloud_cover_percentage': 10, 'power_kw': 3.0, 'ideal_power_kw': 4.0},
+    ])
+
+
+@pytest.mark.parametrize('value', [math.nan, math.inf, -math.inf, 1e20, -1e20])
+def test_parse_timestamp_rejects_nan_and_out_of_range(value):
+    with pytest.raises(ValueError):
+        parse_timestamp(value)
+
+
+def test_bad_timestamps_are_rejected_at_ingest():
+    table = PanelStateTable(max_panels=10)
+    accepted, stale, errors = table.apply([
+        {'type': 'panel', 'panel_id': 'p1', 'install_date': 1e300},
+        {'type': 'cleaning', 'panel_id': 'p1', 'timestamp': float('nan')},
+    ])
+    assert (accepted, stale) == (0, 0)
+    assert [position for position, _ in errors] == [0, 1]
+    assert table.snapshot('p1') is None
+
+
+def test_stale_readings_are_ignored_and_features_follow_state():
+    table = PanelStateTable(max_panels=10)
+    assert load_panel(table) == (2, 0, [])
+    accepted, stale, _ = table.apply([
+        {'type': 'reading', 'panel_id': 'p1', 'timestamp': '2025-01-10T12:00:00',
+         'temperature_celsius': 99, 'cloud_cover_percentage': 99},
+        {'type': 'rain', 'panel_id': 'p1', 'timestamp': '2025-01-06T00:00:00'},
+    ])
+    assert (accepted, stale) == (1, 1)
+
+    rows, X, _, observed = table.take_pending()
+    features = dict(zip(FEATURES_ORDER, X[0].tolist()))
+    assert features['temperature_celsius'] == 30
+    assert features['panel_age_in_days'] == 10
+    assert features['days_since_cleaning'] == 5
+    assert features['hour'] == 12 and features['day_of_year'] == 11
+    assert observed.tolist() == [1.0]
+    # Claimed rows are no longer pending
+    assert len(table.take_pending()[0]) == 0
+
+
+def test_panel_limit_and_growth():
+    table = PanelStateTable(max_panels=3, initial_capacity=1)
+    for i in range(3):
+        load_panel(table, f'p{i}')
+    _, _, errors = load_panel(table, 'p3')
+    assert len(table) == 3 and table.stats()['capacity'] == 3
+    assert errors and 'limit' in errors[0][1]
+
+
+def test_scorer_keeps_rows_pending_when_the_model_fails():
+    table = PanelStateTable(max_panels=10)
+    load_panel(table)
+    scorer = TelemetryScorer(table, lambda: None)
+    assert scorer.score_pending() == 0 and scorer.failures == 1
+
+    scorer.get_model = lambda: ConstantModel()
+    assert scorer.score_pending() == 1
+    assert table.snapshot('p1')['predicted_hourly_loss_kw'] == 0.5
+
+
+def test_scorer_survives_a_failing_callback():
+    table = PanelStateTable(max_panels=10)
+    load_panel(table)
+    seen = []
+
+    def on_scored(X, predictions, observed_loss_kw):
+        seen.append(len(X))
+        if len(seen) == 1:
+            raise RuntimeError("drift monitor broke")
+
+    scorer = TelemetryScorer(table, lambda: ConstantModel(), on_scored=on_scored)
+    assert scorer.score_pending() == 1 and scorer.failures == 1
+    assert table.snapshot('p1')['predicted_hourly_loss_kw'] == 0.5
+
+    load_panel(table)
+    assert scorer.score_pending() == 1 and seen == [1, 1]
+
+
+def test_background_thread_keeps_scoring_after_an_error(monkeypatch):
+    table = PanelStateTable(max_panels=10)
+    scorer = TelemetryScorer(table, lambda: ConstantModel(), interval_seconds=0.01)
+    calls = []
+    real_take_pending = table.take_pending
+
+    def take_pending(*args):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("table broke")
+        return real_take_pending(*args)
+
+    monkeypatch.setattr(table, 'take_pending', take_pending)
+    load_panel(table)
+    scorer.start()
+    try:
+        deadline = time.monotonic() + 5
+        while scorer.rows_scored == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        scorer.stop()
+    assert scorer.rows_scored == 1 and scorer.failures == 1
+
+
+def test_routes_answer_consistently_when_telemetry_is_disabled(api_client, monkeypatch):
+    client = api_client
+    monkeypatch.setattr(config, 'TELEMETRY_ENABLED', False)
+
+    assert client.post('/api/telemetry', data='{}').status_code == 503
+    assert client.get('/api/panels/p1').status_code == 503
+    response = client.post('/api/recommend', json={'panel_id': 'p1'})
+    assert response.status_code == 404
+    assert 'TELEMETRY_ENABLED' in response.get_json()['error']
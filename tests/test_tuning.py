@@ -0,0 +1,33 @@
+import pytest
+
+
+@pytest.fixture
+def tune(load_script):
+    return load_script('2c_tune_loss_model.py', 'tune_loss_model')
+
+
+def test_folds_roll_a_fixed_window_by_default(tune):
+    folds = tune.rolling_folds(100, 4)
+    assert len(folds) == 4
+    assert {train_end - train_start for train_start, train_end, _, _ in folds} == {20}
+    for (train_start, train_end, test_start, test_end), (next_start, *_rest) in zip(folds, folds[1:]):
+        assert train_end == test_start and next_start > train_start
+    assert folds[-1][3] == 100
+
+
+def test_expanding_and_explicit_windows(tune):
+    expanding = tune.rolling_folds(100, 4, expanding=True)
+    assert all(train_start == 0 for train_start, *_ in expanding)
+    assert [train_end for _, train_end, _, _ in expanding] == [20, 40, 60, 80]
+
+    sized = tune.rolling_folds(100, 4, max_train_rows=10)
+    assert {train_end - train_start for train_start, train_end, _, _ in sized} == {10}
+
+
+def test_pareto_front_marks_undominated_candidates(tune):
+    rows = [
+        {'mae_kw': 0.1, 'single_row_us': 50},
+        {'mae_kw': 0.2, 'single_row_us': 10},
+        {'mae_kw': 0.3, 'single_row_us': 60},
+    ]
+    assert [row['frontier'] for row in tune.pareto_front(rows)] == [True, True, False]